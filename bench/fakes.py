@@ -0,0 +1,210 @@
+"""ベンチマーク用の外部サービス代替 (Yahoo RSS / Reddit / Gemini / X)。
+
+いずれもネットワークに一切触れず、シードから決定的にデータを生成する。
+"""
+
+import email.message
+import hashlib
+import json
+import pathlib
+import random
+import threading
+import time
+import urllib.parse
+from xml.sax.saxutils import escape
+
+_WORDS = (
+    "chip demand guidance earnings rally selloff margin cloud AI datacenter supply chain "
+    "buyback dividend downgrade upgrade forecast revenue growth inflation rates fed tariff "
+    "antitrust lawsuit launch delay recall partnership acquisition layoffs record quarter"
+).split()
+
+
+def _sentence(rng: random.Random, n: int) -> str:
+    return " ".join(rng.choice(_WORDS) for _ in range(n)).capitalize()
+
+
+def make_rss_xml(symbols: str, n_entries: int, seed: int = 0, now: float | None = None) -> bytes:
+    """Yahoo Finance ヘッドライン RSS と同じ構造の XML を生成する。
+
+    symbols はカンマ区切りで複数指定でき、シンボルごとに n_entries 件のエントリを含める。
+    """
+    now = time.time() if now is None else now
+    items = []
+    for ticker in symbols.split(","):
+        items.extend(_rss_items(ticker, n_entries, seed, now))
+    return (
+        '<?xml version="1.0" encoding="UTF-8"?>'
+        '<rss version="2.0"><channel>'
+        f"<title>Yahoo! Finance: {escape(symbols)} News</title>"
+        f"{''.join(items)}"
+        "</channel></rss>"
+    ).encode("utf-8")
+
+
+def _rss_items(ticker: str, n_entries: int, seed: int, now: float) -> list[str]:
+    rng = random.Random(f"{seed}:{ticker}")
+    items = []
+    for i in range(n_entries):
+        published = time.strftime(
+            "%a, %d %b %Y %H:%M:%S +0000", time.gmtime(now - rng.randint(0, 48 * 3600))
+        )
+        items.append(
+            "<item>"
+            f"<title>{escape(ticker)} {escape(_sentence(rng, 8))}</title>"
+            f"<link>https://finance.yahoo.com/news/{ticker.lower()}-{seed}-{i}.html</link>"
+            f"<description>{escape(_sentence(rng, 40))}</description>"
+            f"<pubDate>{published}</pubDate>"
+            f"<guid>{ticker}-{seed}-{i}</guid>"
+            "</item>"
+        )
+    return items
+
+
+class FakeHttp:
+    """news_fetcher._http_get の代替。記録済み XML があればそれを、なければ生成した XML を返す。"""
+
+    def __init__(
+        self,
+        entries_per_feed: int = 20,
+        seed: int = 0,
+        recorded_dir: pathlib.Path | None = None,
+        latency: float = 0.0,
+    ) -> None:
+        self.entries_per_feed = entries_per_feed
+        self.seed = seed
+        self.recorded_dir = recorded_dir
+        self.latency = latency
+        self.requests = 0
+        self._lock = threading.Lock()
+
+    def _body(self, symbols: str) -> bytes:
+        if self.recorded_dir:
+            path = self.recorded_dir / f"{symbols}.xml"
+            if path.exists():
+                return path.read_bytes()
+        return make_rss_xml(symbols, self.entries_per_feed, self.seed)
+
+    def __call__(self, url: str, headers: dict[str, str]):
+        with self._lock:
+            self.requests += 1
+        if self.latency:
+            time.sleep(self.latency)
+        symbols = urllib.parse.parse_qs(urllib.parse.urlparse(url).query)["s"][0]
+        body = self._body(symbols)
+        etag = '"' + hashlib.md5(body).hexdigest() + '"'
+        response_headers = email.message.Message()
+        response_headers["ETag"] = etag
+        if headers.get("If-None-Match") == etag:
+            return 304, b"", response_headers
+        return 200, body, response_headers
+
+
+class FakePost:
+    def __init__(self, subreddit: str, index: int, rng: random.Random, now: float) -> None:
+        self.id = f"{subreddit[:3]}{index:06d}"
+        self.fullname = f"t3_{self.id}"
+        self.title = _sentence(rng, 10)
+        self.selftext = _sentence(rng, rng.randint(0, 80))
+        self.score = rng.randint(0, 20000)
+        self.permalink = f"/r/{subreddit}/comments/{self.id}/"
+        self.created_utc = now - index * 60
+
+
+class FakeSubreddit:
+    def __init__(self, name: str, n_posts: int, seed: int) -> None:
+        rng = random.Random(f"{seed}:{name}")
+        now = time.time()
+        self.posts = [FakePost(name, i, rng, now) for i in range(n_posts)]
+
+    def hot(self, limit: int):
+        return iter(sorted(self.posts, key=lambda p: -p.score)[:limit])
+
+    def new(self, limit: int):
+        return iter(self.posts[:limit])
+
+
+class FakeReddit:
+    """praw.Reddit の代替。サブレディットごとの投稿はプロセス内で共有する。"""
+
+    _subreddits: dict[tuple, FakeSubreddit] = {}
+    _lock = threading.Lock()
+
+    def __init__(self, posts_per_subreddit: int = 100, seed: int = 0) -> None:
+        self.posts_per_subreddit = posts_per_subreddit
+        self.seed = seed
+
+    def subreddit(self, name: str) -> FakeSubreddit:
+        key = (name, self.posts_per_subreddit, self.seed)
+        with self._lock:
+            if key not in self._subreddits:
+                self._subreddits[key] = FakeSubreddit(name, self.posts_per_subreddit, self.seed)
+            return self._subreddits[key]
+
+
+class _FakeResponse:
+    def __init__(self, text: str) -> None:
+        self.text = text
+
+
+class _FakeModels:
+    def __init__(self, latency: float) -> None:
+        self.latency = latency
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def generate_content(self, model: str, contents: str, config=None) -> _FakeResponse:
+        with self._lock:
+            self.calls += 1
+        time.sleep(self.latency)
+        digest = hashlib.sha256(contents.encode("utf-8")).digest()
+        sentiment = "BULLISH" if digest[0] % 2 == 0 else "BEARISH"
+        emoji = "\U0001f402" if sentiment == "BULLISH" else "\U0001f43b"
+        return _FakeResponse(
+            json.dumps(
+                {
+                    "post_text": f"{emoji} $BENCH ベンチマーク用の決定的な応答 ({digest.hex()[:8]}) #米国株",
+                    "sentiment": sentiment,
+                    "reason": "ベンチマーク用の固定コメント。需給と決算期待が拮抗しており、"
+                    "短期的には方向感に欠ける展開が続く可能性がある。" * 2,
+                },
+                ensure_ascii=False,
+            )
+        )
+
+
+class FakeGenaiClient:
+    """google.genai.Client の代替。入力のハッシュから決定的な JSON を返す。"""
+
+    def __init__(self, latency: float = 0.0) -> None:
+        self.models = _FakeModels(latency)
+
+
+class _FakeTweet:
+    def __init__(self, tweet_id: int) -> None:
+        self.data = {"id": str(tweet_id)}
+
+
+class FakeXClient:
+    """tweepy.Client の代替。投稿内容をメモリに保持するだけ。"""
+
+    posted: list[dict] = []
+
+    def create_tweet(self, text: str, media_ids: list | None = None) -> _FakeTweet:
+        self.posted.append({"text": text, "media_ids": media_ids})
+        return _FakeTweet(len(self.posted))
+
+
+class _FakeMedia:
+    def __init__(self, media_id: int) -> None:
+        self.media_id_string = str(media_id)
+
+
+class FakeXApi:
+    """tweepy.API の代替。アップロードされた画像のパスをメモリに保持するだけ。"""
+
+    uploaded: list[str] = []
+
+    def media_upload(self, filename: str) -> _FakeMedia:
+        self.uploaded.append(filename)
+        return _FakeMedia(len(self.uploaded))
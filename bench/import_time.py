@@ -0,0 +1,78 @@
+"""エントリポイントの import 時間ベンチマーク (python -X importtime)。
+
+`import src.main` の累積 import 時間と重いモジュールの内訳を表示する。
+重量級 SDK が起動時に読み込まれていたり、--max-ms を超えた場合は終了コード 1 を返す。
+
+使い方:
+    python -m bench.import_time
+    python -m bench.import_time --max-ms 150 --repeat 5
+"""
+
+import argparse
+import pathlib
+import subprocess
+import sys
+
+PROJECT_ROOT = pathlib.Path(__file__).resolve().parent.parent
+
+# 起動時 (新規項目がなく重複除外で終了する経路) に読み込まれてはならないモジュール
+DEFERRED_MODULES = ("google.genai", "praw", "tweepy", "PIL", "feedparser", "numpy")
+
+_PROBE = (
+    "import sys, src.main; "
+    f"print(','.join(m for m in {DEFERRED_MODULES!r} if m in sys.modules))"
+)
+
+
+def measure() -> tuple[int, list[tuple[int, str]], list[str]]:
+    """新しいインタプリタで src.main を import し、計測結果を返す。
+
+    Returns:
+        (src.main の累積時間 [us], (累積時間, モジュール名) の一覧, 読み込まれた重量級モジュール)
+    """
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", _PROBE],
+        cwd=PROJECT_ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    modules: list[tuple[int, str]] = []
+    total = 0
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = (part.strip() for part in line[len("import time:"):].split("|"))
+        modules.append((int(cumulative), name))
+        if name == "src.main":
+            total = int(cumulative)
+    loaded = [m for m in proc.stdout.strip().split(",") if m]
+    return total, modules, loaded
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=3, help="計測回数 (最良値を採用)")
+    parser.add_argument("--top", type=int, default=15, help="表示する重いモジュール数")
+    parser.add_argument("--max-ms", type=float, help="src.main の累積 import 時間の上限 (ms)")
+    args = parser.parse_args()
+
+    results = [measure() for _ in range(max(1, args.repeat))]
+    total, modules, loaded = min(results, key=lambda r: r[0])
+
+    print(f"import src.main: {total / 1000:.1f} ms (best of {len(results)})")
+    for cumulative, name in sorted(modules, reverse=True)[: args.top]:
+        print(f"  {cumulative / 1000:8.1f} ms  {name}")
+
+    failed = False
+    if loaded:
+        print(f"起動時に読み込まれた重量級モジュール: {', '.join(loaded)}")
+        failed = True
+    if args.max_ms is not None and total / 1000 > args.max_ms:
+        print(f"import 時間が上限を超過: {total / 1000:.1f} ms > {args.max_ms} ms")
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
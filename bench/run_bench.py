@@ -0,0 +1,237 @@
+"""オフライン E2E ベンチマーク — 外部サービスをすべてローカルの代替に差し替えて main.run を計測する。
+
+使い方:
+    python -m bench.run_bench --tickers 300 --posts 1000 --history 200000
+    python -m bench.run_bench --json bench_output.json
+    python -m bench.run_bench --baseline bench_baseline.json  # 退行があれば終了コード 1
+
+フル実行には requirements.txt の依存 (feedparser, Pillow, google-genai など) が必要。
+"""
+
+import argparse
+import json
+import pathlib
+import random
+import sys
+import tempfile
+import time
+
+from bench import fakes
+
+
+def _timeit(fn, repeat: int = 5) -> float:
+    """fn を repeat 回実行した最良値 (秒)。"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def micro_benchmarks(history: int, workdir: pathlib.Path) -> dict[str, float]:
+    """ホットパス単体の所要時間 (秒)。"""
+    from src.entities import EntityMatcher, tag_items
+    from src.near_dup import collapse_near_duplicates
+    from src.prompt_builder import build_prompt
+    from src.utils import ProcessedIdStore
+
+    results: dict[str, float] = {}
+
+    store = ProcessedIdStore(workdir / "micro_ids.tsv")
+    store.add_many([f"https://finance.yahoo.com/news/old-{i}.html" for i in range(history)])
+    store.flush()
+    results["state_load"] = _timeit(lambda: ProcessedIdStore(workdir / "micro_ids.tsv"), repeat=3)
+    probes = [f"https://finance.yahoo.com/news/new-{i}.html" for i in range(10000)]
+    results["is_duplicate_10k"] = _timeit(lambda: [p in store for p in probes])
+
+    rng = random.Random(0)
+    items = [
+        {
+            "id": f"n{i}",
+            "ticker": f"T{i % 300}",
+            "title": fakes._sentence(rng, 10),
+            "summary": fakes._sentence(rng, 40),
+            "published": time.time() - rng.randint(0, 86400),
+        }
+        for i in range(3000)
+    ]
+    results["near_dup_3k"] = _timeit(lambda: collapse_near_duplicates(items), repeat=3)
+    results["build_prompt_3k"] = _timeit(lambda: build_prompt(items, []), repeat=3)
+
+    universe = {f"T{i:03d}": {"name": f"Company {i} Holdings", "aliases": [f"Brand{i}"]} for i in range(500)}
+    matcher = EntityMatcher(universe)
+    posts = [
+        {
+            "title": f"$T{rng.randrange(500):03d} {fakes._sentence(rng, 10)} Brand{rng.randrange(500)}",
+            "selftext": f"{fakes._sentence(rng, 60)} Company {rng.randrange(500)} Holdings T{rng.randrange(500):03d}",
+        }
+        for _ in range(3000)
+    ]
+    results["tag_entities_3k"] = _timeit(lambda: tag_items(posts, matcher), repeat=3)
+
+    try:
+        from PIL import Image, ImageDraw
+
+        from src.image_gen import _draw_wrapped_text
+        from src.text_layout import get_metrics
+    except ImportError:
+        return results
+
+    reason = "決算期待で半導体セクターに資金流入の兆しか。AI 需要の継続性には疑問も残る。" * 4
+    draw = ImageDraw.Draw(Image.new("RGB", (1200, 675)))
+    metrics = get_metrics(32, body=True)
+    results["draw_wrapped_text"] = _timeit(
+        lambda: _draw_wrapped_text(draw, reason, metrics, (255, 255, 255), 80, 420, 1040)
+    )
+    return results
+
+
+def _install_fakes(args: argparse.Namespace, workdir: pathlib.Path) -> dict:
+    """各モジュールの外部接続点とファイルパスをベンチマーク用に差し替える。"""
+    from src import llm_engine, main, news_fetcher, reddit_loader, utils, x_client
+    from src.archive import SnapshotArchive
+    from src.llm_cache import ResponseCache
+    from src.outbox import Outbox
+    from src.rate_limit import RateLimiter
+    from src.timeseries import TimeSeriesStore
+
+    data_dir = workdir / "data"
+    utils.STATE_PATH = data_dir / "processed_ids.tsv"
+    utils.LEGACY_STATE_PATH = data_dir / "processed_ids.json"
+    news_fetcher.FEED_CACHE_PATH = data_dir / "feed_cache.json"
+    reddit_loader.REDDIT_CURSOR_PATH = data_dir / "reddit_cursors.json"
+    main.REPORTS_DIR = workdir / "reports"
+    main.timeseries_store = TimeSeriesStore(data_dir / "timeseries")
+    main.snapshot_archive = SnapshotArchive(data_dir / "archive")
+
+    http = fakes.FakeHttp(
+        entries_per_feed=args.entries,
+        recorded_dir=args.rss_dir,
+        latency=args.rss_latency,
+    )
+    news_fetcher._http_get = http
+    news_fetcher.UNIVERSE = {
+        f"T{i:03d}": {"name": "", "aliases": []} for i in range(args.tickers)
+    }
+    news_fetcher.ticker_matcher.cache_clear()
+    news_fetcher.FEED_BATCH_SIZE = args.batch_size
+    news_fetcher.FEED_REQUEST_BUDGET = args.tickers
+
+    reddit_loader.TARGET_SUBREDDITS = [f"sub{i}" for i in range(args.subreddits)]
+    reddit_loader._create_reddit = lambda: fakes.FakeReddit(posts_per_subreddit=args.posts)
+    main.REDDIT_POST_LIMIT = args.posts
+
+    genai_client = fakes.FakeGenaiClient(latency=args.llm_latency)
+    llm_engine._create_client = lambda: genai_client
+    llm_engine.rate_limiter = RateLimiter(rpm=1e9, tpm=1e12)
+    cache = ResponseCache(workdir / "llm_cache")
+    llm_engine.response_cache = cache
+    main.response_cache = cache
+    main.ANALYSIS_MODE = args.mode
+
+    x_client._create_client = fakes.FakeXClient
+    x_client._create_api = fakes.FakeXApi
+    main.outbox = Outbox(data_dir / "outbox.json", posts_per_hour=1e9, burst=1e9)
+
+    # 長い処理済み ID 履歴 (今回の入力とは重複しない)
+    store = utils.ProcessedIdStore(utils.STATE_PATH)
+    store.add_many([f"https://finance.yahoo.com/news/history-{i}.html" for i in range(args.history)])
+    store.flush()
+
+    return {"http": http, "genai": genai_client}
+
+
+def e2e_benchmark(args: argparse.Namespace, workdir: pathlib.Path) -> dict:
+    """main.run を 2 回 (初回: 全件新規 / 2 回目: 全件既読) 実行し、計測値を返す。"""
+    from src import main, metrics
+
+    handles = _install_fakes(args, workdir)
+    runs = {}
+    for label in ("cold", "warm"):
+        start = time.perf_counter()
+        main.run()
+        wall = time.perf_counter() - start
+        data = metrics.current().to_dict()
+        data["wall_sec"] = round(wall, 4)
+        runs[label] = data
+    runs["rss_requests"] = handles["http"].requests
+    runs["llm_calls"] = handles["genai"].models.calls
+    return runs
+
+
+def _print_report(report: dict) -> None:
+    print("\n== micro benchmarks (best of N) ==")
+    for name, sec in report["micro"].items():
+        print(f"  {name:<22} {sec * 1000:10.2f} ms")
+
+    for label in ("cold", "warm"):
+        run = report.get("e2e", {}).get(label)
+        if not run:
+            continue
+        print(f"\n== main.run ({label}) wall={run['wall_sec']:.3f}s peak_rss={run['peak_rss_mb']} MB ==")
+        for name, stage in run["stages"].items():
+            print(f"  {name:<22} {stage['wall_sec'] * 1000:10.2f} ms  {stage['status']}")
+
+
+def _regressions(report: dict, baseline: dict, tolerance: float) -> list[str]:
+    """baseline と比べて tolerance 倍を超えて遅くなった項目。"""
+    found = []
+    for name, sec in report["micro"].items():
+        base = baseline.get("micro", {}).get(name)
+        if base and sec > base * tolerance:
+            found.append(f"micro.{name}: {base * 1000:.2f} ms -> {sec * 1000:.2f} ms")
+    for label in ("cold", "warm"):
+        stages = report.get("e2e", {}).get(label, {}).get("stages", {})
+        base_stages = baseline.get("e2e", {}).get(label, {}).get("stages", {})
+        for name, stage in stages.items():
+            base = base_stages.get(name, {}).get("wall_sec")
+            # 1 ms 未満のステージは計測誤差が大きいので対象外
+            if base and base > 0.001 and stage["wall_sec"] > base * tolerance:
+                found.append(f"{label}.{name}: {base:.3f}s -> {stage['wall_sec']:.3f}s")
+    return found
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tickers", type=int, default=300, help="RSS を取得するティッカー数")
+    parser.add_argument("--entries", type=int, default=20, help="ティッカーあたりのエントリ数")
+    parser.add_argument("--batch-size", type=int, default=10, help="1 リクエストにまとめるシンボル数")
+    parser.add_argument("--rss-dir", type=pathlib.Path, help="記録済み RSS XML (<s パラメータ>.xml) のディレクトリ")
+    parser.add_argument("--rss-latency", type=float, default=0.0, help="RSS 1 リクエストの擬似遅延 (秒)")
+    parser.add_argument("--subreddits", type=int, default=3)
+    parser.add_argument("--posts", type=int, default=1000, help="サブレディットあたりの投稿数")
+    parser.add_argument("--history", type=int, default=200000, help="既存の処理済み ID 件数")
+    parser.add_argument("--llm-latency", type=float, default=0.5, help="擬似 Gemini の応答遅延 (秒)")
+    parser.add_argument("--mode", choices=["blended", "per_ticker"], default="per_ticker")
+    parser.add_argument("--micro-only", action="store_true", help="E2E を実行しない")
+    parser.add_argument("--json", type=pathlib.Path, help="結果を JSON で保存するパス")
+    parser.add_argument("--baseline", type=pathlib.Path, help="比較対象の結果 JSON")
+    parser.add_argument("--tolerance", type=float, default=1.5, help="退行とみなす倍率")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="xbot-bench-") as tmp:
+        workdir = pathlib.Path(tmp)
+        report = {"args": {k: str(v) for k, v in vars(args).items()}}
+        report["micro"] = micro_benchmarks(args.history, workdir)
+        if not args.micro_only:
+            report["e2e"] = e2e_benchmark(args, workdir)
+
+    _print_report(report)
+
+    if args.json:
+        args.json.write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+
+    if args.baseline:
+        baseline = json.loads(args.baseline.read_text(encoding="utf-8"))
+        regressions = _regressions(report, baseline, args.tolerance)
+        if regressions:
+            print("\n== regressions ==")
+            for line in regressions:
+                print(f"  {line}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
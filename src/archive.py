@@ -0,0 +1,164 @@
+"""取得した生データのアーカイブ — 実行ごとの新規ニュース・Reddit 投稿を日別の gzip セグメントに追記する。
+
+セグメントは data/archive/YYYY-MM-DD.jsonl.gz (UTC)。1 回の実行分を 1 つの gzip メンバーとして
+追記するため、ファイル全体は通常の gzip としても読める。index.jsonl には実行ごとに
+(セグメント, バイト位置, 長さ, 取得時刻, ティッカー) を 1 行記録し、期間・ティッカーで
+絞り込んだ実行分だけを展開できる (replay.py から使う)。
+"""
+
+import datetime
+import gzip
+import json
+import os
+import pathlib
+import threading
+from collections.abc import Iterator
+
+from src.utils import DATA_DIR, setup_logger
+
+logger = setup_logger(__name__)
+
+ARCHIVE_DIR = DATA_DIR / "archive"
+
+# "0" にするとアーカイブしない
+ARCHIVE_ENABLED = os.environ.get("XBOT_ARCHIVE", "1") != "0"
+ARCHIVE_COMPRESSLEVEL = 6
+
+
+def _segment_name(ts: float) -> str:
+    day = datetime.datetime.fromtimestamp(ts, datetime.timezone.utc).strftime("%Y-%m-%d")
+    return f"{day}.jsonl.gz"
+
+
+def _item_tickers(kind: str, item: dict) -> list[str]:
+    if kind == "news":
+        return [item["ticker"]] if item.get("ticker") else []
+    return list(item.get("tickers", []))
+
+
+def _entry_key(entry: dict) -> tuple:
+    """実行分の同一性の判定に使うキー (セグメント内の位置は取り込み先で変わるため含めない)。"""
+    return entry["segment"], entry["fetched_at"], entry["news"], entry["reddit"]
+
+
+class SnapshotArchive:
+    """日別セグメント + 索引からなる追記専用アーカイブ。"""
+
+    def __init__(self, root: pathlib.Path = ARCHIVE_DIR) -> None:
+        self.root = pathlib.Path(root)
+        self._lock = threading.Lock()
+
+    @property
+    def index_path(self) -> pathlib.Path:
+        return self.root / "index.jsonl"
+
+    def _write(self, segment: str, payload: bytes, entry: dict) -> dict:
+        """gzip メンバーをセグメントに追記し、索引に 1 行加える (呼び出し側でロックすること)。"""
+        self.root.mkdir(parents=True, exist_ok=True)
+        path = self.root / segment
+        with open(path, "ab") as f:
+            offset = f.tell()
+            f.write(payload)
+        entry = {**entry, "segment": segment, "offset": offset, "length": len(payload)}
+        with open(self.index_path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(entry, ensure_ascii=False, sort_keys=True) + "\n")
+        return entry
+
+    def append(self, news: list[dict], reddit: list[dict], fetched_at: float) -> dict | None:
+        """1 回の実行分の新規項目を追記する。
+
+        Returns:
+            索引のエントリ (項目がなければ何もせず None)
+        """
+        if not news and not reddit:
+            return None
+        lines = [json.dumps({"kind": "news", "item": item}, ensure_ascii=False) for item in news]
+        lines += [json.dumps({"kind": "reddit", "item": item}, ensure_ascii=False) for item in reddit]
+        payload = gzip.compress(
+            ("\n".join(lines) + "\n").encode("utf-8"), compresslevel=ARCHIVE_COMPRESSLEVEL, mtime=0
+        )
+        tickers = sorted(
+            {t for item in news for t in _item_tickers("news", item)}
+            | {t for item in reddit for t in _item_tickers("reddit", item)}
+        )
+        entry = {"fetched_at": fetched_at, "news": len(news), "reddit": len(reddit), "tickers": tickers}
+        with self._lock:
+            return self._write(_segment_name(fetched_at), payload, entry)
+
+    def entries(
+        self,
+        start: float | None = None,
+        end: float | None = None,
+        tickers: set[str] | None = None,
+    ) -> list[dict]:
+        """start <= 取得時刻 < end の索引エントリ (取得時刻順)。tickers を指定するとそれを含む実行のみ。"""
+        if not self.index_path.exists():
+            return []
+        results = []
+        with open(self.index_path, encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                entry = json.loads(line)
+                if start is not None and entry["fetched_at"] < start:
+                    continue
+                if end is not None and entry["fetched_at"] >= end:
+                    continue
+                if tickers and tickers.isdisjoint(entry["tickers"]):
+                    continue
+                results.append(entry)
+        results.sort(key=lambda entry: entry["fetched_at"])
+        return results
+
+    def _read_payload(self, entry: dict) -> bytes:
+        with open(self.root / entry["segment"], "rb") as f:
+            f.seek(entry["offset"])
+            return f.read(entry["length"])
+
+    def read(self, entry: dict, tickers: set[str] | None = None) -> dict:
+        """索引エントリ 1 件分を展開する。
+
+        Returns:
+            {"fetched_at", "news", "reddit"}。tickers を指定するとそれに関連する項目のみ。
+        """
+        snapshot = {"fetched_at": entry["fetched_at"], "news": [], "reddit": []}
+        for line in gzip.decompress(self._read_payload(entry)).decode("utf-8").splitlines():
+            record = json.loads(line)
+            kind, item = record["kind"], record["item"]
+            if tickers and tickers.isdisjoint(_item_tickers(kind, item)):
+                continue
+            snapshot[kind].append(item)
+        return snapshot
+
+    def snapshots(
+        self,
+        start: float | None = None,
+        end: float | None = None,
+        tickers: set[str] | None = None,
+    ) -> Iterator[dict]:
+        """期間内の実行分を取得時刻順に展開して返す。"""
+        for entry in self.entries(start, end, tickers):
+            yield self.read(entry, tickers)
+
+    def absorb(self, other_root: pathlib.Path) -> int:
+        """別のアーカイブ (シャードのアーカイブ) の実行分を、展開せずにそのまま取り込む。
+
+        取り込み済みの実行分 (取得時刻・件数・セグメントが同じもの) は飛ばすため、
+        途中で落ちた統合をやり直しても二重にならない。
+
+        Returns:
+            取り込んだ実行分の件数
+        """
+        other = SnapshotArchive(other_root)
+        entries = other.entries()
+        added = 0
+        with self._lock:
+            known = {_entry_key(entry) for entry in self.entries()}
+            for entry in entries:
+                if _entry_key(entry) in known:
+                    continue
+                payload = other._read_payload(entry)
+                meta = {k: v for k, v in entry.items() if k not in ("segment", "offset", "length")}
+                self._write(entry["segment"], payload, meta)
+                added += 1
+        return added
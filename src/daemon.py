@@ -0,0 +1,179 @@
+"""常駐モード — ソースごとに適応的な間隔でポーリングし、新着があればパイプラインを実行する。
+
+クライアント・フォント・処理済み ID はプロセス内に保持したまま周回する。
+ポーリング間隔は米国市場の取引時間中は短く、新着のないソースほど長くなる。
+"""
+
+import datetime
+import os
+import signal
+import threading
+import time
+from collections.abc import Callable
+from zoneinfo import ZoneInfo
+
+from src import news_fetcher
+from src.utils import ProcessedIdStore, load_processed_ids, setup_logger
+
+logger = setup_logger(__name__)
+
+MARKET_TZ = ZoneInfo("America/New_York")
+MARKET_OPEN = datetime.time(9, 30)
+MARKET_CLOSE = datetime.time(16, 0)
+
+# ポーリング間隔 (秒): 取引時間中 / 時間外 / 上限
+POLL_MARKET_SEC = float(os.environ.get("XBOT_POLL_MARKET_SEC", "300"))
+POLL_OFF_HOURS_SEC = float(os.environ.get("XBOT_POLL_OFF_HOURS_SEC", "1800"))
+POLL_MAX_SEC = float(os.environ.get("XBOT_POLL_MAX_SEC", "7200"))
+# 新着がなかったソースの間隔を何倍に延ばすか
+POLL_BACKOFF = 2.0
+
+REDDIT_SOURCE = "reddit"
+
+
+def is_market_hours(now: float) -> bool:
+    """米国市場の通常取引時間 (平日 9:30〜16:00 ET) か。祝日は考慮しない。"""
+    local = datetime.datetime.fromtimestamp(now, MARKET_TZ)
+    return local.weekday() < 5 and MARKET_OPEN <= local.time() < MARKET_CLOSE
+
+
+def next_market_open(now: float) -> float:
+    """now より後の直近の取引開始時刻 (UNIX 秒)。"""
+    day = datetime.datetime.fromtimestamp(now, MARKET_TZ).date()
+    for offset in range(8):
+        date = day + datetime.timedelta(days=offset)
+        if date.weekday() >= 5:
+            continue
+        opening = datetime.datetime.combine(date, MARKET_OPEN, MARKET_TZ).timestamp()
+        if opening > now:
+            return opening
+    raise AssertionError("unreachable")
+
+
+class AdaptivePoller:
+    """ソースごとの次回ポーリング時刻を管理する。
+
+    新着がなければ間隔を backoff 倍に延ばし (max_interval まで)、新着があれば基本間隔に戻す。
+    時間外に延ばした間隔は取引開始時刻で打ち切る。
+    """
+
+    def __init__(
+        self,
+        sources: list[str],
+        market_interval: float = POLL_MARKET_SEC,
+        off_hours_interval: float = POLL_OFF_HOURS_SEC,
+        max_interval: float = POLL_MAX_SEC,
+        backoff: float = POLL_BACKOFF,
+    ) -> None:
+        self.market_interval = market_interval
+        self.off_hours_interval = off_hours_interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self._factor = {source: 1.0 for source in sources}
+        # 初回は全ソースを取得する
+        self._next = {source: 0.0 for source in sources}
+
+    def due(self, now: float) -> list[str]:
+        """ポーリング時刻を過ぎたソース。"""
+        return [source for source, at in self._next.items() if at <= now]
+
+    def record(self, source: str, changed: bool, now: float) -> float:
+        """ポーリング結果を記録し、次回までの間隔 (秒) を返す。"""
+        if changed:
+            self._factor[source] = 1.0
+        else:
+            limit = self.max_interval / self.market_interval
+            self._factor[source] = min(self._factor[source] * self.backoff, limit)
+
+        market = is_market_hours(now)
+        base = self.market_interval if market else self.off_hours_interval
+        next_at = now + min(base * self._factor[source], self.max_interval)
+        if not market:
+            next_at = min(next_at, next_market_open(now))
+        self._next[source] = next_at
+        return next_at - now
+
+    def next_wakeup(self) -> float:
+        return min(self._next.values())
+
+
+def _news_source(batch: tuple[str, ...]) -> str:
+    return "news:" + ",".join(batch)
+
+
+def _changed_sources(ctx: dict, source_of: dict[str, str]) -> set[str]:
+    """パイプラインの実行結果から、新着のあったソースを返す。
+
+    ニュースは記事の取得元フィードで判定する (どのティッカーにも帰属しない記事も新着に数える)。
+
+    Args:
+        source_of: RSS バッチの URL → そのバッチのソース名
+    """
+    selected = ctx.get("select")
+    if not selected:
+        return set()
+    changed = {
+        source_of[feed]
+        for item in selected["news"]
+        for feed in item.get("feeds", [])
+        if feed in source_of
+    }
+    if selected["reddit"]:
+        changed.add(REDDIT_SOURCE)
+    return changed
+
+
+def run_daemon(
+    run_cycle: Callable[..., dict],
+    max_cycles: int | None = None,
+    store: ProcessedIdStore | None = None,
+) -> None:
+    """SIGINT / SIGTERM を受けるまで、期限の来たソースだけを取得してパイプラインを実行し続ける。
+
+    Args:
+        run_cycle: store, tickers, reddit を受け取り、パイプラインの ctx を返す関数 (main.run)
+        max_cycles: 実行するパイプラインの回数の上限 (None なら無制限)
+        store: 処理済み ID ストア (None ならファイルから読み込む)。周回をまたいでメモリに保持する。
+    """
+    store = load_processed_ids() if store is None else store
+    # RSS はバッチ (複数シンボルの 1 リクエスト) ごとに 1 ソースとして扱う
+    batches = news_fetcher.feed_batches()
+    source_of = {news_fetcher.batch_url(batch): _news_source(batch) for batch in batches}
+    sources = [_news_source(batch) for batch in batches] + [REDDIT_SOURCE]
+    poller = AdaptivePoller(sources)
+
+    stop = threading.Event()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(sig, lambda signum, frame: stop.set())
+
+    logger.info("常駐モード開始 (ソース %d 件)", len(sources))
+    cycles = 0
+    while not stop.is_set():
+        due = poller.due(time.time())
+        if due:
+            tickers = [
+                ticker
+                for source in due
+                if source.startswith("news:")
+                for ticker in source.split(":", 1)[1].split(",")
+            ]
+            store.advance()
+            try:
+                ctx = run_cycle(store=store, tickers=tickers, reddit=REDDIT_SOURCE in due)
+            except Exception:
+                logger.exception("パイプラインの実行に失敗しました")
+                ctx = {}
+
+            changed = _changed_sources(ctx, source_of)
+            now = time.time()
+            for source in due:
+                poller.record(source, source in changed, now)
+            logger.info("周回完了: 取得 %d ソース / 新着 %d ソース", len(due), len(changed))
+
+            cycles += 1
+            if max_cycles is not None and cycles >= max_cycles:
+                break
+
+        stop.wait(max(1.0, poller.next_wakeup() - time.time()))
+
+    logger.info("常駐モードを終了します")
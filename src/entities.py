@@ -0,0 +1,102 @@
+"""ティッカーの言及抽出 — キャッシュタグ・シンボル・社名/別名をトークン単位のトライで照合する。"""
+
+import re
+from collections import Counter
+
+# 単独で現れても英単語と区別できないシンボル。本文中では $XXX 形式のみ言及とみなす。
+# (2 文字以下のシンボルも同様に扱う。universe.json の "ambiguous" で個別に指定することもできる)
+COMMON_WORD_SYMBOLS = frozenset(
+    "ALL ARE BIG CAN CAR CAT DD EAT EV FOR FUN GO HAS HE IT KEY LOVE LOW NEW NOW "
+    "ON ONE OPEN OUT PLAY REAL RUN SEE SO TV TWO WELL YOU AI CEO DTE ATH YOLO IPO".split()
+)
+
+# "AT&T" や "BRK.B" は 1 トークン、"TSLA's" は "TSLA" + "s" に分ける
+_TOKEN_RE = re.compile(r"\$?\w+(?:[&.-]\w+)*")
+
+# トライのノードで、その位置で終わるパターンの一覧を保持するキー (トークンは空にならない)
+_TERMINAL = ""
+
+
+def _is_ambiguous(symbol: str, info: dict) -> bool:
+    if "ambiguous" in info:
+        return bool(info["ambiguous"])
+    return len(symbol) <= 2 or symbol in COMMON_WORD_SYMBOLS
+
+
+class EntityMatcher:
+    """ユニバースの全パターンをトークン列のトライにまとめた照合器。
+
+    本文を一度トークン化し、パターンの先頭になりうるトークン位置からだけトライを辿って
+    最長一致を取るので、照合時間はパターン数によらず本文の長さにほぼ比例する。
+
+    照合するパターン:
+        - キャッシュタグ ($NVDA、大文字小文字を問わない)
+        - シンボル単独 (NVDA、大文字のみ。曖昧なシンボルは除く)
+        - 社名・別名 (NVIDIA / Google、大文字小文字を問わない。複数語も可)
+    """
+
+    def __init__(self, universe: dict[str, dict]) -> None:
+        self._root: dict = {}
+        for symbol, info in universe.items():
+            self._add(("$" + symbol.lower(),), symbol, None)
+            if not _is_ambiguous(symbol, info):
+                self._add((symbol.lower(),), symbol, symbol)
+            for name in (info.get("name", ""), *info.get("aliases", [])):
+                tokens = tuple(t.lower() for t in _TOKEN_RE.findall(name))
+                if tokens:
+                    self._add(tokens, symbol, None)
+
+    def _add(self, tokens: tuple[str, ...], symbol: str, exact: str | None) -> None:
+        node = self._root
+        for token in tokens:
+            node = node.setdefault(token, {})
+        node.setdefault(_TERMINAL, []).append((symbol, exact))
+
+    def mentions(self, text: str) -> Counter:
+        """本文中のティッカーごとの言及回数 (初出順)。"""
+        counts: Counter = Counter()
+        if not text:
+            return counts
+        tokens = _TOKEN_RE.findall(text)
+        lowered = [t.lower() for t in tokens]
+        root = self._root
+        n = len(tokens)
+        next_free = 0
+        for i in [i for i, token in enumerate(lowered) if token in root]:
+            if i < next_free:
+                continue
+            node = root[lowered[i]]
+            best, end = None, i
+            j = i
+            while node is not None:
+                if _TERMINAL in node:
+                    best, end = node[_TERMINAL], j
+                j += 1
+                node = node.get(lowered[j]) if j < n else None
+            if best is None:
+                continue
+            # シンボル単独の一致は大文字表記のときだけ (例: 小文字の "nvda" は数えない)
+            symbols = list(
+                dict.fromkeys(symbol for symbol, exact in best if exact is None or tokens[i] == exact)
+            )
+            if symbols:
+                counts.update(symbols)
+                next_free = end + 1
+        return counts
+
+
+def tag_items(
+    items: list[dict],
+    matcher: EntityMatcher,
+    fields: tuple[str, ...] = ("title", "selftext"),
+) -> list[dict]:
+    """各項目に言及回数 ("mentions": ティッカー → 回数) と
+    言及ティッカー ("tickers": 言及回数の多い順) を付与する (items を直接更新して返す)。
+    """
+    for item in items:
+        counts: Counter = Counter()
+        for field in fields:
+            counts.update(matcher.mentions(item.get(field, "")))
+        item["mentions"] = dict(counts)
+        item["tickers"] = [ticker for ticker, _ in counts.most_common()]
+    return items
@@ -1,12 +1,24 @@
 """Pillow による OGP / Twitter Card 画像生成。"""
 
+from __future__ import annotations
+
+import concurrent.futures
+import functools
+import multiprocessing
+import os
 import pathlib
+import threading
+from typing import TYPE_CHECKING
 
-from PIL import Image, ImageDraw, ImageFont
 from tenacity import retry, stop_after_attempt, wait_exponential
 
+from src.metrics import record_retry
+from src.text_layout import LINE_SPACING, FontMetrics, get_metrics, load_font, wrap_text
 from src.utils import setup_logger
 
+if TYPE_CHECKING:
+    from PIL import Image, ImageDraw
+
 logger = setup_logger(__name__)
 
 # Twitter Card 推奨サイズ
@@ -19,26 +31,99 @@ BEARISH_BG = (190, 30, 45)     # 赤基調
 TEXT_COLOR = (255, 255, 255)
 SUB_TEXT_COLOR = (220, 220, 220)
 
+# 理由テキストの開始位置、傾向表示の位置、理由テキストの下に空ける余白 (px)
+REASON_Y = 420
+TREND_Y = HEIGHT - 60
+REASON_BOTTOM_MARGIN = 16
+
+# PNG のパレット色数 (背景色 + 文字のアンチエイリアス階調に十分な数)
+PNG_COLORS = 64
+
+CARD_MAX_WORKERS = os.cpu_count() or 1
+
+# 描画用プロセスプール。実行をまたいで使い回し、各プロセスのテンプレートとフォントを温存する。
+_pool: concurrent.futures.ProcessPoolExecutor | None = None
+# 複数スレッド (再分析のワーカーなど) から同時に呼ばれても、プールを 1 つだけ作るためのロック
+_pool_lock = threading.Lock()
+
+# プールは取得スレッド (タイムアウト後も動き続けるものを含む) が動いている最中に作るため、fork は使わない。
+# ロックを保持したスレッドごと複製されると、子プロセスがそのロック (logging など) で固まりうる。
+_START_METHOD = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+
+
+@functools.lru_cache(maxsize=None)
+def _base_template(sentiment: str) -> Image.Image:
+    """センチメントごとの共通部分 (背景・ラベル・区切り線) を描画したテンプレート。"""
+    from PIL import Image, ImageDraw
+
+    bg_color = BULLISH_BG if sentiment == "BULLISH" else BEARISH_BG
+    emoji = "\u2191 BULLISH" if sentiment == "BULLISH" else "\u2193 BEARISH"
+
+    img = Image.new("RGB", (WIDTH, HEIGHT), bg_color)
+    draw = ImageDraw.Draw(img)
+
+    # センチメントラベル
+    font_sentiment = load_font(60)
+    bbox = draw.textbbox((0, 0), emoji, font=font_sentiment)
+    sw = bbox[2] - bbox[0]
+    draw.text(((WIDTH - sw) / 2, 280), emoji, fill=TEXT_COLOR, font=font_sentiment)
+
+    # 区切り線
+    line_y = 380
+    draw.line([(100, line_y), (WIDTH - 100, line_y)], fill=SUB_TEXT_COLOR, width=2)
+    return img
+
 
-def _load_font(size: int) -> ImageFont.FreeTypeFont | ImageFont.ImageFont:
-    """利用可能なフォントを読み込む。見つからなければデフォルトフォントを返す。"""
-    candidates = [
-        "/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf",
-        "/usr/share/fonts/TTF/DejaVuSans-Bold.ttf",
-        "/System/Library/Fonts/Helvetica.ttc",
-    ]
-    for path in candidates:
-        if pathlib.Path(path).exists():
-            return ImageFont.truetype(path, size)
-    return ImageFont.load_default()
+def _render_card(ticker: str, sentiment: str, reason: str, trend: str = "") -> Image.Image:
+    """テンプレートの複製にティッカー・理由テキスト・傾向表示を描画する。"""
+    from PIL import ImageDraw
+
+    img = _base_template(sentiment).copy()
+    draw = ImageDraw.Draw(img)
+
+    # ティッカーシンボル (大きく中央上部)
+    font_ticker = load_font(120)
+    ticker_text = f"${ticker}"
+    bbox = draw.textbbox((0, 0), ticker_text, font=font_ticker)
+    tw = bbox[2] - bbox[0]
+    draw.text(((WIDTH - tw) / 2, 100), ticker_text, fill=TEXT_COLOR, font=font_ticker)
 
+    # 理由テキスト (折り返し。傾向表示、なければ下端の余白に掛からない行数まで)
+    metrics_reason = get_metrics(32, body=True)
+    bottom = (TREND_Y if trend else HEIGHT) - REASON_BOTTOM_MARGIN
+    _draw_wrapped_text(draw, reason, metrics_reason, SUB_TEXT_COLOR, 80, REASON_Y, WIDTH - 160, bottom)
 
-@retry(stop=stop_after_attempt(2), wait=wait_exponential(multiplier=1, min=1, max=5))
+    # 過去の判定の傾向 (下部中央)
+    if trend:
+        font_trend = load_font(28)
+        bbox = draw.textbbox((0, 0), trend, font=font_trend)
+        draw.text(((WIDTH - (bbox[2] - bbox[0])) / 2, TREND_Y), trend, fill=SUB_TEXT_COLOR, font=font_trend)
+    return img
+
+
+def _save_png(img: Image.Image, output_path: pathlib.Path) -> None:
+    """パレット化 (減色) した上で最適化 PNG として保存する。
+
+    カードは単色背景 + アンチエイリアス付きの文字だけなので、少色数でも見た目は変わらない。
+    """
+    from PIL import Image
+
+    img.quantize(colors=PNG_COLORS, method=Image.Quantize.FASTOCTREE).save(
+        str(output_path), optimize=True
+    )
+
+
+@retry(
+    stop=stop_after_attempt(2),
+    wait=wait_exponential(multiplier=1, min=1, max=5),
+    before_sleep=record_retry,
+)
 def generate_card(
     ticker: str,
     sentiment: str,
     reason: str,
     output_path: str | pathlib.Path,
+    trend: str = "",
 ) -> pathlib.Path:
     """センチメントカード画像を生成して保存する。
 
@@ -47,6 +132,7 @@ def generate_card(
         sentiment: "BULLISH" or "BEARISH"
         reason: 短い解説テキスト
         output_path: 保存先パス
+        trend: 過去の判定の傾向表示 (例: "7D ↑5 ↓2 (+0.43)")。空なら描画しない。
 
     Returns:
         保存先の Path オブジェクト
@@ -54,65 +140,71 @@ def generate_card(
     output_path = pathlib.Path(output_path)
     output_path.parent.mkdir(parents=True, exist_ok=True)
 
-    bg_color = BULLISH_BG if sentiment == "BULLISH" else BEARISH_BG
-    emoji = "\u2191 BULLISH" if sentiment == "BULLISH" else "\u2193 BEARISH"
+    _save_png(_render_card(ticker, sentiment, reason, trend), output_path)
+    logger.info("画像生成完了: %s", output_path)
+    return output_path
 
-    img = Image.new("RGB", (WIDTH, HEIGHT), bg_color)
-    draw = ImageDraw.Draw(img)
 
-    # ティッカーシンボル (大きく中央上部)
-    font_ticker = _load_font(120)
-    ticker_text = f"${ticker}"
-    bbox = draw.textbbox((0, 0), ticker_text, font=font_ticker)
-    tw = bbox[2] - bbox[0]
-    draw.text(((WIDTH - tw) / 2, 100), ticker_text, fill=TEXT_COLOR, font=font_ticker)
+def _generate_card_safe(card: tuple) -> pathlib.Path | None:
+    """generate_cards のワーカー。失敗してもログに記録して None を返す。"""
+    try:
+        return generate_card(*card)
+    except Exception:
+        logger.exception("画像生成に失敗 (ticker=%s)", card[0])
+        return None
 
-    # センチメントラベル
-    font_sentiment = _load_font(60)
-    bbox = draw.textbbox((0, 0), emoji, font=font_sentiment)
-    sw = bbox[2] - bbox[0]
-    draw.text(((WIDTH - sw) / 2, 280), emoji, fill=TEXT_COLOR, font=font_sentiment)
 
-    # 区切り線
-    line_y = 380
-    draw.line([(100, line_y), (WIDTH - 100, line_y)], fill=SUB_TEXT_COLOR, width=2)
+def generate_cards(
+    cards: list[tuple],
+    max_workers: int = CARD_MAX_WORKERS,
+) -> list[pathlib.Path | None]:
+    """複数のカードをまとめて生成する。
 
-    # 理由テキスト (折り返し)
-    font_reason = _load_font(32)
-    _draw_wrapped_text(draw, reason, font_reason, SUB_TEXT_COLOR, 80, 420, WIDTH - 160)
+    2 枚以上ある場合はプロセスプールで並列に描画する (各プロセスがテンプレートとフォントを保持)。
+    プールは初回に max_workers プロセスで生成し、以降の呼び出しでも再利用する。
 
-    img.save(str(output_path), quality=95)
-    logger.info("画像生成完了: %s", output_path)
-    return output_path
+    Args:
+        cards: (ticker, sentiment, reason, output_path[, trend]) のリスト
+        max_workers: 最大プロセス数
+
+    Returns:
+        入力と同じ順の保存先パス。失敗したカードは None。
+    """
+    cards = [(t, s, r, pathlib.Path(p), *rest) for t, s, r, p, *rest in cards]
+    workers = min(max_workers, len(cards))
+    if workers <= 1:
+        return [_generate_card_safe(card) for card in cards]
+
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = concurrent.futures.ProcessPoolExecutor(
+                max_workers=max_workers, mp_context=multiprocessing.get_context(_START_METHOD)
+            )
+        pool = _pool
+    try:
+        return list(pool.map(_generate_card_safe, cards))
+    except concurrent.futures.BrokenExecutor:
+        # ワーカーが異常終了したプールは使えないので、次回は作り直す (他のスレッドが作り直し済みなら何もしない)
+        with _pool_lock:
+            if _pool is pool:
+                _pool = None
+        raise
 
 
 def _draw_wrapped_text(
     draw: ImageDraw.ImageDraw,
     text: str,
-    font: ImageFont.FreeTypeFont | ImageFont.ImageFont,
+    metrics: FontMetrics,
     fill: tuple,
     x: int,
     y: int,
     max_width: int,
+    bottom: int | None = None,
 ) -> None:
-    """テキストを max_width 内で折り返して描画する。"""
-    words = list(text)
-    lines: list[str] = []
-    current_line = ""
-
-    for char in words:
-        test = current_line + char
-        bbox = draw.textbbox((0, 0), test, font=font)
-        if bbox[2] - bbox[0] <= max_width:
-            current_line = test
-        else:
-            if current_line:
-                lines.append(current_line)
-            current_line = char
-
-    if current_line:
-        lines.append(current_line)
-
-    line_height = draw.textbbox((0, 0), "あ", font=font)[3] + 8
-    for i, line in enumerate(lines):
-        draw.text((x, y + i * line_height), line, fill=fill, font=font)
+    """テキストを max_width 内で折り返して描画する。bottom を指定するとそれより下にはみ出す行は省略する。"""
+    max_lines = None
+    if bottom is not None:
+        max_lines = max(0, int((bottom - y + LINE_SPACING) // metrics.line_height))
+    for i, line in enumerate(wrap_text(text, metrics, max_width, max_lines)):
+        draw.text((x, y + i * metrics.line_height), line, fill=fill, font=metrics.font)
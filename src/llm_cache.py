@@ -0,0 +1,112 @@
+"""LLM 応答のディスクキャッシュ (入力内容のハッシュをキーとする)。"""
+
+import hashlib
+import json
+import pathlib
+import threading
+import time
+
+from src.utils import setup_logger
+
+logger = setup_logger(__name__)
+
+PROJECT_ROOT = pathlib.Path(__file__).resolve().parent.parent
+CACHE_DIR = PROJECT_ROOT / ".cache" / "llm"
+
+CACHE_MAX_ENTRIES = 2000
+CACHE_MAX_AGE_DAYS = 30
+
+
+class CacheMissError(RuntimeError):
+    """キャッシュ専用モードでキャッシュに該当がなかった。"""
+
+
+class ResponseCache:
+    """検証済みの LLM 応答を 1 キー 1 ファイルで保存するキャッシュ。
+
+    件数が max_entries を超えたら古いものから、max_age_days を過ぎたものは読み出し時に削除する。
+    """
+
+    def __init__(
+        self,
+        cache_dir: pathlib.Path = CACHE_DIR,
+        max_entries: int = CACHE_MAX_ENTRIES,
+        max_age_days: float = CACHE_MAX_AGE_DAYS,
+    ) -> None:
+        self.cache_dir = pathlib.Path(cache_dir)
+        self.max_entries = max_entries
+        self.max_age_sec = max_age_days * 86400
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(model: str, system_prompt: str, text: str, temperature: float) -> str:
+        payload = json.dumps([model, system_prompt, text, temperature], ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> pathlib.Path:
+        return self.cache_dir / f"{key}.json"
+
+    def _count(self, hit: bool) -> None:
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def get(self, key: str) -> dict | None:
+        """キャッシュ済みの結果を返す。なければ (または期限切れなら) None。"""
+        path = self._path(key)
+        try:
+            with open(path, encoding="utf-8") as f:
+                entry = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            self._count(hit=False)
+            return None
+
+        if time.time() - entry["created"] > self.max_age_sec:
+            path.unlink(missing_ok=True)
+            self._count(hit=False)
+            return None
+
+        self._count(hit=True)
+        return entry["result"]
+
+    def put(self, key: str, result: dict) -> None:
+        """結果を保存し、上限を超えていれば古いエントリを削除する。"""
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        path = self._path(key)
+        tmp_path = path.with_suffix(".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"created": time.time(), "result": result}, f, ensure_ascii=False)
+        tmp_path.replace(path)
+        self.evict()
+
+    def evict(self) -> int:
+        """期限切れのエントリと、上限を超えた古いエントリを削除する。
+
+        Returns:
+            削除した件数
+        """
+        if not self.cache_dir.exists():
+            return 0
+        entries = sorted(
+            ((p.stat().st_mtime, p) for p in self.cache_dir.glob("*.json")),
+            key=lambda e: e[0],
+        )
+        cutoff = time.time() - self.max_age_sec
+        excess = len(entries) - self.max_entries
+        removed = 0
+        for mtime, path in entries:
+            if mtime >= cutoff and removed >= excess:
+                break
+            path.unlink(missing_ok=True)
+            removed += 1
+        if removed:
+            logger.info("LLM キャッシュを %d 件削除", removed)
+        return removed
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses}
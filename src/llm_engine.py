@@ -1,15 +1,53 @@
 """Google Gen AI SDK integration — Gemini 2.0 Flash."""
 
+from __future__ import annotations
+
 import json
 import os
-
-from google import genai
-from tenacity import retry, stop_after_attempt, wait_exponential
-
+import threading
+from typing import TYPE_CHECKING
+
+from src.llm_cache import CacheMissError, ResponseCache
+from src.metrics import current as current_metrics
+from src.pipeline import DaemonThreadPoolExecutor
+from src.prompt_builder import estimate_tokens
+from src.rate_limit import RateLimiter
+from src.resilience import deadline, resilient
 from src.utils import setup_logger
 
+if TYPE_CHECKING:
+    from google import genai
+
 logger = setup_logger(__name__)
 
+MODEL = "gemini-2.0-flash"
+TEMPERATURE = 0.7
+
+# "1" のときはキャッシュのみを参照し、Gemini を呼ばない (オフライン再実行用)
+CACHE_ONLY = os.environ.get("XBOT_LLM_CACHE_ONLY") == "1"
+
+# Gemini のクォータ (無料枠: 15 RPM / 1,000,000 TPM)
+GEMINI_RPM = int(os.environ.get("XBOT_GEMINI_RPM", "15"))
+GEMINI_TPM = int(os.environ.get("XBOT_GEMINI_TPM", "1000000"))
+ANALYZE_MAX_WORKERS = 8
+
+response_cache = ResponseCache()
+rate_limiter = RateLimiter(rpm=GEMINI_RPM, tpm=GEMINI_TPM)
+
+
+def share_quota(workers: int) -> None:
+    """Gemini のクォータを workers 個のプロセスで分け合うよう、このプロセスの枠を 1/workers にする。
+
+    分割実行の各シャードは別プロセスで同じ API キーを使うため、枠を分けないと合計が上限を越える。
+    """
+    global rate_limiter
+    rate_limiter = RateLimiter(rpm=GEMINI_RPM / workers, tpm=GEMINI_TPM / workers)
+
+
+# プロセス内で使い回す Client (リトライやデーモンの周回ごとに作り直さない)
+_client: genai.Client | None = None
+_client_lock = threading.Lock()
+
 SYSTEM_PROMPT = """\
 あなたは経験20年超の辛口・日本人株式アナリストです。
 米国株のニュースや Reddit の投稿を読み、短く鋭い日本語コメントを生成してください。
@@ -34,27 +72,93 @@ SYSTEM_PROMPT = """\
 
 def _create_client() -> genai.Client:
     """環境変数から API キーを取得して Client を生成する。"""
+    from google import genai
+
     api_key = os.environ.get("GOOGLE_API_KEY", "")
     if not api_key:
         raise RuntimeError("GOOGLE_API_KEY が設定されていません")
     return genai.Client(api_key=api_key)
 
 
-@retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=2, min=2, max=30))
-def analyze(text: str) -> dict:
+def _get_client() -> genai.Client:
+    """共有の Client を返す。初回呼び出し時に生成する。"""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = _create_client()
+        return _client
+
+
+def analyze(text: str, cache_only: bool | None = None) -> dict:
     """ニュース/Reddit テキストを Gemini に渡し、構造化された分析結果を返す。
 
+    同じ入力 (モデル・システムプロンプト・本文・temperature) の検証済み結果が
+    キャッシュにあれば、Gemini を呼ばずにそれを返す。
+
+    Args:
+        text: 入力テキスト
+        cache_only: True ならキャッシュに無い場合 CacheMissError を送出する
+            (None のときは環境変数 XBOT_LLM_CACHE_ONLY に従う)
+
     Returns:
         dict: {"post_text": str, "sentiment": str, "reason": str}
     """
-    client = _create_client()
+    key = ResponseCache.make_key(MODEL, SYSTEM_PROMPT, text, TEMPERATURE)
+    cached = response_cache.get(key)
+    if cached is not None:
+        logger.info("Gemini 応答キャッシュにヒット (key=%s)", key[:12])
+        return cached
+
+    if cache_only is None:
+        cache_only = CACHE_ONLY
+    if cache_only:
+        raise CacheMissError(f"キャッシュ専用モードでキャッシュ未登録の入力 (key={key[:12]})")
+
+    result = _generate(text)
+    response_cache.put(key, result)
+    return result
+
+
+def analyze_many(inputs: dict[str, str], max_workers: int = ANALYZE_MAX_WORKERS) -> dict[str, dict]:
+    """複数の入力 (キー → テキスト) を並列に分析する。
+
+    各呼び出しはクォータ用のレートリミッターを通る。失敗したキーはログに記録して結果から除く。
+
+    Returns:
+        dict: キー → analyze() の結果
+    """
+    results: dict[str, dict] = {}
+    with DaemonThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="gemini") as executor:
+        futures = {key: executor.submit(analyze, text) for key, text in inputs.items()}
+
+    for key, future in futures.items():
+        try:
+            results[key] = future.result()
+        except Exception:
+            logger.exception("LLM 分析に失敗 (key=%s)", key)
+    return results
+
+
+# 応答内容の検証エラー (ValueError) は再試行するが、接続先の障害としては数えない
+@resilient("gemini", ignore=(ValueError,))
+def _generate(text: str) -> dict:
+    """Gemini を呼び出し、応答を検証して返す。"""
+    from google import genai
+
+    # クォータ待ちも実行全体の期限を越えない (越えるなら呼ばずに DeadlineExceeded)
+    waited = rate_limiter.acquire(estimate_tokens(SYSTEM_PROMPT) + estimate_tokens(text), deadline=deadline())
+    if waited:
+        logger.info("Gemini クォータ待ち: %.1f 秒", waited)
+
+    current_metrics().incr("llm.requests")
+    client = _get_client()
 
     response = client.models.generate_content(
-        model="gemini-2.0-flash",
+        model=MODEL,
         contents=text,
         config=genai.types.GenerateContentConfig(
             system_instruction=SYSTEM_PROMPT,
-            temperature=0.7,
+            temperature=TEMPERATURE,
         ),
     )
 
@@ -1,56 +1,153 @@
-"""Entry point — RSS → 重複チェック → Reddit → LLM → 画像生成 → レポート → X 投稿。"""
+"""Entry point — (RSS ∥ Reddit) → 重複チェック → LLM → (画像生成 → レポート ∥ X 投稿)。"""
 
+import argparse
 import datetime
+import json
+import os
 import pathlib
 import sys
-
-from src.image_gen import generate_card
-from src.llm_engine import analyze
-from src.news_fetcher import fetch_news
-from src.reddit_loader import fetch_posts
+import time
+from collections import Counter
+
+from src import report_index, resilience, sharding
+from src.archive import ARCHIVE_ENABLED, SnapshotArchive
+from src.daemon import run_daemon
+from src.entities import tag_items
+from src.image_gen import generate_cards
+from src.llm_engine import analyze_many, response_cache, share_quota
+from src.metrics import RunMetrics, profiling, start_run
+from src.metrics import current as current_metrics
+from src.near_dup import collapse_near_duplicates
+from src.news_fetcher import commit_feed_cache, discard_feed_validators, fetch_news, ticker_matcher
+from src.outbox import Outbox
+from src.pipeline import Pipeline, Stage, StopPipeline
+from src.prompt_builder import build_prompt
+from src.reddit_loader import commit_reddit_cursors, discard_reddit_cursors, fetch_posts
+from src.sentiment import triage
+from src.timeseries import TimeSeriesStore, format_trend
 from src.utils import (
+    ProcessedIdStore,
+    current_shard,
     is_duplicate,
     load_processed_ids,
     save_processed_ids,
+    set_shard,
     setup_logger,
+    shard_dir,
+    shard_path,
 )
-from src.x_client import post_tweet
 
 logger = setup_logger(__name__)
 
 PROJECT_ROOT = pathlib.Path(__file__).resolve().parent.parent
 REPORTS_DIR = PROJECT_ROOT / "reports"
+PROFILE_DIR = PROJECT_ROOT / ".cache" / "profile"
 
+# ティッカーごとの分析結果の履歴と、レポート・カードに表示する傾向の集計期間 (日)
+timeseries_store = TimeSeriesStore()
+TREND_DAYS = (7, 30)
 
-def _today_str() -> str:
-    return datetime.datetime.now(datetime.timezone.utc).strftime("%Y-%m-%d")
+# 実行ごとの新規項目 (生データ) のアーカイブ (replay.py で再分析に使う)
+snapshot_archive = SnapshotArchive()
 
+# X 投稿の送信キュー (常駐モードでは送信間隔の計測を実行間で引き継ぐ)
+outbox = Outbox()
+# 投稿ステージのタイムアウトより手前で送信を打ち切る余裕 (秒)
+POST_DEADLINE_MARGIN_SEC = 5.0
 
-def _build_llm_input(news_items: list[dict], reddit_items: list[dict]) -> str:
-    """ニュースと Reddit 投稿を LLM に渡す入力テキストに整形する。"""
-    parts: list[str] = []
+# Reddit のリスティング ("hot" または "new")。"new" ではサブレディットごとに増分取得する。
+REDDIT_LISTING = os.environ.get("XBOT_REDDIT_LISTING", "hot")
+REDDIT_POST_LIMIT = int(os.environ.get("XBOT_REDDIT_LIMIT", "10"))
 
-    if news_items:
-        parts.append("## Yahoo Finance ニュース")
-        for item in news_items[:10]:
-            parts.append(f"- [{item['ticker']}] {item['title']}")
-            if item["summary"]:
-                parts.append(f"  {item['summary'][:200]}")
+# 分析モード: "blended" (全件を 1 回で分析) または "per_ticker" (ティッカーごとに並列分析)
+ANALYSIS_MODE = os.environ.get("XBOT_ANALYSIS_MODE", "blended")
 
-    if reddit_items:
-        parts.append("\n## Reddit 注目投稿")
-        for item in reddit_items[:10]:
-            parts.append(f"- [r/{item['subreddit']}] {item['title']} (score: {item['score']})")
-            if item["selftext"]:
-                parts.append(f"  {item['selftext'][:200]}")
+# per_ticker モードで、ニュースがなくても Reddit の言及回数がこれ以上なら分析対象にする
+REDDIT_MIN_MENTIONS = int(os.environ.get("XBOT_REDDIT_MIN_MENTIONS", "3"))
 
-    return "\n".join(parts)
+
+def _today_str() -> str:
+    return datetime.datetime.now(datetime.timezone.utc).strftime("%Y-%m-%d")
 
 
-def _append_report(date_str: str, ticker: str, analysis: dict, image_path: pathlib.Path) -> pathlib.Path:
-    """レポートを reports/YYYY-MM-DD.md に追記する。"""
-    report_path = REPORTS_DIR / f"{date_str}.md"
-    REPORTS_DIR.mkdir(parents=True, exist_ok=True)
+def _commit_source_state() -> None:
+    """取得元ごとの差分取得状態 (RSS 検証子・Reddit カーソル) を保存する。"""
+    commit_feed_cache()
+    commit_reddit_cursors()
+
+
+def _discard_source_state(tickers: set[str] | None = None, subreddits: set[str] | None = None) -> None:
+    """今回の差分取得状態のうち、未処理の項目を運んだ分を保存しないことにする (None なら全件)。"""
+    discard_feed_validators(tickers)
+    discard_reddit_cursors(subreddits)
+
+
+def _mention_counts(new_news: list[dict], new_reddit: list[dict]) -> Counter:
+    """ティッカーごとの注目度 (ニュース件数 + Reddit での言及回数)。ニュースのティッカーが先に並ぶ。"""
+    counts: Counter = Counter()
+    for item in new_news:
+        counts.update(item["tickers"])
+    for item in new_reddit:
+        counts.update(item.get("mentions", {}))
+    return counts
+
+
+def _build_llm_inputs(
+    new_news: list[dict], new_reddit: list[dict], active: list[str] | None = None
+) -> dict[str, str]:
+    """分析単位 (ティッカー) → LLM 入力テキストを返す。
+
+    active (ローカルの一次判定でシグナルのあったティッカー) を指定した場合、
+    per_ticker モードではそれ以外のティッカーを分析せず、blended モードでは
+    active が空なら分析しない (いずれも空の dict を返す)。
+
+    per_ticker モードでは、ニュースのあるティッカーと Reddit で REDDIT_MIN_MENTIONS 回以上
+    言及されたティッカーをそれぞれ分析する。各ティッカーにはそのティッカーのニュース
+    (複数ティッカーに関連する記事はそれぞれに含める) と、そのティッカーに言及した投稿・
+    どのティッカーにも言及していない投稿を添える。
+    blended モードでは全件を 1 つの入力にし、最も注目度の高いティッカー (なければ "MKT") に帰属させる。
+    """
+    counts = _mention_counts(new_news, new_reddit)
+    if active is not None and not active:
+        return {}
+    if ANALYSIS_MODE == "per_ticker" and counts:
+        news_tickers = {ticker for item in new_news for ticker in item["tickers"]}
+        targets = {}
+        for ticker, count in counts.items():
+            if ticker not in news_tickers and count < REDDIT_MIN_MENTIONS:
+                continue
+            if active is not None and ticker not in active:
+                continue
+            news_items = [item for item in new_news if ticker in item["tickers"]]
+            posts = [item for item in new_reddit if not item.get("tickers") or ticker in item["tickers"]]
+            targets[ticker] = (news_items, posts, ticker)
+    else:
+        ticker = counts.most_common(1)[0][0] if counts else "MKT"
+        targets = {ticker: (new_news, new_reddit, None)}
+
+    inputs: dict[str, str] = {}
+    for ticker, (news_items, posts, focus) in targets.items():
+        inputs[ticker], prompt_metrics = build_prompt(news_items, posts, ticker=focus)
+        current_metrics().set(f"prompt.{ticker}", prompt_metrics)
+        logger.info("LLM 入力 (%s): %s", ticker, prompt_metrics)
+    return inputs
+
+
+def _append_report(
+    date_str: str,
+    ticker: str,
+    analysis: dict,
+    image_path: pathlib.Path,
+    trend: str = "",
+    reports_dir: pathlib.Path | None = None,
+) -> pathlib.Path:
+    """レポートを reports/YYYY-MM-DD.md (reports_dir 指定時はその下) に追記する。
+
+    同じ内容を索引生成用に reports/YYYY-MM-DD.jsonl にも 1 行追記する (report_index.py が読む)。
+    """
+    reports_dir = reports_dir or REPORTS_DIR
+    report_path = reports_dir / f"{date_str}.md"
+    reports_dir.mkdir(parents=True, exist_ok=True)
 
     # ファイルが存在しなければヘッダーを書く
     if not report_path.exists():
@@ -58,10 +155,12 @@ def _append_report(date_str: str, ticker: str, analysis: dict, image_path: pathl
         report_path.write_text(header, encoding="utf-8")
 
     sentiment_emoji = "\U0001f402" if analysis["sentiment"] == "BULLISH" else "\U0001f43b"
+    trend_line = f"**Trend:** {trend}\n\n" if trend else ""
     entry = (
         f"## ${ticker} {sentiment_emoji} {analysis['sentiment']}\n\n"
         f"**Post:**\n> {analysis['post_text']}\n\n"
         f"**Reason:** {analysis['reason']}\n\n"
+        f"{trend_line}"
         f"**Image:** `{image_path.name}`\n\n"
         f"---\n\n"
     )
@@ -69,87 +168,410 @@ def _append_report(date_str: str, ticker: str, analysis: dict, image_path: pathl
     with open(report_path, "a", encoding="utf-8") as f:
         f.write(entry)
 
+    record = {
+        "date": date_str,
+        "ticker": ticker,
+        "sentiment": analysis["sentiment"],
+        "post_text": analysis["post_text"],
+        "reason": analysis["reason"],
+        "trend": trend,
+        "image": image_path.name,
+        "ts": time.time(),
+    }
+    with open(reports_dir / f"{date_str}.jsonl", "a", encoding="utf-8") as f:
+        f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
     logger.info("レポート追記: %s", report_path)
     return report_path
 
 
-def run() -> None:
-    """メインパイプラインを実行する。"""
-    date_str = _today_str()
-    logger.info("=== xbot 実行開始 (%s) ===", date_str)
+# ステージごとの制限時間 (秒)。合計が 1 回の実行時間の上限になる。
+STAGE_TIMEOUTS = {
+    "fetch_news": 120.0,
+    "fetch_reddit": 120.0,
+    "analyze": 300.0,
+    "render": 120.0,
+    "post": 60.0,
+}
+
+
+def _stage_load_state(ctx: dict) -> ProcessedIdStore:
+    """常駐モードではメモリ上のストアを使い、ファイルを読み直さない。"""
+    if "store" in ctx:
+        return ctx["store"]
+    return load_processed_ids()
 
-    # 1. 処理済み ID をロード
-    processed_ids = load_processed_ids()
-    logger.info("処理済み ID: %d 件", len(processed_ids))
 
-    # 2. RSS ニュース取得
-    news_items = fetch_news()
+def _stage_fetch_news(ctx: dict) -> list[dict]:
+    tickers = ctx.get("tickers")
+    if tickers is not None and not tickers:
+        return []
+    news_items = fetch_news(tickers)
+    ctx["metrics"].incr("items.news", len(news_items))
     logger.info("RSS ニュース: %d 件取得", len(news_items))
+    return news_items
 
-    # 3. 重複除外
-    new_news = [item for item in news_items if not is_duplicate(item["id"], processed_ids)]
-    logger.info("新規ニュース: %d 件 (重複除外後)", len(new_news))
 
-    if not new_news:
-        logger.info("新規ニュースなし。Reddit のみで分析を試みます。")
+def _stage_fetch_reddit(ctx: dict) -> list[dict]:
+    if not ctx.get("reddit", True):
+        return []
+    reddit_items = fetch_posts(limit=REDDIT_POST_LIMIT, listing=REDDIT_LISTING)
+    ctx["metrics"].incr("items.reddit", len(reddit_items))
+    return reddit_items
 
-    # 4. Reddit 投稿取得
-    reddit_items: list[dict] = []
-    try:
-        reddit_items = fetch_posts(limit=10)
-    except Exception:
-        logger.exception("Reddit 取得に失敗。ニュースのみで続行します。")
 
-    new_reddit = [item for item in reddit_items if not is_duplicate(item["id"], processed_ids)]
+def _stage_tag_reddit(ctx: dict) -> list[dict]:
+    """Reddit 投稿に言及ティッカーと言及回数を付与する。"""
+    reddit_items = tag_items(ctx["fetch_reddit"], ticker_matcher())
+    ctx["metrics"].incr("items.reddit_tagged", sum(1 for item in reddit_items if item["tickers"]))
+    return reddit_items
+
+
+def _stage_select(ctx: dict) -> dict:
+    """重複除外と類似記事の統合。処理対象がなければパイプラインを終了する。"""
+    processed_ids = ctx["load_state"]
+
+    new_news = [item for item in ctx["fetch_news"] if not is_duplicate(item["id"], processed_ids)]
+    new_news = collapse_near_duplicates(new_news)
+    new_reddit = [item for item in ctx["tag_reddit"] if not is_duplicate(item["id"], processed_ids)]
+    ctx["metrics"].incr("items.new_news", len(new_news))
+    ctx["metrics"].incr("items.new_reddit", len(new_reddit))
+    logger.info("新規ニュース: %d 件 (重複除外・類似記事統合後)", len(new_news))
+    logger.info("新規 Reddit 投稿: %d 件", len(new_reddit))
 
-    # 5. 処理対象がなければ終了
     if not new_news and not new_reddit:
-        logger.info("処理対象なし。終了します。")
+        _commit_source_state()
+        raise StopPipeline("処理対象なし")
+    return {"news": new_news, "reddit": new_reddit}
+
+
+def _stage_archive(ctx: dict) -> dict | None:
+    """今回の新規項目を統合前の形でアーカイブする。
+
+    triage は項目に採点結果を書き込むため、このステージの完了後に実行する。
+    """
+    if not ARCHIVE_ENABLED:
+        return None
+    processed_ids = ctx["load_state"]
+    news = [item for item in ctx["fetch_news"] if not is_duplicate(item["id"], processed_ids)]
+    reddit = [item for item in ctx["tag_reddit"] if not is_duplicate(item["id"], processed_ids)]
+    entry = snapshot_archive.append(news, reddit, fetched_at=time.time())
+    if entry:
+        ctx["metrics"].incr("archive.bytes", entry["length"])
+    return entry
+
+
+def _stage_triage(ctx: dict) -> dict:
+    """ローカルの辞書スコアで項目を絞り込み、ティッカーごとの一次判定を記録する。"""
+    selected = ctx["select"]
+    result = triage(selected["news"], selected["reddit"])
+    ctx["metrics"].set("triage", {"tickers": result["tickers"], "active": result["active"]})
+    logger.info("一次判定: %s (Gemini 対象: %s)", result["tickers"], result["active"] or "なし")
+    return result
+
+
+def _stage_build_prompt(ctx: dict) -> dict[str, str]:
+    """LLM 入力を組み立てる。シグナルのあるティッカーがなければ Gemini を呼ばずに終了する。"""
+    triaged = ctx["triage"]
+    inputs = _build_llm_inputs(triaged["news"], triaged["reddit"], triaged["active"])
+    if not inputs:
+        # 静かな時間帯: 今回の項目は処理済みとし、次回以降に再度採点しない
+        selected = ctx["select"]
+        save_processed_ids(ctx["load_state"], _processed_ids(selected["news"], selected["reddit"]))
+        _commit_source_state()
+        ctx["metrics"].incr("llm.skipped_quiet")
+        raise StopPipeline("有意なシグナルなし (Gemini 呼び出しを省略)")
+    return inputs
+
+
+def _stage_analyze(ctx: dict) -> dict[str, dict]:
+    analyses = analyze_many(ctx["build_prompt"])
+    ctx["metrics"].set("llm_cache", response_cache.stats())
+    logger.info("LLM 応答キャッシュ: %s", response_cache.stats())
+    if not analyses:
+        raise RuntimeError("全ての LLM 分析に失敗")
+    return analyses
+
+
+def _stage_record(ctx: dict) -> dict[str, str]:
+    """分析結果を時系列ストアに追記し、ティッカー → 傾向表示 (TREND_DAYS ごとの集計) を返す。"""
+    local = ctx["triage"]["tickers"]
+    now = time.time()
+    trends: dict[str, str] = {}
+    for ticker, analysis in ctx["analyze"].items():
+        sizes = ctx["metrics"].values.get(f"prompt.{ticker}", {})
+        timeseries_store.append(
+            ticker,
+            analysis["sentiment"],
+            local_score=local.get(ticker, {}).get("score"),
+            news_items=sizes.get("selected_news", 0),
+            reddit_items=sizes.get("selected_reddit", 0),
+            prompt_tokens=sizes.get("tokens", 0),
+            ts=now,
+        )
+        trends[ticker] = format_trend([timeseries_store.summary(ticker, days, now) for days in TREND_DAYS])
+    return trends
+
+
+def _card_path(date_str: str, ticker: str) -> pathlib.Path:
+    """カード画像の保存先。
+
+    分割実行ではファイル名にシャード番号を付ける (blended モードの "MKT" など、
+    複数のシャードが同じティッカーのカードを作っても統合で上書きし合わないように)。
+    """
+    shard = current_shard()
+    suffix = f"_{shard[0]}-of-{shard[1]}" if shard else ""
+    return REPORTS_DIR / f"{date_str}_{ticker}{suffix}.png"
+
+
+def _stage_render(ctx: dict) -> list[pathlib.Path | None]:
+    date_str = ctx["date_str"]
+    return generate_cards(
+        [
+            (
+                ticker,
+                analysis["sentiment"],
+                analysis["reason"],
+                _card_path(date_str, ticker),
+                ctx["record"].get(ticker, ""),
+            )
+            for ticker, analysis in ctx["analyze"].items()
+        ]
+    )
+
+
+def _stage_report(ctx: dict) -> None:
+    for (ticker, analysis), image_path in zip(ctx["analyze"].items(), ctx["render"]):
+        if image_path is None:
+            logger.warning("画像なしでレポートを生成します (%s)", ticker)
+            image_path = pathlib.Path("N/A")
+        _append_report(ctx["date_str"], ticker, analysis, image_path, ctx["record"].get(ticker, ""))
+
+
+def _stage_index(ctx: dict) -> list[pathlib.Path]:
+    """追記した判定を索引・集計ページに反映する (分割実行ではシャードの統合時に行う)。"""
+    if current_shard() is not None:
+        return []
+    return report_index.build(REPORTS_DIR)
+
+
+def _processed_ids(news: list[dict], reddit: list[dict]) -> list[str]:
+    """処理済みとして記録する ID (統合されたニュースは統合元すべて)。"""
+    return [i for item in news for i in item["ids"]] + [item["id"] for item in reddit]
+
+
+def _stage_save_state(ctx: dict) -> None:
+    processed_ids = ctx["load_state"]
+    selected = ctx["select"]
+
+    # 分析に失敗したティッカーのニュース・投稿は次回再試行できるよう処理済みにしない
+    # (それらを運んだフィードの検証子・サブレディットのカーソルも進めない)
+    failed_tickers = set(ctx["build_prompt"]) - set(ctx["analyze"])
+    done_news = [item for item in selected["news"] if failed_tickers.isdisjoint(item["tickers"])]
+    done_reddit = [item for item in selected["reddit"] if failed_tickers.isdisjoint(item["tickers"])]
+    if failed_tickers:
+        failed_subreddits = {
+            item["subreddit"] for item in selected["reddit"] if not failed_tickers.isdisjoint(item["tickers"])
+        }
+        _discard_source_state(failed_tickers, failed_subreddits)
+        logger.warning(
+            "分析に失敗したティッカー %s の項目は次回再試行します (サブレディット: %s)",
+            sorted(failed_tickers),
+            sorted(failed_subreddits) or "なし",
+        )
+    new_ids = _processed_ids(done_news, done_reddit)
+    save_processed_ids(processed_ids, new_ids)
+    _commit_source_state()
+    logger.info("処理済み ID 更新: +%d 件 (合計 %d 件)", len(new_ids), len(processed_ids))
+
+
+def _stage_post(ctx: dict) -> None:
+    """分析結果をカード画像付きで送信キューに積み、期限内に送れる分だけ送る。
+
+    レート制限で送れなかった投稿はキューに残り、次回の実行で送られる。
+    分割実行のシャードは積むだけで送らない (統合後にまとめて送る)。
+    """
+    stage_deadline = time.monotonic() + STAGE_TIMEOUTS["post"]
+    deadline = min(stage_deadline, resilience.deadline()) - POST_DEADLINE_MARGIN_SEC
+    for (ticker, analysis), image_path in zip(ctx["analyze"].items(), ctx["render"]):
+        outbox.enqueue(analysis["post_text"], ticker=ticker, media_path=image_path)
+    if current_shard() is not None:
         return
+    counts = outbox.drain(deadline)
+    logger.info(
+        "X 投稿: 送信 %d 件 / 再試行待ち %d 件 / 破棄 %d 件 (キュー残り %d 件)",
+        counts["posted"],
+        counts["retry"],
+        counts["dropped"],
+        counts["remaining"],
+    )
+
+
+def _no_images(ctx: dict) -> list[None]:
+    return [None] * len(ctx["analyze"])
+
+
+def build_pipeline() -> Pipeline:
+    """RSS と Reddit の取得、レポート保存と X 投稿 (画像生成後) をそれぞれ並行に実行するパイプライン。
+
+    - Reddit 取得の失敗は致命的ではない (ニュースのみで続行)
+    - ローカルの一次判定で有意なシグナルがなければ Gemini を呼ばずに終了する
+    - LLM 分析の失敗は実行を中断する (レポートを作れないため)
+    - 時系列の記録・画像生成の失敗はそれぞれ傾向表示なし・画像なしで、X 投稿の失敗はスキップして続行する
+    - X 投稿は送信キュー経由で、レート制限で送れなかった分は次回に持ち越す
+    """
+    return Pipeline(
+        [
+            Stage("load_state", _stage_load_state),
+            Stage("fetch_news", _stage_fetch_news, timeout=STAGE_TIMEOUTS["fetch_news"]),
+            Stage(
+                "fetch_reddit",
+                _stage_fetch_reddit,
+                timeout=STAGE_TIMEOUTS["fetch_reddit"],
+                fallback=lambda ctx: [],
+            ),
+            Stage("tag_reddit", _stage_tag_reddit, deps=("fetch_reddit",)),
+            Stage("select", _stage_select, deps=("load_state", "fetch_news", "tag_reddit")),
+            Stage("archive", _stage_archive, deps=("select",), fallback=lambda ctx: None),
+            Stage("triage", _stage_triage, deps=("select", "archive")),
+            Stage("build_prompt", _stage_build_prompt, deps=("triage",)),
+            Stage("analyze", _stage_analyze, deps=("build_prompt",), timeout=STAGE_TIMEOUTS["analyze"]),
+            Stage("record", _stage_record, deps=("analyze",), fallback=lambda ctx: {}),
+            Stage(
+                "render",
+                _stage_render,
+                deps=("record",),
+                timeout=STAGE_TIMEOUTS["render"],
+                fallback=_no_images,
+            ),
+            Stage("report", _stage_report, deps=("render",)),
+            Stage("save_state", _stage_save_state, deps=("report",)),
+            Stage("index", _stage_index, deps=("report",), fallback=lambda ctx: []),
+            Stage(
+                "post",
+                _stage_post,
+                deps=("render",),
+                timeout=STAGE_TIMEOUTS["post"],
+                fallback=lambda ctx: None,
+            ),
+        ]
+    )
 
-    # 6. LLM 入力を構築して分析
-    llm_input = _build_llm_input(new_news, new_reddit)
-    logger.info("LLM 入力テキスト長: %d 文字", len(llm_input))
 
+def run(
+    store: ProcessedIdStore | None = None,
+    tickers: list[str] | None = None,
+    reddit: bool = True,
+) -> dict:
+    """メインパイプラインを実行し、計測値を reports/YYYY-MM-DD_metrics.jsonl に追記する。
+
+    Args:
+        store: メモリ上に保持している処理済み ID (常駐モード)。None ならファイルから読み込む。
+        tickers: ニュースを取得するティッカー (None なら全件、空なら取得しない)
+        reddit: False なら Reddit を取得しない
+
+    Returns:
+        パイプラインの ctx (ステージ名 → 結果)
+    """
+    metrics = start_run()
+    ctx = {"date_str": _today_str(), "metrics": metrics, "tickers": tickers, "reddit": reddit}
+    if store is not None:
+        ctx["store"] = store
     try:
-        analysis = analyze(llm_input)
-    except Exception:
-        logger.exception("LLM 分析に失敗。終了します。")
-        return
+        with profiling(PROFILE_DIR):
+            _run_pipeline(ctx, metrics)
+    finally:
+        metrics.write(REPORTS_DIR / f"{_today_str()}_metrics.jsonl")
+    return ctx
+
 
-    # ティッカーを特定 (ニュースがあれば先頭、なければ "MKT")
-    ticker = new_news[0]["ticker"] if new_news else "MKT"
+def _run_pipeline(ctx: dict, metrics: RunMetrics) -> None:
+    logger.info("=== xbot 実行開始 (%s) ===", ctx["date_str"])
 
-    # 7. 画像生成
-    image_path = REPORTS_DIR / f"{date_str}_{ticker}.png"
+    deadline = resilience.begin_run()
     try:
-        generate_card(ticker, analysis["sentiment"], analysis["reason"], image_path)
-    except Exception:
-        logger.exception("画像生成に失敗。レポートは画像なしで続行します。")
-        image_path = pathlib.Path("N/A")
+        status = build_pipeline().run(ctx, metrics, deadline=deadline)
+    finally:
+        metrics.set("network", resilience.summary())
+    metrics.set("pipeline_status", status)
+
+    if status == "aborted":
+        # 常駐モードで次の周回に未処理の取得状態が保存されないよう捨てる
+        _discard_source_state()
+        logger.error("パイプラインを中断しました。")
+        return
+    logger.info("=== xbot 実行完了 (%s) ===", status)
 
-    # 8. レポート追記 (ゼロコスト成果物)
-    _append_report(date_str, ticker, analysis, image_path)
 
-    # 9. 処理済み ID を更新・保存
-    new_ids = [item["id"] for item in new_news] + [item["id"] for item in new_reddit]
-    processed_ids.extend(new_ids)
-    save_processed_ids(processed_ids)
-    logger.info("処理済み ID 更新: +%d 件 (合計 %d 件)", len(new_ids), len(processed_ids))
+def configure_shard(index: int, count: int) -> None:
+    """この実行をシャード index/count として構成する。
+
+    状態・時系列・送信キュー・レポートの書き込み先をシャード専用のディレクトリに切り替える
+    (共有の状態と時系列の履歴は読み取りにのみ使う)。Gemini のクォータは count 個のシャードで等分する。
+    """
+    global REPORTS_DIR, outbox, snapshot_archive, timeseries_store
+    set_shard(index, count)
+    share_quota(count)
+    REPORTS_DIR = shard_dir(REPORTS_DIR)
+    snapshot_archive = SnapshotArchive(shard_path(snapshot_archive.root))
+    outbox = Outbox(shard_path(outbox.path))
+    timeseries_store = TimeSeriesStore(shard_path(timeseries_store.root), base=timeseries_store.root)
+    logger.info("シャード %d/%d として実行します", index, count)
 
-    # 10. X に投稿 (失敗してもクラッシュしない)
-    posted = post_tweet(analysis["post_text"])
-    if posted:
-        logger.info("X 投稿完了")
-    else:
-        logger.info("X 投稿スキップ (レポートは正常に保存済み)")
 
-    logger.info("=== xbot 実行完了 ===")
+def merge_and_post(count: int) -> dict[str, int]:
+    """シャード 0〜count-1 の結果を統合して索引を更新し、積まれた投稿を送る。"""
+    totals = sharding.merge_shards(count, REPORTS_DIR, outbox, timeseries_store, snapshot_archive)
+    report_index.build(REPORTS_DIR)
+    outbox.drain(time.monotonic() + STAGE_TIMEOUTS["post"])
+    return totals
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="米国株ニュースを分析してレポート・X 投稿を生成する")
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument(
+        "--daemon",
+        action="store_true",
+        help="常駐し、ソースごとに適応的な間隔でポーリングし続ける",
+    )
+    mode.add_argument(
+        "--shard",
+        metavar="I/N",
+        help="N 分割のうちシャード I だけを処理し、結果をシャード専用のディレクトリに書く",
+    )
+    mode.add_argument(
+        "--workers",
+        type=int,
+        metavar="N",
+        help="N 個のシャードを別プロセスで並行に実行し、結果を統合してから投稿する",
+    )
+    mode.add_argument(
+        "--merge",
+        type=int,
+        metavar="N",
+        help="シャード 0〜N-1 の結果を統合してから投稿する (シャードを別ジョブで実行した場合)",
+    )
+    args = parser.parse_args()
     try:
-        run()
+        if args.daemon:
+            run_daemon(run)
+        elif args.shard:
+            try:
+                shard = sharding.parse_shard(args.shard)
+            except ValueError as e:
+                parser.error(str(e))
+            configure_shard(*shard)
+            run()
+        elif args.workers:
+            codes = sharding.run_workers(args.workers)
+            merge_and_post(args.workers)
+            if any(codes):
+                sys.exit(1)
+        elif args.merge:
+            merge_and_post(args.merge)
+        else:
+            run()
     except Exception:
         logger.exception("予期しないエラーが発生しました")
         sys.exit(1)
@@ -0,0 +1,154 @@
+"""実行ごとの計測 — ステージ別の所要時間・リトライ回数・転送量・ピークメモリ。"""
+
+import contextlib
+import datetime
+import json
+import os
+import pathlib
+import sys
+import threading
+import time
+
+from src.utils import setup_logger
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+logger = setup_logger(__name__)
+
+# "cprofile" または "tracemalloc" を指定すると実行全体をプロファイルする
+PROFILE_MODE = os.environ.get("XBOT_PROFILE", "")
+
+
+def peak_rss_mb() -> float | None:
+    """プロセスのピーク RSS (MB)。取得できない環境では None。"""
+    if resource is None:
+        return None
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux は KB、macOS は bytes 単位
+    return maxrss / (1024 * 1024) if sys.platform == "darwin" else maxrss / 1024
+
+
+class RunMetrics:
+    """1 回の実行分の計測値。複数スレッドから更新できる。"""
+
+    def __init__(self) -> None:
+        self.started_at = datetime.datetime.now(datetime.timezone.utc)
+        self._started = time.perf_counter()
+        self.stages: dict[str, dict] = {}
+        self.counters: dict[str, float] = {}
+        self.values: dict[str, object] = {}
+        self._lock = threading.Lock()
+
+    @contextlib.contextmanager
+    def stage(self, name: str, stop: tuple[type[BaseException], ...] = ()):
+        """with ブロックの所要時間と成否をステージ name として記録する。
+
+        stop に含まれる例外 (処理対象なしなどの正常な早期終了) は "error" ではなく "stopped" とする。
+        """
+        start = time.perf_counter()
+        status = "ok"
+        try:
+            yield
+        except stop:
+            status = "stopped"
+            raise
+        except BaseException:
+            status = "error"
+            raise
+        finally:
+            with self._lock:
+                self.stages[name] = {
+                    "wall_sec": round(time.perf_counter() - start, 4),
+                    "status": status,
+                }
+
+    def incr(self, key: str, amount: float = 1) -> None:
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + amount
+
+    def set(self, key: str, value: object) -> None:
+        with self._lock:
+            self.values[key] = value
+
+    def to_dict(self) -> dict:
+        with self._lock:
+            return {
+                "started_at": self.started_at.isoformat(timespec="seconds"),
+                "wall_sec": round(time.perf_counter() - self._started, 4),
+                "peak_rss_mb": peak_rss_mb(),
+                "stages": dict(self.stages),
+                "counters": dict(self.counters),
+                "values": dict(self.values),
+            }
+
+    def write(self, path: pathlib.Path) -> None:
+        """計測値を JSON Lines ファイルに 1 行追記する。"""
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(self.to_dict(), ensure_ascii=False) + "\n")
+        logger.info("計測値を保存: %s", path)
+
+
+_current = RunMetrics()
+
+
+def current() -> RunMetrics:
+    """実行中の計測オブジェクトを返す。"""
+    return _current
+
+
+def start_run() -> RunMetrics:
+    """新しい実行の計測を開始する。"""
+    global _current
+    _current = RunMetrics()
+    return _current
+
+
+def record_retry(retry_state) -> None:
+    """tenacity の before_sleep フック。関数ごとのリトライ回数を数える。"""
+    _current.incr(f"retries.{retry_state.fn.__name__}")
+
+
+@contextlib.contextmanager
+def profiling(output_dir: pathlib.Path, mode: str = PROFILE_MODE):
+    """mode に応じて cProfile / tracemalloc で with ブロックをプロファイルする。"""
+    if mode not in ("cprofile", "tracemalloc"):
+        yield
+        return
+
+    import cProfile
+    import pstats
+    import tracemalloc
+
+    output_dir.mkdir(parents=True, exist_ok=True)
+    stamp = datetime.datetime.now(datetime.timezone.utc).strftime("%Y%m%dT%H%M%S")
+
+    if mode == "cprofile":
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            yield
+        finally:
+            profiler.disable()
+            path = output_dir / f"{stamp}.prof"
+            profiler.dump_stats(str(path))
+            pstats.Stats(profiler).sort_stats("cumulative").print_stats(20)
+            logger.info("cProfile 結果を保存: %s", path)
+        return
+
+    tracemalloc.start()
+    try:
+        yield
+    finally:
+        snapshot = tracemalloc.take_snapshot()
+        current_bytes, peak_bytes = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        path = output_dir / f"{stamp}_tracemalloc.txt"
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(f"current={current_bytes} peak={peak_bytes}\n")
+            for stat in snapshot.statistics("lineno")[:50]:
+                f.write(f"{stat}\n")
+        logger.info("tracemalloc 結果を保存: %s (peak %.1f MB)", path, peak_bytes / 1024 / 1024)
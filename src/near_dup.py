@@ -0,0 +1,145 @@
+"""複数ティッカーのフィードに重複して現れる記事 (転載・言い換え) をまとめる。"""
+
+import re
+
+from src.utils import setup_logger
+
+logger = setup_logger(__name__)
+
+# 単語 n-gram の n
+SHINGLE_SIZE = 3
+
+# MinHash の署名長 = BANDS × ROWS。LSH のバンドが 1 つでも一致したペアだけを比較する。
+BANDS = 8
+ROWS = 4
+NUM_PERM = BANDS * ROWS
+
+# 推定 Jaccard 係数がこれ以上なら同一記事とみなす
+SIMILARITY_THRESHOLD = 0.7
+
+# 正規化タイトルの一致だけで同一記事とみなすタイトルの最小語数
+# (空や "Stock update" のような短いタイトルは無関係な記事同士でも一致する)
+TITLE_MATCH_MIN_WORDS = 4
+
+_MASK = (1 << 32) - 1
+_EMPTY = _MASK + 1
+_BIN_WIDTH = (_MASK + 1) // NUM_PERM
+
+_TAG_RE = re.compile(r"<[^>]+>")
+_WORD_RE = re.compile(r"\w+")
+
+
+def normalize_title(title: str) -> str:
+    """比較用にタイトルを正規化する (小文字化・記号除去・空白の統一)。"""
+    return " ".join(_WORD_RE.findall(title.lower()))
+
+
+def _shingles(text: str) -> set[int]:
+    words = _WORD_RE.findall(_TAG_RE.sub(" ", text).lower())
+    if len(words) < SHINGLE_SIZE:
+        return {hash(w) & _MASK for w in words}
+    return {
+        hash(tuple(words[i : i + SHINGLE_SIZE])) & _MASK
+        for i in range(len(words) - SHINGLE_SIZE + 1)
+    }
+
+
+def _minhash(shingles: set[int]) -> tuple[int, ...]:
+    """One Permutation Hashing による MinHash 署名。
+
+    ハッシュ値を 1 回だけ計算し、値域を NUM_PERM 個のビンに分けて各ビンの最小値を取る。
+    空のビンは右隣 (循環) の空でないビンの値で埋める (rotation densification)。
+    """
+    sig = [_EMPTY] * NUM_PERM
+    for h in shingles:
+        h = (h * 0x9E3779B1) & _MASK
+        b = h // _BIN_WIDTH
+        v = h - b * _BIN_WIDTH
+        if v < sig[b]:
+            sig[b] = v
+    if not shingles:
+        return tuple(sig)
+    for i in range(NUM_PERM):
+        if sig[i] != _EMPTY:
+            continue
+        j, offset = i, 0
+        while sig[j] == _EMPTY:
+            j = (j + 1) % NUM_PERM
+            offset += 1
+        sig[i] = sig[j] + offset * _BIN_WIDTH
+    return tuple(sig)
+
+
+def _similarity(sig_a: tuple[int, ...], sig_b: tuple[int, ...]) -> float:
+    return sum(1 for x, y in zip(sig_a, sig_b) if x == y) / NUM_PERM
+
+
+def collapse_near_duplicates(
+    items: list[dict], threshold: float = SIMILARITY_THRESHOLD
+) -> list[dict]:
+    """ほぼ同一のニュースを 1 件にまとめる。
+
+    正規化タイトル (TITLE_MATCH_MIN_WORDS 語以上) が一致するもの、またはタイトル+概要の
+    MinHash 推定類似度が threshold 以上のものを同一記事とみなす。まとめた記事は最初に現れたものを代表とし、
+    以下のキーを追加する。
+        - tickers: 関連する全ティッカー (出現順)
+        - ids: まとめた全エントリの ID
+        - feeds: まとめた全エントリの取得元フィード (出現順)
+
+    Returns:
+        入力順を保った、まとめ後のニュース一覧
+    """
+    parent = list(range(len(items)))
+
+    def find(i: int) -> int:
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    def union(i: int, j: int) -> None:
+        ri, rj = find(i), find(j)
+        if ri != rj:
+            parent[max(ri, rj)] = min(ri, rj)
+
+    by_title: dict[str, int] = {}
+    buckets: dict[tuple, list[int]] = {}
+    signatures: list[tuple[int, ...]] = []
+
+    for i, item in enumerate(items):
+        title_key = normalize_title(item["title"])
+        if len(title_key.split()) >= TITLE_MATCH_MIN_WORDS:
+            union(by_title.setdefault(title_key, i), i)
+
+        shingles = _shingles(f"{item['title']} {item.get('summary', '')}")
+        sig = _minhash(shingles)
+        signatures.append(sig)
+        if not shingles:
+            continue
+        for band in range(BANDS):
+            key = (band, sig[band * ROWS : (band + 1) * ROWS])
+            for j in buckets.setdefault(key, []):
+                if find(i) != find(j) and _similarity(sig, signatures[j]) >= threshold:
+                    union(i, j)
+            buckets[key].append(i)
+
+    groups: dict[int, list[int]] = {}
+    for i in range(len(items)):
+        groups.setdefault(find(i), []).append(i)
+
+    results: list[dict] = []
+    for root in sorted(groups):
+        members = [items[i] for i in groups[root]]
+        merged = dict(members[0])
+        merged["tickers"] = list(
+            dict.fromkeys(t for m in members for t in m.get("tickers", [m["ticker"]] if m["ticker"] else []))
+        )
+        merged["ids"] = list(dict.fromkeys(i for m in members for i in m.get("ids", [m["id"]])))
+        merged["feeds"] = list(
+            dict.fromkeys(f for m in members for f in m.get("feeds", [m["feed"]] if m.get("feed") else []))
+        )
+        results.append(merged)
+
+    if len(results) < len(items):
+        logger.info("類似ニュースを統合: %d 件 → %d 件", len(items), len(results))
+    return results
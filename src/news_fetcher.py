@@ -1,69 +1,301 @@
 """Yahoo Finance RSS からニュースを取得する。"""
 
-import feedparser
-from tenacity import retry, stop_after_attempt, wait_exponential
+import calendar
+import concurrent.futures
+import functools
+import json
+import os
+import pathlib
+import time
+import urllib.error
+import urllib.request
+from email.message import Message
 
-from src.utils import setup_logger
+from src.entities import EntityMatcher
+from src.metrics import current as current_metrics
+from src.pipeline import DaemonThreadPoolExecutor
+from src.resilience import CircuitOpenError, remaining, resilient
+from src.utils import (
+    DATA_DIR,
+    load_json_state,
+    load_layered_json_state,
+    save_json_state,
+    setup_logger,
+    shard_path,
+    shard_slice,
+)
 
 logger = setup_logger(__name__)
 
-# 主要ティッカーごとの Yahoo Finance RSS URL
-TICKER_RSS = {
-    "NVDA": "https://feeds.finance.yahoo.com/rss/2.0/headline?s=NVDA&region=US&lang=en-US",
-    "AAPL": "https://feeds.finance.yahoo.com/rss/2.0/headline?s=AAPL&region=US&lang=en-US",
-    "TSLA": "https://feeds.finance.yahoo.com/rss/2.0/headline?s=TSLA&region=US&lang=en-US",
-    "MSFT": "https://feeds.finance.yahoo.com/rss/2.0/headline?s=MSFT&region=US&lang=en-US",
-    "AMZN": "https://feeds.finance.yahoo.com/rss/2.0/headline?s=AMZN&region=US&lang=en-US",
-    "GOOG": "https://feeds.finance.yahoo.com/rss/2.0/headline?s=GOOG&region=US&lang=en-US",
-    "META": "https://feeds.finance.yahoo.com/rss/2.0/headline?s=META&region=US&lang=en-US",
-}
-
-
-@retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=2, min=2, max=30))
-def _fetch_feed(url: str) -> list[dict]:
-    """単一の RSS フィードをパースしてエントリ一覧を返す。"""
-    feed = feedparser.parse(url)
+# 追跡するティッカーの一覧 (symbol / name / aliases)
+UNIVERSE_PATH = DATA_DIR / "universe.json"
+
+# 複数シンボルをまとめて取得する Yahoo Finance ヘッドライン RSS
+RSS_URL_TEMPLATE = "https://feeds.finance.yahoo.com/rss/2.0/headline?s={symbols}&region=US&lang=en-US"
+
+# 1 リクエストにまとめるシンボル数と、1 回の実行で送るリクエスト数の上限。
+# バッチ数が上限を超える場合は、最後に取得してから最も時間の経ったバッチから順に巡回する。
+FEED_BATCH_SIZE = int(os.environ.get("XBOT_FEED_BATCH_SIZE", "10"))
+FEED_REQUEST_BUDGET = int(os.environ.get("XBOT_FEED_REQUEST_BUDGET", "50"))
+
+# フィードごとの ETag / Last-Modified (条件付き GET 用) と最終取得時刻 (巡回用)
+FEED_CACHE_PATH = DATA_DIR / "feed_cache.json"
+
+# 並列取得の設定
+FETCH_MAX_WORKERS = 8
+FETCH_DEADLINE_SEC = 60.0
+HTTP_TIMEOUT_SEC = 15.0
+USER_AGENT = "xbot/1.0 (+https://github.com/kohei-yamawaki/xbot)"
+
+# 今回の実行で得た検証子。commit_feed_cache() で永続化する。
+_pending_validators: dict[str, dict] = {}
+
+
+def load_universe(path: pathlib.Path = UNIVERSE_PATH) -> dict[str, dict]:
+    """ティッカー一覧を読み込み、シンボル → {"name", "aliases", ...} を返す (ファイルの記載順)。"""
+    with open(path, encoding="utf-8") as f:
+        entries = json.load(f)
+    return {
+        entry["symbol"]: {key: value for key, value in entry.items() if key != "symbol"}
+        for entry in entries
+    }
+
+
+UNIVERSE = load_universe()
+
+
+def feed_batches(batch_size: int | None = None) -> list[tuple[str, ...]]:
+    """ユニバースを batch_size シンボルずつのバッチに分ける。
+
+    バッチの構成は実行をまたいで固定なので、バッチ URL ごとの検証子 (ETag) が使い回せる。
+    """
+    size = max(1, batch_size or FEED_BATCH_SIZE)
+    symbols = list(UNIVERSE)
+    return [tuple(symbols[i : i + size]) for i in range(0, len(symbols), size)]
+
+
+def shard_batches(
+    batches: list[tuple[str, ...]],
+    budget: int | None = None,
+    cache: dict[str, dict] | None = None,
+) -> list[tuple[str, ...]]:
+    """リクエスト予算に収まるよう、今回の実行で取得するバッチを選ぶ。
+
+    最後に取得してから最も時間の経ったバッチ (未取得のものが先) から budget 件を選ぶ。
+    取得時刻はフィードの検証子と一緒に保存するため、実行する時間帯に偏りがあっても
+    全バッチを順に巡回する。取得に失敗したバッチは取得時刻が進まず、次回も選ばれる。
+
+    Args:
+        batches: 全バッチ
+        budget: 1 回の実行のリクエスト数上限
+        cache: フィードの検証子 (バッチ URL → {"etag", "modified", "fetched_at"})
+
+    Returns:
+        選んだバッチ (batches の順)
+    """
+    budget = max(1, budget or FEED_REQUEST_BUDGET)
+    if len(batches) <= budget:
+        return batches
+    cache = cache or {}
+    oldest_first = sorted(
+        range(len(batches)), key=lambda i: cache.get(batch_url(batches[i]), {}).get("fetched_at", 0.0)
+    )
+    logger.info("RSS バッチ %d/%d 件を取得 (最終取得の古い順)", budget, len(batches))
+    return [batches[i] for i in sorted(oldest_first[:budget])]
+
+
+def batch_url(symbols: tuple[str, ...]) -> str:
+    return RSS_URL_TEMPLATE.format(symbols=",".join(symbols))
+
+
+@functools.lru_cache(maxsize=1)
+def ticker_matcher() -> EntityMatcher:
+    """ユニバース全体の言及照合器 (初回呼び出し時に構築する)。"""
+    return EntityMatcher(UNIVERSE)
+
+
+def _match_tickers(entry, symbols: tuple[str, ...]) -> list[str]:
+    """バッチのエントリがどのティッカーの記事かを判定する。
+
+    タイトルと概要で言及されているバッチ内のティッカーを返す。どれにも一致しなければ空
+    (バッチ内のどの銘柄の記事か分からないため、特定のティッカーには帰属させない)。
+    """
+    if len(symbols) == 1:
+        return list(symbols)
+    mentions = ticker_matcher().mentions(f"{entry.get('title', '')} {entry.get('summary', '')}")
+    return [symbol for symbol in symbols if symbol in mentions]
+
+
+def _http_get(url: str, headers: dict[str, str]) -> tuple[int, bytes, Message]:
+    """HTTP GET を行い (ステータス, 本文, ヘッダー) を返す。304 は例外にしない。"""
+    request = urllib.request.Request(url, headers={"User-Agent": USER_AGENT, **headers})
+    try:
+        with urllib.request.urlopen(request, timeout=HTTP_TIMEOUT_SEC) as response:
+            body = response.read()
+    except urllib.error.HTTPError as e:
+        if e.code == 304:
+            current_metrics().incr("rss.not_modified")
+            return 304, b"", e.headers
+        raise
+    current_metrics().incr("rss.bytes", len(body))
+    return response.status, body, response.headers
+
+
+@resilient("yahoo_rss")
+def _fetch_feed(url: str, validators: dict | None = None) -> tuple[list[dict] | None, dict]:
+    """単一の RSS フィードを条件付き GET で取得してエントリ一覧を返す。
+
+    Returns:
+        (エントリ一覧, 新しい検証子)。フィードが未更新 (304) ならエントリ一覧は None。
+    """
+    validators = validators or {}
+    headers: dict[str, str] = {}
+    if validators.get("etag"):
+        headers["If-None-Match"] = validators["etag"]
+    if validators.get("modified"):
+        headers["If-Modified-Since"] = validators["modified"]
+
+    status, body, response_headers = _http_get(url, headers)
+    if status == 304:
+        return None, validators
+
+    import feedparser
+
+    feed = feedparser.parse(body)
     if feed.bozo and not feed.entries:
         raise ConnectionError(f"RSS フィードの取得に失敗: {url}")
-    return feed.entries
 
+    new_validators = {
+        "etag": response_headers.get("ETag", ""),
+        "modified": response_headers.get("Last-Modified", ""),
+    }
+    return feed.entries, new_validators
+
+
+def _published_ts(entry) -> float | None:
+    """エントリの公開日時 (UTC の struct_time) を UNIX 秒に変換する。"""
+    parsed = entry.get("published_parsed") or entry.get("updated_parsed")
+    return float(calendar.timegm(parsed)) if parsed else None
+
+
+def commit_feed_cache() -> None:
+    """今回取得したフィードの検証子を保存する。
+
+    取得したエントリの処理が完了してから呼ぶこと。処理前に保存すると、
+    失敗した実行のエントリが次回 304 で読み飛ばされてしまう。
+    """
+    if not _pending_validators:
+        return
+    path = shard_path(FEED_CACHE_PATH)
+    cache = load_json_state(path, {})
+    cache.update(_pending_validators)
+    save_json_state(path, cache)
+    _pending_validators.clear()
+
+
+def discard_feed_validators(tickers: set[str] | None = None) -> None:
+    """今回取得したフィードのうち、tickers を含むバッチの検証子を保存しないことにする (None なら全件)。
+
+    処理できなかったエントリを運んだフィードの検証子を保存すると、次回 304 で読み飛ばされて
+    再試行されない。破棄すれば次回も同じエントリが返り、処理済みの分は重複除外で落ちる。
+    """
+    if tickers is None:
+        _pending_validators.clear()
+        return
+    for batch in feed_batches():
+        if not tickers.isdisjoint(batch):
+            _pending_validators.pop(batch_url(batch), None)
+
+
+def fetch_news(
+    tickers: list[str] | None = None,
+    max_workers: int = FETCH_MAX_WORKERS,
+    deadline: float = FETCH_DEADLINE_SEC,
+) -> list[dict]:
+    """ニュースをバッチ (複数シンボルの RSS) 単位で並列に取得する。
 
-def fetch_news(tickers: list[str] | None = None) -> list[dict]:
-    """指定ティッカー (デフォルト: 全件) のニュースを取得する。
+    tickers を省略した場合はユニバース全体のうち今回のシャードを取得する
+    (分割実行では担当シャードのバッチだけを対象に、さらに時間帯で巡回する)。
+    指定した場合はそれらを含むバッチをすべて取得する (バッチ内の他のティッカーの記事も返る)。
+    前回から更新のないフィード (304) はパースせずにスキップする。
+    deadline 秒以内に終わらなかったフィードは今回の実行では諦める。
 
     Returns:
-        list[dict]: 各要素は以下のキーを持つ。
+        list[dict]: 各要素は以下のキーを持つ。複数ティッカーに帰属する記事はティッカーごとに 1 件ずつ。
             - id: エントリの一意識別子 (link)
-            - ticker: ティッカーシンボル
+            - ticker: ティッカーシンボル (バッチ内のどの銘柄にも言及していない記事は None)
             - title: ニュースタイトル
             - link: 記事 URL
             - summary: 概要テキスト
+            - published: 公開日時 (UNIX 秒、不明なら None)
+            - feed: 取得元のフィード (バッチ) の URL
     """
-    targets = tickers or list(TICKER_RSS.keys())
+    batches = feed_batches()
+    cache = load_layered_json_state(FEED_CACHE_PATH)
+    if tickers is None:
+        targets = shard_batches(shard_slice(batches), cache=cache)
+    else:
+        wanted = set(tickers)
+        unknown = wanted - set(UNIVERSE)
+        if unknown:
+            logger.warning("未登録のティッカー: %s", sorted(unknown))
+        targets = [batch for batch in batches if wanted.intersection(batch)]
+
+    executor = DaemonThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="rss")
+    futures: dict[tuple[str, ...], concurrent.futures.Future] = {}
+    for batch in targets:
+        url = batch_url(batch)
+        futures[batch] = executor.submit(_fetch_feed, url, cache.get(url))
+    current_metrics().incr("rss.requests", len(futures))
+
+    # 実行全体の期限が先に来る場合はそちらで打ち切る
+    deadline = max(0.0, min(deadline, remaining()))
+    concurrent.futures.wait(futures.values(), timeout=deadline)
+    executor.shutdown(wait=False, cancel_futures=True)
+
     results: list[dict] = []
+    not_modified = 0
+    fetched_at = time.time()
 
-    for ticker in targets:
-        url = TICKER_RSS.get(ticker)
-        if not url:
-            logger.warning("未登録のティッカー: %s", ticker)
+    for batch, future in futures.items():
+        label = ",".join(batch)
+        if not future.done():
+            logger.warning("RSS 取得が期限 (%.0f 秒) 内に完了せず (tickers=%s)", deadline, label)
             continue
 
         try:
-            entries = _fetch_feed(url)
+            entries, validators = future.result()
+        except CircuitOpenError as e:
+            logger.warning("RSS 取得を省略 (tickers=%s): %s", label, e)
+            continue
         except Exception:
-            logger.exception("RSS 取得失敗 (ticker=%s)", ticker)
+            logger.exception("RSS 取得失敗 (tickers=%s)", label)
+            continue
+
+        url = batch_url(batch)
+        _pending_validators[url] = {**validators, "fetched_at": fetched_at}
+        if entries is None:
+            not_modified += 1
             continue
 
         for entry in entries:
-            results.append(
-                {
-                    "id": entry.get("link", entry.get("id", "")),
-                    "ticker": ticker,
-                    "title": entry.get("title", ""),
-                    "link": entry.get("link", ""),
-                    "summary": entry.get("summary", ""),
-                }
-            )
-
-    logger.info("ニュース取得完了: %d 件", len(results))
+            for ticker in _match_tickers(entry, batch) or [None]:
+                results.append(
+                    {
+                        "id": entry.get("link", entry.get("id", "")),
+                        "ticker": ticker,
+                        "title": entry.get("title", ""),
+                        "link": entry.get("link", ""),
+                        "summary": entry.get("summary", ""),
+                        "published": _published_ts(entry),
+                        "feed": url,
+                    }
+                )
+
+    logger.info(
+        "ニュース取得完了: %d 件 (リクエスト %d 件 / 未更新フィード %d 件)",
+        len(results),
+        len(futures),
+        not_modified,
+    )
     return results
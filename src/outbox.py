@@ -0,0 +1,214 @@
+"""X 投稿の送信待ちキュー — data/outbox.json に永続化し、レート制限を守りながら順に送信する。
+
+投稿は一旦キューに積み、drain() で古い順に送る。送れなかった投稿は次回の実行に持ち越す。
+    - 429: 応答ヘッダーのリセット時刻まで送信を止める
+    - 5xx・通信エラー: 指数バックオフで再試行 (OUTBOX_MAX_ATTEMPTS 回まで)
+    - 402/403 などのその他 4xx: 再試行せずに破棄する
+"""
+
+import hashlib
+import os
+import pathlib
+import threading
+import time
+
+from src import x_client
+from src.metrics import current as current_metrics
+from src.rate_limit import TokenBucket
+from src.resilience import DeadlineExceeded
+from src.utils import DATA_DIR, load_json_state, save_json_state, setup_logger
+
+logger = setup_logger(__name__)
+
+OUTBOX_PATH = DATA_DIR / "outbox.json"
+
+# 投稿の送信間隔 (トークンバケット): 1 時間あたりの投稿数と、連続して送れる数
+X_POSTS_PER_HOUR = float(os.environ.get("XBOT_X_POSTS_PER_HOUR", "50"))
+X_POST_BURST = 5
+
+OUTBOX_MAX_ATTEMPTS = 5
+RETRY_BASE_SEC = 60.0
+RETRY_MAX_SEC = 3600.0
+# これより古い投稿は送らずに破棄する (話題が古くなるため)
+OUTBOX_MAX_AGE_SEC = 24 * 3600
+
+
+class Outbox:
+    """永続化された投稿キュー。
+
+    ファイルの形式: {"queue": [エントリ, ...], "blocked_until": UNIX 秒}
+    エントリ: {"id", "ticker", "text", "media_path", "media_id", "attempts", "next_attempt_at", "created_at"}
+    """
+
+    def __init__(
+        self,
+        path: pathlib.Path = OUTBOX_PATH,
+        posts_per_hour: float = X_POSTS_PER_HOUR,
+        burst: float = X_POST_BURST,
+    ) -> None:
+        self.path = pathlib.Path(path)
+        self.bucket = TokenBucket(rate=posts_per_hour / 3600, capacity=burst)
+        self._lock = threading.Lock()
+
+    def _load(self) -> dict:
+        state = load_json_state(self.path, {})
+        state.setdefault("queue", [])
+        state.setdefault("blocked_until", 0.0)
+        return state
+
+    def _save(self, state: dict) -> None:
+        save_json_state(self.path, state)
+
+    def enqueue(self, text: str, ticker: str = "", media_path: pathlib.Path | None = None) -> str:
+        """投稿をキューに追加する。同じ本文の投稿が既にあれば追加しない。
+
+        Returns:
+            エントリ ID
+        """
+        entry_id = hashlib.sha256(text.encode("utf-8")).hexdigest()[:16]
+        with self._lock:
+            state = self._load()
+            if any(entry["id"] == entry_id for entry in state["queue"]):
+                return entry_id
+            state["queue"].append(
+                {
+                    "id": entry_id,
+                    "ticker": ticker,
+                    "text": text,
+                    "media_path": str(media_path) if media_path else None,
+                    "media_id": None,
+                    "attempts": 0,
+                    "next_attempt_at": 0.0,
+                    "created_at": time.time(),
+                }
+            )
+            self._save(state)
+        return entry_id
+
+    def __len__(self) -> int:
+        return len(self._load()["queue"])
+
+    def absorb(self, path: pathlib.Path, media_dir: pathlib.Path | None = None) -> int:
+        """別の送信キュー (シャードのキュー) の投稿を取り込む。同じ ID の投稿は重複させない。
+
+        Args:
+            media_dir: 指定すると、取り込む投稿の画像パスをこのディレクトリ直下の同名ファイルに付け替える
+                (シャードの画像が統合で移動する先)
+
+        Returns:
+            取り込んだ件数
+        """
+        other = load_json_state(pathlib.Path(path), {})
+        with self._lock:
+            state = self._load()
+            known = {entry["id"] for entry in state["queue"]}
+            added = [entry for entry in other.get("queue", []) if entry["id"] not in known]
+            if media_dir is not None:
+                for entry in added:
+                    if entry["media_path"]:
+                        entry["media_path"] = str(pathlib.Path(media_dir) / pathlib.Path(entry["media_path"]).name)
+            state["queue"].extend(added)
+            state["queue"].sort(key=lambda entry: entry["created_at"])
+            state["blocked_until"] = max(state["blocked_until"], other.get("blocked_until", 0.0))
+            self._save(state)
+        return len(added)
+
+    def drain(self, deadline: float | None = None) -> dict[str, int]:
+        """送信時刻の来た投稿を古い順に送る。
+
+        Args:
+            deadline: time.monotonic() の期限。レート制限の待ちがこれを越える場合は残りを持ち越す。
+
+        Returns:
+            {"posted", "retry", "dropped", "remaining"} の件数
+        """
+        counts = {"posted": 0, "retry": 0, "dropped": 0, "remaining": 0}
+        with self._lock:
+            state = self._load()
+            now = time.time()
+            queue = []
+            for entry in state["queue"]:
+                if now - entry["created_at"] > OUTBOX_MAX_AGE_SEC:
+                    logger.warning("X 投稿を破棄 (期限切れ): %s", entry["ticker"] or entry["id"])
+                    counts["dropped"] += 1
+                else:
+                    queue.append(entry)
+            state["queue"] = queue
+
+            for entry in list(queue):
+                if state["blocked_until"] > time.time():
+                    logger.info(
+                        "X レート制限中のため投稿を持ち越し (解除: %s)",
+                        time.strftime("%H:%M:%S", time.localtime(state["blocked_until"])),
+                    )
+                    break
+                if entry["next_attempt_at"] > time.time():
+                    continue
+
+                try:
+                    self.bucket.acquire(deadline=deadline)
+                except DeadlineExceeded:
+                    logger.info("X 投稿の送信枠待ちが期限を越えるため持ち越し")
+                    break
+
+                outcome = self._send(entry, state)
+                counts[outcome] += 1
+                if outcome != "retry":
+                    queue.remove(entry)
+                self._save(state)
+
+            counts["remaining"] = len(queue)
+            self._save(state)
+
+        metrics = current_metrics()
+        for key, name in (("posted", "x.posted"), ("retry", "x.deferred"), ("dropped", "x.skipped")):
+            if counts[key]:
+                metrics.incr(name, counts[key])
+        metrics.set("x.outbox_remaining", counts["remaining"])
+        return counts
+
+    def _send(self, entry: dict, state: dict) -> str:
+        """1 件送信し、結果 ("posted" / "retry" / "dropped") を返す。state は必要に応じて更新する。"""
+        label = entry["ticker"] or entry["id"]
+        try:
+            if entry["media_path"] and not entry["media_id"]:
+                if pathlib.Path(entry["media_path"]).exists():
+                    entry["media_id"] = x_client.upload_media(entry["media_path"])
+                else:
+                    logger.warning("画像が見つからないため画像なしで投稿します (%s)", label)
+                    entry["media_path"] = None
+            media_ids = [entry["media_id"]] if entry["media_id"] else None
+            tweet_id, limits = x_client.create_post(entry["text"], media_ids)
+        except Exception as e:
+            kind, status, limits = x_client.classify_error(e)
+            return self._handle_failure(entry, state, kind, status, limits, e)
+
+        logger.info("X 投稿成功 (%s): id=%s", label, tweet_id)
+        if limits.get("remaining") == 0 and limits.get("reset"):
+            state["blocked_until"] = limits["reset"]
+        return "posted"
+
+    def _handle_failure(
+        self, entry: dict, state: dict, kind: str, status: int | None, limits: dict, error: Exception
+    ) -> str:
+        label = entry["ticker"] or entry["id"]
+        if kind == x_client.RATE_LIMITED:
+            state["blocked_until"] = limits.get("reset") or time.time() + 15 * 60
+            logger.warning("X Posting Deferred (Rate Limit): 429 (%s)", label)
+            return "retry"
+
+        if kind == x_client.TERMINAL:
+            if status in (402, 403):
+                logger.warning("X Posting Skipped (Cost/Permission): %s (%s)", status, label)
+            else:
+                logger.warning("X Posting Skipped (HTTP %s): %s (%s)", status, error, label)
+            return "dropped"
+
+        entry["attempts"] += 1
+        if entry["attempts"] >= OUTBOX_MAX_ATTEMPTS:
+            logger.warning("X Posting Skipped (再試行上限): %s (%s)", error, label)
+            return "dropped"
+        delay = min(RETRY_BASE_SEC * 2 ** (entry["attempts"] - 1), RETRY_MAX_SEC)
+        entry["next_attempt_at"] = time.time() + delay
+        logger.warning("X 投稿失敗 (%s)。%.0f 秒後に再試行: %s", label, delay, error)
+        return "retry"
@@ -0,0 +1,204 @@
+"""ステージの依存グラフを、依存関係の許す限り並行に実行する小さなスケジューラ。"""
+
+import concurrent.futures
+import queue
+import threading
+import time
+from collections.abc import Callable
+
+from src.metrics import RunMetrics
+from src.utils import setup_logger
+
+logger = setup_logger(__name__)
+
+
+class StopPipeline(Exception):
+    """ステージが送出すると、以降のステージを起動せずに正常終了する (処理対象なし等)。"""
+
+
+class DaemonThreadPoolExecutor(concurrent.futures.Executor):
+    """ワーカーをデーモンスレッドで動かすスレッドプール。
+
+    ThreadPoolExecutor のワーカーはインタープリター終了時に join されるため、制限時間を超えて
+    放棄した呼び出しが終わるまでプロセスが終了しない。このプールのワーカーは終了を妨げないので、
+    制限時間を超えた処理は実行の終了とともに打ち切られる。
+    """
+
+    def __init__(self, max_workers: int, thread_name_prefix: str = "daemon-pool") -> None:
+        self._max_workers = max(1, max_workers)
+        self._thread_name_prefix = thread_name_prefix
+        self._queue: queue.SimpleQueue = queue.SimpleQueue()
+        self._threads: list[threading.Thread] = []
+        self._shutdown = False
+        self._lock = threading.Lock()
+
+    def submit(self, fn, /, *args, **kwargs) -> concurrent.futures.Future:
+        with self._lock:
+            if self._shutdown:
+                raise RuntimeError("shutdown 後のプールには投入できません")
+            future: concurrent.futures.Future = concurrent.futures.Future()
+            self._queue.put((future, fn, args, kwargs))
+            if len(self._threads) < self._max_workers:
+                thread = threading.Thread(
+                    target=self._work, name=f"{self._thread_name_prefix}_{len(self._threads)}", daemon=True
+                )
+                thread.start()
+                self._threads.append(thread)
+        return future
+
+    def _work(self) -> None:
+        while (item := self._queue.get()) is not None:
+            future, fn, args, kwargs = item
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                result = fn(*args, **kwargs)
+            except BaseException as e:
+                future.set_exception(e)
+            else:
+                future.set_result(result)
+
+    def shutdown(self, wait: bool = True, *, cancel_futures: bool = False) -> None:
+        with self._lock:
+            self._shutdown = True
+            threads = list(self._threads)
+        if cancel_futures:
+            while True:
+                try:
+                    future, *_ = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                future.cancel()
+        for _ in threads:
+            self._queue.put(None)
+        if wait:
+            for thread in threads:
+                thread.join()
+
+
+class Stage:
+    """パイプラインの 1 ステージ。
+
+    Args:
+        name: ステージ名。結果は ctx[name] に格納される。
+        fn: ctx (共有 dict) を受け取り、結果を返す関数
+        deps: 先に完了している必要があるステージ名
+        timeout: 起動からの制限秒数。超過したら失敗として扱う (スレッドは放棄し、
+            デーモンスレッドなのでプロセスの終了は待たない)。
+        fallback: 失敗時に ctx を受け取って代替結果を返す関数。
+            None の場合、失敗したらパイプライン全体を中断する。
+    """
+
+    def __init__(
+        self,
+        name: str,
+        fn: Callable[[dict], object],
+        deps: tuple[str, ...] = (),
+        timeout: float | None = None,
+        fallback: Callable[[dict], object] | None = None,
+    ) -> None:
+        self.name = name
+        self.fn = fn
+        self.deps = deps
+        self.timeout = timeout
+        self.fallback = fallback
+
+
+class Pipeline:
+    """Stage の DAG。依存が満たされたステージから順にスレッドプールで実行する。
+
+    ステージはデーモンスレッドで動くため、制限時間を超えて放棄したステージがあっても
+    run() から戻った後のプロセスの終了は遅れない。ステージ内で別にスレッドを使う場合も
+    DaemonThreadPoolExecutor を使うこと (ThreadPoolExecutor のワーカーは終了時に待たれる)。
+    """
+
+    def __init__(self, stages: list[Stage], max_workers: int = 4) -> None:
+        names = {stage.name for stage in stages}
+        for stage in stages:
+            unknown = set(stage.deps) - names
+            if unknown:
+                raise ValueError(f"ステージ {stage.name} の依存先が未定義: {unknown}")
+        self.stages = stages
+        self.max_workers = max_workers
+
+    def run(self, ctx: dict, metrics: RunMetrics, deadline: float | None = None) -> str:
+        """全ステージを実行する。
+
+        Args:
+            deadline: 実行全体の期限 (time.monotonic() の値)。制限時間のあるステージは、
+                これを過ぎた時点でも制限時間の超過として扱う。
+
+        Returns:
+            "completed" (全ステージ完了), "stopped" (StopPipeline による早期終了),
+            "aborted" (fallback のないステージが失敗)
+        """
+        waiting = list(self.stages)
+        running: dict[concurrent.futures.Future, tuple[Stage, float]] = {}
+        status = "completed"
+        abandoned = False
+        executor = DaemonThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="stage")
+
+        def timed(stage: Stage):
+            with metrics.stage(stage.name, stop=(StopPipeline,)):
+                return stage.fn(ctx)
+
+        def stage_deadline(stage: Stage, start: float) -> float | None:
+            if not stage.timeout:
+                return None
+            return start + stage.timeout if deadline is None else min(start + stage.timeout, deadline)
+
+        def fail(stage: Stage, error: BaseException) -> bool:
+            """失敗を処理する。パイプラインを続行できるなら True。"""
+            if stage.fallback is None:
+                logger.error("ステージ %s が失敗。パイプラインを中断します: %r", stage.name, error)
+                return False
+            logger.warning("ステージ %s が失敗。代替結果で続行します: %r", stage.name, error)
+            ctx[stage.name] = stage.fallback(ctx)
+            return True
+
+        try:
+            while True:
+                if status == "completed":
+                    for stage in [s for s in waiting if all(d in ctx for d in s.deps)]:
+                        waiting.remove(stage)
+                        running[executor.submit(timed, stage)] = (stage, time.monotonic())
+
+                if not running:
+                    break
+
+                deadlines = [
+                    d for stage, start in running.values() if (d := stage_deadline(stage, start)) is not None
+                ]
+                wait_for = max(0.0, min(deadlines) - time.monotonic()) if deadlines else None
+                done, _ = concurrent.futures.wait(
+                    running, timeout=wait_for, return_when=concurrent.futures.FIRST_COMPLETED
+                )
+
+                for future in done:
+                    stage, _start = running.pop(future)
+                    try:
+                        ctx[stage.name] = future.result()
+                    except StopPipeline as e:
+                        logger.info("ステージ %s でパイプラインを終了: %s", stage.name, e)
+                        if status == "completed":
+                            status = "stopped"
+                    except Exception as e:
+                        if not fail(stage, e):
+                            status = "aborted"
+
+                now = time.monotonic()
+                for future, (stage, start) in list(running.items()):
+                    limit = stage_deadline(stage, start)
+                    if limit is not None and now >= limit:
+                        running.pop(future)
+                        abandoned = True
+                        metrics.incr(f"timeouts.{stage.name}")
+                        if not fail(stage, TimeoutError(f"{limit - start:.0f} 秒を超過")):
+                            status = "aborted"
+        finally:
+            executor.shutdown(wait=not abandoned, cancel_futures=True)
+
+        if status == "completed" and waiting:
+            # 依存先が StopPipeline 以外の理由で結果を持たない場合 (通常は起こらない)
+            logger.warning("未実行のステージ: %s", [s.name for s in waiting])
+        return status
@@ -0,0 +1,154 @@
+"""LLM 入力の組み立て — 関連度順に並べ、トークン予算内に収める。"""
+
+import math
+import os
+import re
+import time
+
+from src.utils import setup_logger
+
+logger = setup_logger(__name__)
+
+# プロンプト (システムプロンプトを除く) のトークン予算
+PROMPT_TOKEN_BUDGET = int(os.environ.get("XBOT_PROMPT_TOKEN_BUDGET", "1500"))
+SUMMARY_MAX_CHARS = 200
+
+# スコアの重み
+RECENCY_WEIGHT = 0.4
+POPULARITY_WEIGHT = 0.3
+MENTION_WEIGHT = 0.3
+
+# 経過時間による減衰 (この時間ごとに 1/e)
+RECENCY_DECAY_HOURS = 12.0
+
+# 採用済みの項目とタイトルの単語集合 Jaccard 係数がこれ以上なら新規性なしとして除外
+NOVELTY_THRESHOLD = 0.5
+
+_WORD_RE = re.compile(r"\w+")
+_CASHTAG_RE = re.compile(r"\$[A-Z]{1,5}\b")
+
+
+def estimate_tokens(text: str) -> int:
+    """トークン数の概算 (ASCII は 4 文字で 1 トークン、それ以外は 1 文字 1 トークン)。"""
+    ascii_chars = sum(1 for c in text if c.isascii())
+    return ascii_chars // 4 + (len(text) - ascii_chars)
+
+
+def _item_lines(item: dict) -> str:
+    """1 項目分の入力行 (見出し + 概要/本文)。"""
+    if "subreddit" in item:
+        line = f"- [r/{item['subreddit']}] {item['title']} (score: {item['score']})"
+        body = item.get("selftext", "")
+    else:
+        tickers = ",".join(item.get("tickers", [item["ticker"]] if item["ticker"] else []))
+        line = f"- [{tickers}] {item['title']}" if tickers else f"- {item['title']}"
+        body = item.get("summary", "")
+    if body:
+        line += f"\n  {body[:SUMMARY_MAX_CHARS]}"
+    return line
+
+
+def _timestamp(item: dict) -> float | None:
+    return item.get("published") or item.get("created_utc")
+
+
+def score_item(item: dict, now: float, ticker: str | None = None) -> float:
+    """項目の関連度スコア (0〜1) を計算する。
+
+    - 新しさ: 公開からの経過時間で指数減衰 (時刻不明なら 0.5)
+    - 人気: Reddit のスコアを対数スケールで正規化 (ニュースは 0.5 固定)
+    - 言及: 対象ティッカー (指定がなければ任意のキャッシュタグ) への言及有無
+    """
+    ts = _timestamp(item)
+    if ts:
+        age_hours = max(0.0, now - ts) / 3600
+        recency = math.exp(-age_hours / RECENCY_DECAY_HOURS)
+    else:
+        recency = 0.5
+
+    if "score" in item:
+        popularity = min(1.0, math.log1p(max(item["score"], 0)) / math.log1p(10000))
+    else:
+        popularity = 0.5
+
+    text = " ".join(item.get(key, "") for key in ("title", "summary", "selftext"))
+    if ticker:
+        mentioned = ticker in item.get("tickers", [item.get("ticker")]) or re.search(rf"\b{re.escape(ticker)}\b", text)
+    else:
+        mentioned = item.get("ticker") or item.get("tickers") or _CASHTAG_RE.search(text)
+    mention = 1.0 if mentioned else 0.0
+
+    return RECENCY_WEIGHT * recency + POPULARITY_WEIGHT * popularity + MENTION_WEIGHT * mention
+
+
+def _words(text: str) -> frozenset[str]:
+    return frozenset(w.lower() for w in _WORD_RE.findall(text))
+
+
+def build_prompt(
+    news_items: list[dict],
+    reddit_items: list[dict],
+    ticker: str | None = None,
+    budget: int = PROMPT_TOKEN_BUDGET,
+    now: float | None = None,
+) -> tuple[str, dict]:
+    """スコアの高い順に、新規性のある項目をトークン予算内で詰めてプロンプトを作る。
+
+    Returns:
+        (プロンプト本文, サイズ指標の dict)
+    """
+    now = time.time() if now is None else now
+
+    header = f"## 分析対象: ${ticker} (このティッカーについてのみコメントすること)\n" if ticker else ""
+    news_header = "## Yahoo Finance ニュース"
+    reddit_header = "\n## Reddit 注目投稿"
+    used = estimate_tokens(header + news_header + reddit_header)
+
+    candidates = sorted(
+        news_items + reddit_items,
+        key=lambda item: score_item(item, now, ticker),
+        reverse=True,
+    )
+
+    selected_news: list[str] = []
+    selected_reddit: list[str] = []
+    selected_words: list[frozenset[str]] = []
+    skipped_similar = 0
+
+    for item in candidates:
+        words = _words(item["title"])
+        if any(
+            len(words & seen) / (len(words | seen) or 1) >= NOVELTY_THRESHOLD
+            for seen in selected_words
+        ):
+            skipped_similar += 1
+            continue
+
+        lines = _item_lines(item)
+        cost = estimate_tokens(lines) + 1
+        if used + cost > budget:
+            continue
+
+        used += cost
+        selected_words.append(words)
+        (selected_reddit if "subreddit" in item else selected_news).append(lines)
+
+    parts: list[str] = [header] if header else []
+    if selected_news:
+        parts.append(news_header)
+        parts.extend(selected_news)
+    if selected_reddit:
+        parts.append(reddit_header)
+        parts.extend(selected_reddit)
+    prompt = "\n".join(parts)
+
+    metrics = {
+        "candidates": len(candidates),
+        "selected_news": len(selected_news),
+        "selected_reddit": len(selected_reddit),
+        "skipped_similar": skipped_similar,
+        "chars": len(prompt),
+        "tokens": estimate_tokens(prompt),
+        "budget": budget,
+    }
+    return prompt, metrics
@@ -0,0 +1,71 @@
+"""スレッドセーフなトークンバケット (API クォータ制御用)。"""
+
+import threading
+import time
+
+from src.resilience import DeadlineExceeded
+
+
+class TokenBucket:
+    """rate 個/秒で補充され、最大 capacity 個まで貯まるトークンバケット。"""
+
+    def __init__(self, rate: float, capacity: float) -> None:
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def try_acquire(self, amount: float = 1.0) -> float:
+        """トークンを取得する。不足していれば取得せず、必要な待ち秒数を返す (取得できたら 0)。"""
+        amount = min(amount, self.capacity)
+        with self._lock:
+            self._refill()
+            if self._tokens >= amount:
+                self._tokens -= amount
+                return 0.0
+            return (amount - self._tokens) / self.rate
+
+    def acquire(self, amount: float = 1.0, deadline: float | None = None) -> float:
+        """トークンが貯まるまでブロックして取得する。
+
+        Args:
+            deadline: 待ちの期限 (time.monotonic() の値)。待つと期限を越える場合は
+                取得せずに DeadlineExceeded を送出する。
+
+        Returns:
+            待機した秒数
+        """
+        waited = 0.0
+        while True:
+            wait = self.try_acquire(amount)
+            if wait <= 0:
+                return waited
+            if deadline is not None and time.monotonic() + wait > deadline:
+                raise DeadlineExceeded(f"枠が空くまでの待ち ({wait:.1f} 秒) が期限を越えます")
+            time.sleep(wait)
+            waited += wait
+
+
+class RateLimiter:
+    """リクエスト数/分 (RPM) とトークン数/分 (TPM) の両方を守るリミッター。"""
+
+    def __init__(self, rpm: float, tpm: float) -> None:
+        self.requests = TokenBucket(rate=rpm / 60, capacity=rpm)
+        self.tokens = TokenBucket(rate=tpm / 60, capacity=tpm)
+
+    def acquire(self, tokens: float, deadline: float | None = None) -> float:
+        """1 リクエスト分と tokens 分の枠が空くまで待つ。
+
+        Args:
+            deadline: 待ちの期限 (time.monotonic() の値)。越える場合は DeadlineExceeded を送出する。
+
+        Returns:
+            待機した秒数
+        """
+        return self.requests.acquire(1, deadline) + self.tokens.acquire(tokens, deadline)
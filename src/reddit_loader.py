@@ -1,19 +1,49 @@
 """Reddit (PRAW) からサブレディットの投稿を取得する。"""
 
+from __future__ import annotations
+
 import os
+from typing import TYPE_CHECKING
 
-import praw
-from tenacity import retry, stop_after_attempt, wait_exponential
+from src.metrics import current as current_metrics
+from src.pipeline import DaemonThreadPoolExecutor
+from src.resilience import CircuitOpenError, resilient
+from src.utils import (
+    DATA_DIR,
+    load_json_state,
+    load_layered_json_state,
+    save_json_state,
+    setup_logger,
+    shard_path,
+    shard_slice,
+)
 
-from src.utils import setup_logger
+if TYPE_CHECKING:
+    import praw
 
 logger = setup_logger(__name__)
 
 TARGET_SUBREDDITS = ["wallstreetbets", "stocks", "investing"]
 
+# サブレディットごとの最終取得位置 (NEW リスティングの増分取得用)
+REDDIT_CURSOR_PATH = DATA_DIR / "reddit_cursors.json"
+
+REDDIT_MAX_WORKERS = 4
+
+# NEW リスティングでカーソルまで遡る件数の上限 (Reddit のリスティング自体も 1000 件程度までしか遡れない)
+REDDIT_NEW_MAX_POSTS = int(os.environ.get("XBOT_REDDIT_NEW_MAX", "1000"))
+
+# サブレディット名 → PRAW インスタンス。実行をまたいで使い回す (デーモンモード)。
+_clients: dict[str, praw.Reddit] = {}
+
+# 今回の実行で進んだカーソル。commit_reddit_cursors() で永続化する。
+_pending_cursors: dict[str, dict] = {}
+
 
 def _create_reddit() -> praw.Reddit:
     """環境変数から認証情報を取得して PRAW インスタンスを生成する。"""
+    import praw
+
     return praw.Reddit(
         client_id=os.environ["REDDIT_CLIENT_ID"],
         client_secret=os.environ["REDDIT_CLIENT_SECRET"],
@@ -21,15 +51,92 @@ def _create_reddit() -> praw.Reddit:
     )
 
 
-@retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=2, min=2, max=30))
+@resilient("reddit")
 def _fetch_subreddit_hot(reddit: praw.Reddit, subreddit_name: str, limit: int) -> list:
     """サブレディットの HOT 投稿を取得する。"""
     subreddit = reddit.subreddit(subreddit_name)
     return list(subreddit.hot(limit=limit))
 
 
-def fetch_posts(limit: int = 10) -> list[dict]:
-    """対象サブレディットから HOT 投稿を取得する。
+@resilient("reddit")
+def _fetch_subreddit_new(
+    reddit: praw.Reddit, subreddit_name: str, limit: int, cursor: dict | None
+) -> list:
+    """サブレディットの NEW 投稿のうち、cursor より新しいものだけを取得する。
+
+    cursor がない初回は最新 limit 件。cursor がある場合は limit によらず cursor に達するまで
+    ページングする (NEW リスティングは新しい順に並ぶ)。REDDIT_NEW_MAX_POSTS 件を超えても
+    cursor に届かなければ、それより古い新着は取得できないため取りこぼしとして警告する。
+    """
+    subreddit = reddit.subreddit(subreddit_name)
+    if not cursor:
+        return list(subreddit.new(limit=limit))
+    posts = []
+    for post in subreddit.new(limit=None):
+        if post.fullname == cursor["fullname"] or post.created_utc <= cursor["created_utc"]:
+            return posts
+        if len(posts) >= REDDIT_NEW_MAX_POSTS:
+            break
+        posts.append(post)
+    logger.warning(
+        "r/%s の新着が前回の取得位置 (%s) まで遡れませんでした: %d 件を取得し、それ以前の新着は取りこぼし",
+        subreddit_name,
+        cursor["fullname"],
+        len(posts),
+    )
+    current_metrics().incr("reddit.cursor_gaps")
+    return posts
+
+
+def _to_item(post, subreddit_name: str) -> dict:
+    return {
+        "id": post.id,
+        "subreddit": subreddit_name,
+        "title": post.title,
+        "selftext": post.selftext[:500] if post.selftext else "",
+        "score": post.score,
+        "url": f"https://reddit.com{post.permalink}",
+        "created_utc": post.created_utc,
+    }
+
+
+def commit_reddit_cursors() -> None:
+    """今回進んだサブレディットのカーソルを保存する。
+
+    取得した投稿の処理が完了してから呼ぶこと。
+    """
+    if not _pending_cursors:
+        return
+    path = shard_path(REDDIT_CURSOR_PATH)
+    cursors = load_json_state(path, {})
+    cursors.update(_pending_cursors)
+    save_json_state(path, cursors)
+    _pending_cursors.clear()
+
+
+def discard_reddit_cursors(subreddits: set[str] | None = None) -> None:
+    """今回進んだカーソルのうち、subreddits の分を保存しないことにする (None なら全件)。
+
+    処理できなかった投稿を越えてカーソルを進めると、次回その投稿が取得されない。
+    """
+    if subreddits is None:
+        _pending_cursors.clear()
+        return
+    for sub_name in subreddits:
+        _pending_cursors.pop(sub_name, None)
+
+
+def fetch_posts(
+    limit: int = 10,
+    listing: str = "hot",
+    max_workers: int = REDDIT_MAX_WORKERS,
+) -> list[dict]:
+    """対象サブレディット (分割実行では担当シャードの分) から投稿を並列に取得する。
+
+    Args:
+        limit: サブレディットごとの最大取得件数 ("new" でカーソルがある場合は、カーソルまで全件)
+        listing: "hot" または "new"。"new" の場合は前回のカーソルより新しい投稿だけを取得する。
+        max_workers: 同時に取得するサブレディット数
 
     Returns:
         list[dict]: 各要素は以下のキーを持つ。
@@ -39,28 +146,47 @@ def fetch_posts(limit: int = 10) -> list[dict]:
             - selftext: 本文 (あれば)
             - score: スコア
             - url: 投稿 URL
+            - created_utc: 投稿日時 (UNIX 秒)
     """
-    reddit = _create_reddit()
-    results: list[dict] = []
+    if listing not in ("hot", "new"):
+        raise ValueError(f"未対応のリスティング: {listing}")
 
-    for sub_name in TARGET_SUBREDDITS:
+    cursors = load_layered_json_state(REDDIT_CURSOR_PATH) if listing == "new" else {}
+    subreddits = shard_slice(TARGET_SUBREDDITS)
+
+    # PRAW インスタンスはスレッドセーフではないため、サブレディットごとに 1 つ持つ
+    # (同じサブレディットを同時に取得することはない)
+    for sub_name in subreddits:
+        if sub_name not in _clients:
+            _clients[sub_name] = _create_reddit()
+    clients = _clients
+
+    def fetch_one(sub_name: str) -> list:
+        if listing == "new":
+            return _fetch_subreddit_new(clients[sub_name], sub_name, limit, cursors.get(sub_name))
+        return _fetch_subreddit_hot(clients[sub_name], sub_name, limit)
+
+    with DaemonThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="reddit") as executor:
+        futures = {sub_name: executor.submit(fetch_one, sub_name) for sub_name in subreddits}
+
+    results: list[dict] = []
+    for sub_name, future in futures.items():
         try:
-            posts = _fetch_subreddit_hot(reddit, sub_name, limit)
+            posts = future.result()
+        except CircuitOpenError as e:
+            logger.warning("Reddit 取得を省略 (subreddit=%s): %s", sub_name, e)
+            continue
         except Exception:
             logger.exception("Reddit 取得失敗 (subreddit=%s)", sub_name)
             continue
 
-        for post in posts:
-            results.append(
-                {
-                    "id": post.id,
-                    "subreddit": sub_name,
-                    "title": post.title,
-                    "selftext": post.selftext[:500] if post.selftext else "",
-                    "score": post.score,
-                    "url": f"https://reddit.com{post.permalink}",
-                }
-            )
-
-    logger.info("Reddit 投稿取得完了: %d 件", len(results))
+        if listing == "new" and posts:
+            _pending_cursors[sub_name] = {
+                "fullname": posts[0].fullname,
+                "created_utc": posts[0].created_utc,
+            }
+
+        results.extend(_to_item(post, sub_name) for post in posts)
+
+    logger.info("Reddit 投稿取得完了: %d 件 (listing=%s)", len(results), listing)
     return results
@@ -0,0 +1,152 @@
+"""アーカイブした生データの再分析 (バックフィル)。RSS / Reddit / X には接続しない。
+
+    python -m src.replay --start 2026-09-01 --end 2026-09-30 [--tickers NVDA,TSLA] [--workers 8] [--cache-only]
+
+アーカイブの実行分を取得時刻順に読み、処理済み ID で重複除外する (本番の状態ファイルは読み書きしない)。
+実行分ごとの類似記事の統合・ティッカー付与・一次判定・LLM 入力の組み立て・分析・カード生成は
+並列に行い、レポートは取得時刻順に reports/replay/YYYY-MM-DD.md へ書き出す。
+プロンプトやモデルを変えて過去の期間を分析し直す用途を想定している。--cache-only を付けると
+Gemini も呼ばず、応答キャッシュにある分だけで完全にオフラインで実行する。
+"""
+
+import argparse
+import collections
+import concurrent.futures
+import datetime
+import pathlib
+import time
+
+from src import llm_engine, main
+from src.archive import ARCHIVE_DIR, SnapshotArchive
+from src.entities import tag_items
+from src.image_gen import generate_cards
+from src.llm_engine import analyze_many
+from src.near_dup import collapse_near_duplicates
+from src.news_fetcher import ticker_matcher
+from src.sentiment import triage
+from src.utils import ProcessedIdStore, is_duplicate, setup_logger
+
+logger = setup_logger(__name__)
+
+REPLAY_DIR = main.REPORTS_DIR / "replay"
+REPLAY_MAX_WORKERS = 4
+
+# 同時に処理中にしておく実行分の上限 (ワーカー数あたり)。期間が長くてもメモリ使用量を一定に保つ。
+PENDING_PER_WORKER = 4
+
+
+def _parse_date(value: str) -> datetime.datetime:
+    return datetime.datetime.strptime(value, "%Y-%m-%d").replace(tzinfo=datetime.timezone.utc)
+
+
+def _analyze_snapshot(
+    fetched_at: float, news: list[dict], reddit: list[dict], output_dir: pathlib.Path
+) -> list[tuple[str, dict, pathlib.Path | None]]:
+    """1 回の実行分を分析し、(ティッカー, 分析結果, カード画像) の一覧を返す。"""
+    news = collapse_near_duplicates(news)
+    tag_items(reddit, ticker_matcher())
+    result = triage(news, reddit, now=fetched_at)
+    inputs = main._build_llm_inputs(result["news"], result["reddit"], result["active"])
+    if not inputs:
+        return []
+    analyses = analyze_many(inputs)
+
+    stamp = datetime.datetime.fromtimestamp(fetched_at, datetime.timezone.utc).strftime("%Y-%m-%d_%H%M%S")
+    image_paths = generate_cards(
+        [
+            (ticker, analysis["sentiment"], analysis["reason"], output_dir / f"{stamp}_{ticker}.png")
+            for ticker, analysis in analyses.items()
+        ]
+    )
+    return [
+        (ticker, analysis, image_path)
+        for (ticker, analysis), image_path in zip(analyses.items(), image_paths)
+    ]
+
+
+def replay(
+    start: float,
+    end: float,
+    tickers: set[str] | None = None,
+    output_dir: pathlib.Path = REPLAY_DIR,
+    archive: SnapshotArchive | None = None,
+    max_workers: int = REPLAY_MAX_WORKERS,
+) -> dict[str, int]:
+    """start <= 取得時刻 < end のアーカイブを再分析してレポートを書き出す。
+
+    Returns:
+        {"snapshots": 読んだ実行分, "news" / "reddit": 重複除外後の項目数, "analyses": 分析結果の件数}
+    """
+    archive = archive or SnapshotArchive()
+    # 再分析専用の処理済み ID (ファイルには書かない)
+    store = ProcessedIdStore(output_dir / ".replay_ids.tsv")
+    totals = {"snapshots": 0, "news": 0, "reddit": 0, "analyses": 0}
+    pending: collections.deque = collections.deque()
+
+    def write_oldest() -> None:
+        fetched_at, future = pending.popleft()
+        fetched = datetime.datetime.fromtimestamp(fetched_at, datetime.timezone.utc)
+        try:
+            results = future.result()
+        except Exception:
+            logger.exception("再分析に失敗 (取得時刻 %s)", fetched.isoformat(timespec="seconds"))
+            return
+        date_str = fetched.strftime("%Y-%m-%d")
+        for ticker, analysis, image_path in results:
+            main._append_report(
+                date_str, ticker, analysis, image_path or pathlib.Path("N/A"), reports_dir=output_dir
+            )
+        totals["analyses"] += len(results)
+
+    output_dir.mkdir(parents=True, exist_ok=True)
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+        for snapshot in archive.snapshots(start, end, tickers):
+            totals["snapshots"] += 1
+            news = [item for item in snapshot["news"] if not is_duplicate(item["id"], store)]
+            reddit = [item for item in snapshot["reddit"] if not is_duplicate(item["id"], store)]
+            store.add_many([item["id"] for item in news] + [item["id"] for item in reddit])
+            if not news and not reddit:
+                continue
+            totals["news"] += len(news)
+            totals["reddit"] += len(reddit)
+            future = executor.submit(_analyze_snapshot, snapshot["fetched_at"], news, reddit, output_dir)
+            pending.append((snapshot["fetched_at"], future))
+            while len(pending) > max_workers * PENDING_PER_WORKER:
+                write_oldest()
+        while pending:
+            write_oldest()
+    return totals
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="アーカイブした生データを再分析してレポートを書き出す")
+    parser.add_argument("--start", required=True, help="開始日 (YYYY-MM-DD, UTC)")
+    parser.add_argument("--end", required=True, help="終了日 (YYYY-MM-DD, UTC。この日を含む)")
+    parser.add_argument("--tickers", help="対象ティッカー (カンマ区切り。省略時は全件)")
+    parser.add_argument("--workers", type=int, default=REPLAY_MAX_WORKERS, help="並列に処理する実行分の数")
+    parser.add_argument("--output-dir", type=pathlib.Path, default=REPLAY_DIR, help="レポートの出力先")
+    parser.add_argument("--archive-dir", type=pathlib.Path, default=ARCHIVE_DIR, help="アーカイブのディレクトリ")
+    parser.add_argument("--mode", choices=["blended", "per_ticker"], help="分析モード (省略時は XBOT_ANALYSIS_MODE)")
+    parser.add_argument("--cache-only", action="store_true", help="Gemini を呼ばず、応答キャッシュのみで分析する")
+    args = parser.parse_args()
+
+    if args.mode:
+        main.ANALYSIS_MODE = args.mode
+    if args.cache_only:
+        llm_engine.CACHE_ONLY = True
+    try:
+        start = _parse_date(args.start)
+        end = _parse_date(args.end) + datetime.timedelta(days=1)
+    except ValueError as e:
+        parser.error(str(e))
+
+    started = time.perf_counter()
+    totals = replay(
+        start.timestamp(),
+        end.timestamp(),
+        tickers={t.strip().upper() for t in args.tickers.split(",")} if args.tickers else None,
+        output_dir=args.output_dir,
+        archive=SnapshotArchive(args.archive_dir),
+        max_workers=args.workers,
+    )
+    logger.info("再分析完了 (%.1f 秒): %s → %s", time.perf_counter() - started, totals, args.output_dir)
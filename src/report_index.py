@@ -0,0 +1,246 @@
+"""レポートの索引・集計ページの差分生成。
+
+レポート (reports/YYYY-MM-DD.md) と同時に追記される構造化データ (reports/YYYY-MM-DD.jsonl) を読み、
+reports/index/ 以下に次のページを生成する。
+    - index.md: ティッカーごとの最新の判定と、週次・月次・日次ページへのリンク
+    - tickers/<TICKER>.md: ティッカーごとの判定の件数と直近の判定
+    - weekly/<YYYY-Www>.md / monthly/<YYYY-MM>.md: 期間内のティッカーごとの判定の集計
+
+manifest.json に各 JSONL の読み込み済みバイト位置と集計の途中結果を保持し、
+前回以降に追記された行だけを読んで、それが関係するページだけを書き直す。
+生成の手間は履歴全体ではなく新しいデータの量に比例する。
+
+    python -m src.report_index [--rebuild]
+"""
+
+import argparse
+import datetime
+import json
+import pathlib
+import re
+
+from src.utils import load_json_state, save_json_state, setup_logger
+
+logger = setup_logger(__name__)
+
+PROJECT_ROOT = pathlib.Path(__file__).resolve().parent.parent
+REPORTS_DIR = PROJECT_ROOT / "reports"
+
+MANIFEST_VERSION = 1
+
+# ティッカーページに載せる直近の判定の件数
+RECENT_CALLS = 20
+# 索引ページに載せる日次レポートの件数
+RECENT_DAYS = 30
+
+_SIDECAR_RE = re.compile(r"^\d{4}-\d{2}-\d{2}\.jsonl$")
+
+_EMOJI = {"BULLISH": "\U0001f402", "BEARISH": "\U0001f43b"}
+
+
+def _empty_state() -> dict:
+    return {"version": MANIFEST_VERSION, "sources": {}, "tickers": {}, "weeks": {}, "months": {}, "dates": {}}
+
+
+def _week_key(date_str: str) -> str:
+    year, week, _ = datetime.date.fromisoformat(date_str).isocalendar()
+    return f"{year}-W{week:02d}"
+
+
+def _read_new_lines(path: pathlib.Path, offset: int) -> tuple[list[dict], int]:
+    """offset 以降の完結した行 (改行で終わる行) を読み、(レコード, 新しい offset) を返す。"""
+    with open(path, "rb") as f:
+        f.seek(offset)
+        data = f.read()
+    end = data.rfind(b"\n") + 1
+    records = [json.loads(line) for line in data[:end].decode("utf-8").splitlines() if line.strip()]
+    return records, offset + end
+
+
+def _add_to_rollup(rollup: dict, entry: dict) -> None:
+    stats = rollup.setdefault(entry["ticker"], {"bullish": 0, "bearish": 0, "latest": None})
+    stats["bullish" if entry["sentiment"] == "BULLISH" else "bearish"] += 1
+    stats["latest"] = entry["sentiment"]
+
+
+def _apply(state: dict, entry: dict, affected: dict[str, set]) -> None:
+    """1 件の判定を集計に加え、書き直すべきページを affected に記録する。"""
+    ticker, date_str = entry["ticker"], entry["date"]
+    call = {
+        "date": date_str,
+        "sentiment": entry["sentiment"],
+        "post_text": entry.get("post_text", ""),
+        "reason": entry.get("reason", ""),
+        "trend": entry.get("trend", ""),
+    }
+    stats = state["tickers"].setdefault(ticker, {"bullish": 0, "bearish": 0, "recent": []})
+    stats["bullish" if entry["sentiment"] == "BULLISH" else "bearish"] += 1
+    stats["recent"] = [call, *stats["recent"]][:RECENT_CALLS]
+
+    week, month = _week_key(date_str), date_str[:7]
+    _add_to_rollup(state["weeks"].setdefault(week, {}), entry)
+    _add_to_rollup(state["months"].setdefault(month, {}), entry)
+    state["dates"][date_str] = state["dates"].get(date_str, 0) + 1
+
+    affected["tickers"].add(ticker)
+    affected["weeks"].add(week)
+    affected["months"].add(month)
+
+
+def _cell(text: str) -> str:
+    """Markdown の表のセルに入れられるよう、改行と "|" をエスケープする。"""
+    return " ".join(text.splitlines()).replace("|", "\\|")
+
+
+def _rollup_line(rollup: dict) -> str:
+    bullish = sum(s["bullish"] for s in rollup.values())
+    bearish = sum(s["bearish"] for s in rollup.values())
+    return f"{bullish + bearish} calls ({_EMOJI['BULLISH']} {bullish} / {_EMOJI['BEARISH']} {bearish})"
+
+
+def _render_index(state: dict, updated: str) -> str:
+    lines = [
+        "# US Stock Report Index",
+        "",
+        f"_Updated: {updated}_",
+        "",
+        "## Latest calls",
+        "",
+        "| Ticker | Date | Sentiment | Reason |",
+        "|--------|------|-----------|--------|",
+    ]
+    for ticker, stats in sorted(state["tickers"].items()):
+        call = stats["recent"][0]
+        lines.append(
+            f"| [${ticker}](tickers/{ticker}.md) | [{call['date']}](../{call['date']}.md) "
+            f"| {_EMOJI[call['sentiment']]} {call['sentiment']} | {_cell(call['reason'])} |"
+        )
+    lines += ["", "## Weekly", ""]
+    lines += [
+        f"- [{week}](weekly/{week}.md) — {_rollup_line(state['weeks'][week])}"
+        for week in sorted(state["weeks"], reverse=True)
+    ]
+    lines += ["", "## Monthly", ""]
+    lines += [
+        f"- [{month}](monthly/{month}.md) — {_rollup_line(state['months'][month])}"
+        for month in sorted(state["months"], reverse=True)
+    ]
+    lines += ["", "## Daily reports", ""]
+    lines += [
+        f"- [{date_str}](../{date_str}.md) — {count} calls"
+        for date_str, count in sorted(state["dates"].items(), reverse=True)[:RECENT_DAYS]
+    ]
+    return "\n".join(lines) + "\n"
+
+
+def _render_ticker(ticker: str, stats: dict) -> str:
+    total = stats["bullish"] + stats["bearish"]
+    lines = [
+        f"# ${ticker}",
+        "",
+        f"{total} calls ({_EMOJI['BULLISH']} {stats['bullish']} / {_EMOJI['BEARISH']} {stats['bearish']})"
+        " — [Index](../index.md)",
+        "",
+        "| Date | Sentiment | Post | Trend |",
+        "|------|-----------|------|-------|",
+    ]
+    for call in stats["recent"]:
+        lines.append(
+            f"| [{call['date']}](../../{call['date']}.md) | {_EMOJI[call['sentiment']]} {call['sentiment']} "
+            f"| {_cell(call['post_text'])} | {_cell(call['trend'])} |"
+        )
+    return "\n".join(lines) + "\n"
+
+
+def _render_rollup(title: str, rollup: dict) -> str:
+    lines = [
+        f"# {title}",
+        "",
+        f"{_rollup_line(rollup)} — [Index](../index.md)",
+        "",
+        f"| Ticker | Calls | {_EMOJI['BULLISH']} | {_EMOJI['BEARISH']} | Net | Latest |",
+        "|--------|-------|----|----|-----|--------|",
+    ]
+    ranked = sorted(rollup.items(), key=lambda kv: (-(kv[1]["bullish"] + kv[1]["bearish"]), kv[0]))
+    for ticker, stats in ranked:
+        total = stats["bullish"] + stats["bearish"]
+        lines.append(
+            f"| [${ticker}](../tickers/{ticker}.md) | {total} | {stats['bullish']} | {stats['bearish']} "
+            f"| {stats['bullish'] - stats['bearish']:+d} | {_EMOJI[stats['latest']]} {stats['latest']} |"
+        )
+    return "\n".join(lines) + "\n"
+
+
+def _write_page(path: pathlib.Path, text: str) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(text, encoding="utf-8")
+
+
+def build(reports_dir: pathlib.Path | None = None, rebuild: bool = False) -> list[pathlib.Path]:
+    """前回以降に追記された判定を取り込み、関係する索引・集計ページだけを書き直す。
+
+    Args:
+        reports_dir: レポートのディレクトリ (索引は reports_dir/index/ に生成する)
+        rebuild: True なら途中結果を捨てて全 JSONL から作り直す
+
+    Returns:
+        書き直したページのパス
+    """
+    reports_dir = reports_dir or REPORTS_DIR
+    index_dir = reports_dir / "index"
+    manifest_path = index_dir / "manifest.json"
+    state = load_json_state(manifest_path, _empty_state())
+
+    sidecars = sorted(p for p in reports_dir.glob("*.jsonl") if _SIDECAR_RE.match(p.name))
+    # 読み込み済みの位置より短くなったファイルがあれば (書き換えられた)、作り直す
+    if (
+        rebuild
+        or state.get("version") != MANIFEST_VERSION
+        or any(p.stat().st_size < state["sources"].get(p.name, 0) for p in sidecars)
+    ):
+        state = _empty_state()
+        rebuild = True
+
+    affected: dict[str, set] = {"tickers": set(), "weeks": set(), "months": set()}
+    new_entries = 0
+    for path in sidecars:
+        offset = state["sources"].get(path.name, 0)
+        if path.stat().st_size == offset:
+            continue
+        records, state["sources"][path.name] = _read_new_lines(path, offset)
+        for entry in sorted(records, key=lambda entry: entry.get("ts", 0)):
+            _apply(state, entry, affected)
+        new_entries += len(records)
+
+    if not new_entries and not rebuild:
+        return []
+
+    written = []
+    for ticker in sorted(affected["tickers"]):
+        path = index_dir / "tickers" / f"{ticker}.md"
+        _write_page(path, _render_ticker(ticker, state["tickers"][ticker]))
+        written.append(path)
+    for week in sorted(affected["weeks"]):
+        path = index_dir / "weekly" / f"{week}.md"
+        _write_page(path, _render_rollup(f"Week {week}", state["weeks"][week]))
+        written.append(path)
+    for month in sorted(affected["months"]):
+        path = index_dir / "monthly" / f"{month}.md"
+        _write_page(path, _render_rollup(f"Month {month}", state["months"][month]))
+        written.append(path)
+    updated = datetime.datetime.now(datetime.timezone.utc).strftime("%Y-%m-%d %H:%M UTC")
+    _write_page(index_dir / "index.md", _render_index(state, updated))
+    written.append(index_dir / "index.md")
+
+    # ページを書き終えてから読み込み位置を進める (途中で落ちても次回に同じ行から再生成される)
+    save_json_state(manifest_path, state)
+    logger.info("レポート索引を更新: 新規 %d 件 / %d ページ", new_entries, len(written))
+    return written
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="レポートの索引・集計ページを差分で生成する")
+    parser.add_argument("--reports-dir", type=pathlib.Path, default=REPORTS_DIR)
+    parser.add_argument("--rebuild", action="store_true", help="途中結果を捨てて全件から作り直す")
+    args = parser.parse_args()
+    build(args.reports_dir, rebuild=args.rebuild)
@@ -0,0 +1,243 @@
+"""外部呼び出しの共通リトライ層 — 実行全体の期限・接続先ごとのサーキットブレーカー・呼び出し統計。
+
+関数ごとに独立した再試行回数・待ち時間を持つと、障害時に待ちが積み重なって実行時間が読めなくなる。
+このモジュールの resilient() で包んだ呼び出しは次の規則に従う。
+    - 再試行の待ちは実行全体の期限 (begin_run で開始) を越えない。越えるなら再試行せずに失敗する
+    - 接続先ごとに連続失敗を数え、BREAKER_FAILURES 回で遮断する。遮断中の呼び出しは即座に失敗し、
+      BREAKER_COOLDOWN_SEC 経過後に 1 回だけ試して復旧を確認する
+    - 接続先ごとの呼び出し・再試行・失敗・遮断の回数と所要時間を集計する (summary())
+"""
+
+import functools
+import math
+import os
+import threading
+import time
+from collections.abc import Callable
+
+from tenacity import Retrying, retry_if_not_exception_type, stop_after_attempt, wait_exponential
+
+from src.metrics import current as current_metrics
+from src.utils import setup_logger
+
+logger = setup_logger(__name__)
+
+# 1 回の実行で外部呼び出しに使える時間 (秒)。再試行の待ちはこの期限を越えない。
+RUN_BUDGET_SEC = float(os.environ.get("XBOT_RUN_BUDGET_SEC", "600"))
+
+# 接続先ごとのサーキットブレーカー: 遮断する連続失敗回数と、遮断後に再開を試すまでの秒数
+BREAKER_FAILURES = int(os.environ.get("XBOT_BREAKER_FAILURES", "5"))
+BREAKER_COOLDOWN_SEC = 300.0
+
+_deadline: float | None = None
+
+
+class CircuitOpenError(ConnectionError):
+    """接続先が遮断中のため呼び出さずに失敗した。"""
+
+
+class DeadlineExceeded(TimeoutError):
+    """実行全体の期限を過ぎたため呼び出さずに失敗した。"""
+
+
+def begin_run(budget: float = RUN_BUDGET_SEC) -> float:
+    """実行全体の期限を開始し、呼び出し統計をリセットする。
+
+    Returns:
+        期限 (time.monotonic() の値)
+    """
+    global _deadline
+    _deadline = time.monotonic() + budget
+    with _registry_lock:
+        _stats.clear()
+    return _deadline
+
+
+def deadline() -> float:
+    """実行全体の期限 (time.monotonic() の値)。開始前は無限大。"""
+    return math.inf if _deadline is None else _deadline
+
+
+def remaining() -> float:
+    """期限までの残り秒数 (開始前は無限大)。"""
+    return deadline() - time.monotonic()
+
+
+class CircuitBreaker:
+    """連続失敗で遮断 (open) し、冷却時間後に 1 回だけ試す (half-open) ブレーカー。"""
+
+    def __init__(
+        self,
+        name: str,
+        failures: int = BREAKER_FAILURES,
+        cooldown: float = BREAKER_COOLDOWN_SEC,
+    ) -> None:
+        self.name = name
+        self.failures = failures
+        self.cooldown = cooldown
+        self._consecutive = 0
+        self._opened_at: float | None = None
+        self._probing = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._opened_at is None:
+                return "closed"
+            if time.monotonic() - self._opened_at >= self.cooldown:
+                return "half_open"
+            return "open"
+
+    def before_call(self) -> None:
+        """呼び出してよいか判定する。遮断中なら CircuitOpenError を送出する。"""
+        with self._lock:
+            if self._opened_at is None:
+                return
+            if time.monotonic() - self._opened_at >= self.cooldown and not self._probing:
+                # 冷却時間が過ぎたら 1 件だけ通して復旧を確認する
+                self._probing = True
+                return
+        raise CircuitOpenError(f"{self.name} は遮断中 (連続 {self._consecutive} 回失敗)")
+
+    def record_success(self) -> None:
+        with self._lock:
+            if self._opened_at is not None:
+                logger.info("%s への接続が復旧しました", self.name)
+            self._consecutive = 0
+            self._opened_at = None
+            self._probing = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._consecutive += 1
+            if self._probing or (self._opened_at is None and self._consecutive >= self.failures):
+                if self._opened_at is None:
+                    logger.warning(
+                        "%s が連続 %d 回失敗したため遮断します (%.0f 秒後に再試行)",
+                        self.name,
+                        self._consecutive,
+                        self.cooldown,
+                    )
+                self._opened_at = time.monotonic()
+            self._probing = False
+
+    def release_probe(self) -> None:
+        """復旧確認の呼び出しが接続先に届かずに終わった場合に、状態を変えずに次の確認を許す。"""
+        with self._lock:
+            self._probing = False
+
+
+# 接続先名 → ブレーカー (プロセス内で共有し、常駐モードでは周回をまたいで引き継ぐ)
+_breakers: dict[str, CircuitBreaker] = {}
+# 接続先名 → 今回の実行の呼び出し統計
+_stats: dict[str, dict] = {}
+_registry_lock = threading.Lock()
+
+
+def breaker(host: str) -> CircuitBreaker:
+    """接続先のブレーカーを返す (初回に生成する)。"""
+    with _registry_lock:
+        if host not in _breakers:
+            _breakers[host] = CircuitBreaker(host)
+        return _breakers[host]
+
+
+def _record(host: str, key: str, latency: float | None = None) -> None:
+    with _registry_lock:
+        stats = _stats.setdefault(
+            host, {"calls": 0, "retries": 0, "failures": 0, "short_circuited": 0, "latencies": []}
+        )
+        stats[key] += 1
+        if latency is not None:
+            stats["latencies"].append(latency)
+
+
+def summary() -> dict[str, dict]:
+    """今回の実行の接続先ごとの統計 (回数と所要時間の中央値・95 パーセンタイル・最大、秒)。"""
+    result = {}
+    with _registry_lock:
+        items = [(host, dict(stats), sorted(stats["latencies"])) for host, stats in _stats.items()]
+    for host, stats, latencies in items:
+        del stats["latencies"]
+        if latencies:
+            stats["latency_p50_sec"] = round(latencies[len(latencies) // 2], 4)
+            stats["latency_p95_sec"] = round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))], 4)
+            stats["latency_max_sec"] = round(latencies[-1], 4)
+        stats["breaker"] = breaker(host).state
+        result[host] = stats
+    return result
+
+
+class _stop_at_deadline:
+    """次の待ちを入れると実行全体の期限を越える場合に再試行を打ち切る tenacity の stop。"""
+
+    def __call__(self, retry_state) -> bool:
+        return remaining() <= (retry_state.upcoming_sleep or 0.0)
+
+
+def resilient(
+    host: str,
+    attempts: int = 3,
+    min_wait: float = 2,
+    max_wait: float = 30,
+    ignore: tuple[type[BaseException], ...] = (),
+) -> Callable:
+    """外部呼び出しを期限・ブレーカー付きで再試行するデコレーター。
+
+    Args:
+        host: 接続先名 (ブレーカーと統計の単位)
+        attempts: 最大試行回数
+        min_wait / max_wait: 指数バックオフの待ち秒数の下限・上限
+        ignore: 再試行はするが、接続先の障害としては数えない例外 (応答内容の検証エラー等)
+    """
+
+    def decorator(fn: Callable) -> Callable:
+        def attempt(*args, **kwargs):
+            if remaining() <= 0:
+                raise DeadlineExceeded(f"実行の期限を過ぎたため {host} を呼び出しません")
+            host_breaker = breaker(host)
+            try:
+                host_breaker.before_call()
+            except CircuitOpenError:
+                _record(host, "short_circuited")
+                raise
+            start = time.perf_counter()
+            try:
+                result = fn(*args, **kwargs)
+            except DeadlineExceeded:
+                # 呼び出し前の待ち (クォータ等) で期限切れになった場合は接続先の障害ではない
+                host_breaker.release_probe()
+                raise
+            except ignore:
+                # 応答は返っているので、接続先とは正常に通信できたものとして扱う
+                _record(host, "calls", time.perf_counter() - start)
+                host_breaker.record_success()
+                raise
+            except Exception:
+                _record(host, "calls", time.perf_counter() - start)
+                _record(host, "failures")
+                host_breaker.record_failure()
+                raise
+            _record(host, "calls", time.perf_counter() - start)
+            host_breaker.record_success()
+            return result
+
+        def before_sleep(retry_state) -> None:
+            _record(host, "retries")
+            current_metrics().incr(f"retries.{fn.__name__}")
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            retrying = Retrying(
+                stop=stop_after_attempt(attempts) | _stop_at_deadline(),
+                wait=wait_exponential(multiplier=2, min=min_wait, max=max_wait),
+                retry=retry_if_not_exception_type((CircuitOpenError, DeadlineExceeded)),
+                before_sleep=before_sleep,
+                reraise=True,
+            )
+            return retrying(attempt, *args, **kwargs)
+
+        return wrapper
+
+    return decorator
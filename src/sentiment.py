@@ -0,0 +1,167 @@
+"""LLM 前のローカル一次判定 — 金融センチメント辞書と特徴量の重みで項目をまとめて採点する。
+
+採点は新規項目全体を 1 回の NumPy 演算で行う。ティッカーごとの集計値がしきい値を超えるか、
+ティッカー間で強気・弱気が割れている場合だけ Gemini を呼ぶ。
+"""
+
+from __future__ import annotations
+
+import math
+import os
+import re
+import time
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import numpy as np
+
+# 金融ニュース・掲示板向けの簡易センチメント辞書 (語 → 重み)
+LEXICON = {
+    # 強気
+    "beat": 1.0, "beats": 1.0, "surge": 1.0, "surges": 1.0, "soar": 1.0, "soars": 1.0,
+    "rally": 0.8, "rallies": 0.8, "jump": 0.7, "jumps": 0.7, "gain": 0.5, "gains": 0.5,
+    "record": 0.6, "upgrade": 1.0, "upgraded": 1.0, "outperform": 0.8, "bullish": 1.0,
+    "growth": 0.4, "raise": 0.5, "raises": 0.5, "strong": 0.5, "buyback": 0.6,
+    "dividend": 0.3, "partnership": 0.4, "approval": 0.7, "approved": 0.7, "profit": 0.4,
+    "breakout": 0.8, "moon": 0.8, "calls": 0.5, "tendies": 0.6, "squeeze": 0.6,
+    # 弱気
+    "miss": -1.0, "misses": -1.0, "plunge": -1.0, "plunges": -1.0, "tumble": -1.0,
+    "tumbles": -1.0, "slump": -0.8, "falls": -0.6, "drop": -0.6, "drops": -0.6,
+    "downgrade": -1.0, "downgraded": -1.0, "underperform": -0.8, "bearish": -1.0,
+    "selloff": -0.8, "lawsuit": -0.7, "probe": -0.6, "antitrust": -0.5, "recall": -0.7,
+    "layoffs": -0.6, "delay": -0.5, "delays": -0.5, "cut": -0.5, "cuts": -0.5,
+    "weak": -0.5, "loss": -0.6, "losses": -0.6, "warning": -0.6, "tariff": -0.4,
+    "tariffs": -0.4, "fraud": -1.0, "bankruptcy": -1.0, "puts": -0.5, "bagholder": -0.6,
+}
+
+# 直後の語のセンチメントを反転させる語
+NEGATORS = frozenset({"not", "no", "never", "without", "fails", "failed"})
+
+# ティッカー集計のしきい値 (|スコア| がこれ以上で Gemini を呼ぶ)。0 以下なら常に呼ぶ。
+SENTIMENT_THRESHOLD = float(os.environ.get("XBOT_SENTIMENT_THRESHOLD", "0.3"))
+# 強気・弱気の割れとみなす |スコア| (しきい値未満でもこの幅で対立していれば呼ぶ)
+DISAGREEMENT_MARGIN = SENTIMENT_THRESHOLD / 2
+
+# 集計時の縮小量 (件数換算)。件数 n のティッカーは加重平均を n / (n + AGGREGATE_PRIOR) 倍する。
+# 件数の少ないティッカーほど 0 に寄るが、重み (新しさ・人気) の大小には左右されない。
+AGGREGATE_PRIOR = 1.0
+
+# 特徴量の重み: 経過時間による減衰 (時間)、Reddit スコアによる増幅の上限
+RECENCY_DECAY_HOURS = 12.0
+POPULARITY_BOOST = 1.0
+
+_WORD_RE = re.compile(r"[a-z]+")
+
+
+def _lexicon_hits(text: str) -> list[float]:
+    """本文中の辞書語の重み (否定語の直後は符号を反転)。"""
+    hits = []
+    negate = False
+    for word in _WORD_RE.findall(text.lower()):
+        weight = LEXICON.get(word)
+        if weight is not None:
+            hits.append(-weight if negate else weight)
+        negate = word in NEGATORS
+    return hits
+
+
+def score_items(items: list[dict], now: float | None = None) -> tuple[np.ndarray, np.ndarray]:
+    """各項目のセンチメント (-1〜1) と集計用の重みを返す。
+
+    センチメントは辞書語の重みの和を語数の平方根で正規化して tanh に通したもの。
+    重みは新しさ (指数減衰) × 人気 (Reddit スコアの対数) で、辞書語を含まない項目は 0。
+    """
+    import numpy as np
+
+    now = time.time() if now is None else now
+    n = len(items)
+    rows: list[int] = []
+    values: list[float] = []
+    for i, item in enumerate(items):
+        text = " ".join(item.get(key, "") for key in ("title", "summary", "selftext"))
+        hits = _lexicon_hits(text)
+        rows.extend([i] * len(hits))
+        values.extend(hits)
+
+    rows_arr = np.asarray(rows, dtype=np.int64)
+    raw = np.bincount(rows_arr, weights=np.asarray(values, dtype=np.float64), minlength=n)
+    counts = np.bincount(rows_arr, minlength=n)
+    sentiment = np.tanh(raw / np.sqrt(np.maximum(counts, 1)))
+
+    timestamps = np.array(
+        [item.get("published") or item.get("created_utc") or np.nan for item in items], dtype=np.float64
+    )
+    age_hours = np.maximum(now - timestamps, 0.0) / 3600
+    recency = np.where(np.isnan(timestamps), 0.5, np.exp(-age_hours / RECENCY_DECAY_HOURS))
+    scores = np.array([max(item.get("score", 0), 0) for item in items], dtype=np.float64)
+    popularity = 1.0 + POPULARITY_BOOST * np.log1p(scores) / math.log1p(10000)
+    weights = np.where(counts > 0, recency * popularity, 0.0)
+    return sentiment, weights
+
+
+def triage(news: list[dict], reddit: list[dict], now: float | None = None) -> dict:
+    """新規項目を採点し、ティッカーごとの一次判定と Gemini を呼ぶべきティッカーを返す。
+
+    各項目には "sentiment_score" を付与する。辞書語を含まない項目は入力から除き、
+    残りはシグナルの強い順に並べる。
+
+    Returns:
+        dict:
+            - news / reddit: シグナルのある項目 (強い順)
+            - tickers: ティッカー → {"score", "sentiment", "items"} (一次判定)
+            - active: Gemini を呼ぶティッカー (しきい値超え、または強気・弱気の割れ)
+    """
+    import numpy as np
+
+    items = news + reddit
+    if not items:
+        return {"news": [], "reddit": [], "tickers": {}, "active": []}
+    sentiment, weights = score_items(items, now)
+
+    # (項目, ティッカー) の組ごとに重み付きで集計する。ティッカーのない投稿は集計しない。
+    ticker_index: dict[str, int] = {}
+    pair_items: list[int] = []
+    pair_tickers: list[int] = []
+    for i, item in enumerate(items):
+        for ticker in item.get("tickers", []):
+            pair_items.append(i)
+            pair_tickers.append(ticker_index.setdefault(ticker, len(ticker_index)))
+    pair_items_arr = np.asarray(pair_items, dtype=np.int64)
+    pair_tickers_arr = np.asarray(pair_tickers, dtype=np.int64)
+    m = len(ticker_index)
+    pair_weights = weights[pair_items_arr]
+    weighted = np.bincount(pair_tickers_arr, weights=pair_weights * sentiment[pair_items_arr], minlength=m)
+    total = np.bincount(pair_tickers_arr, weights=pair_weights, minlength=m)
+    n_items = np.bincount(pair_tickers_arr, weights=(pair_weights > 0).astype(np.float64), minlength=m)
+    mean = np.divide(weighted, total, out=np.zeros(m), where=total > 0)
+    aggregate = mean * n_items / (n_items + AGGREGATE_PRIOR)
+
+    tickers = {
+        ticker: {
+            "score": round(float(aggregate[j]), 3),
+            "sentiment": "BULLISH" if aggregate[j] >= 0 else "BEARISH",
+            "items": int(n_items[j]),
+        }
+        for ticker, j in ticker_index.items()
+    }
+
+    if SENTIMENT_THRESHOLD <= 0:
+        active = list(ticker_index)
+    else:
+        strength = np.abs(aggregate)
+        disagree = m > 0 and (
+            aggregate.max() >= DISAGREEMENT_MARGIN and aggregate.min() <= -DISAGREEMENT_MARGIN
+        )
+        cutoff = DISAGREEMENT_MARGIN if disagree else SENTIMENT_THRESHOLD
+        active = [ticker for ticker, j in ticker_index.items() if strength[j] >= cutoff]
+
+    for item, value in zip(items, sentiment.tolist()):
+        item["sentiment_score"] = round(value, 3)
+    order = np.argsort(-(np.abs(sentiment) * weights), kind="stable")
+    ranked = [items[i] for i in order.tolist() if weights[i] > 0]
+    return {
+        "news": [item for item in ranked if "subreddit" not in item],
+        "reddit": [item for item in ranked if "subreddit" in item],
+        "tickers": tickers,
+        "active": active,
+    }
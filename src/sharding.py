@@ -0,0 +1,191 @@
+"""分割実行 — ニュースのバッチとサブレディットを N 個のシャードに分けて並行に処理し、結果を統合する。
+
+各シャード (python -m src.main --shard i/N) は共有の状態を読むだけで、書き込みは
+data/shards/<i>-of-<N>/ と reports/shards/<i>-of-<N>/ にのみ行う。統合 (--merge N) では
+    - 処理済み ID・送信キュー・時系列・生データのアーカイブ: 和集合
+    - RSS 検証子・Reddit カーソル: シャードごとに担当が重ならないため、キー単位で反映
+    - レポート: シャード番号順に本文を連結 (計測値などの JSON Lines は追記、画像は移動)
+を行う。シャード同士が同じファイルを書くことはないので、並行に動かしても状態が上書きで失われない。
+統合の各段階は取り込んでから断片を削除する順で、どの段階で落ちても、やり直せば同じ結果になる。
+"""
+
+import pathlib
+import shutil
+import subprocess
+import sys
+
+from src import news_fetcher, reddit_loader, utils
+from src.archive import SnapshotArchive
+from src.outbox import Outbox
+from src.timeseries import TimeSeriesStore
+from src.utils import load_json_state, save_json_state, setup_logger, shard_dir, shard_path
+
+logger = setup_logger(__name__)
+
+PROJECT_ROOT = pathlib.Path(__file__).resolve().parent.parent
+
+# レポート断片の追記前の長さ (統合のやり直しで二重に追記しないための記録)。断片のディレクトリに置く。
+MERGE_JOURNAL_NAME = ".merge_journal.json"
+
+
+def parse_shard(spec: str) -> tuple[int, int]:
+    """"i/N" 形式のシャード指定を (i, N) にする。"""
+    index_str, sep, count_str = spec.partition("/")
+    try:
+        index, count = int(index_str), int(count_str)
+    except ValueError:
+        raise ValueError(f"シャードは i/N 形式で指定してください: {spec!r}") from None
+    if not sep or not 0 <= index < count:
+        raise ValueError(f"シャード番号が範囲外: {spec!r}")
+    return index, count
+
+
+def run_workers(count: int) -> list[int]:
+    """シャード 0〜count-1 をそれぞれ別プロセスで並行に実行する。
+
+    Returns:
+        シャードごとの終了コード
+    """
+    processes = [
+        subprocess.Popen([sys.executable, "-m", "src.main", "--shard", f"{index}/{count}"], cwd=PROJECT_ROOT)
+        for index in range(count)
+    ]
+    codes = [process.wait() for process in processes]
+    for index, code in enumerate(codes):
+        if code != 0:
+            logger.error("シャード %d/%d が異常終了しました (終了コード %d)", index, count, code)
+    return codes
+
+
+def _merge_json_state(path: pathlib.Path, fragment: pathlib.Path) -> None:
+    if not fragment.exists():
+        return
+    state = load_json_state(path, {})
+    state.update(load_json_state(fragment, {}))
+    save_json_state(path, state)
+    fragment.unlink()
+
+
+def _append_fragment(target: pathlib.Path, body: str, journal_path: pathlib.Path, journal: dict) -> None:
+    """target に body を追記する。
+
+    追記前の target の長さを journal に記録してから書くため、追記の後・断片の削除前に落ちた
+    統合をやり直す場合は、記録した長さまで切り詰めてから追記し直す (二重に追記しない)。
+    """
+    size = journal.get(target.name)
+    if size is not None and target.stat().st_size > size:
+        with open(target, "r+b") as f:
+            f.truncate(size)
+    journal[target.name] = target.stat().st_size
+    save_json_state(journal_path, journal)
+    with open(target, "a", encoding="utf-8") as f:
+        f.write(body)
+
+
+def _merge_reports(reports_dir: pathlib.Path, fragment_dir: pathlib.Path) -> int:
+    """シャードのレポート断片を reports_dir に統合する。
+
+    Markdown は見出し (先頭の "# " 行) を除いた本文を追記し、JSON Lines は追記、
+    それ以外 (カード画像) は移動する。統合した断片は削除する (統合をやり直しても二重にならない)。
+
+    Returns:
+        統合したファイル数
+    """
+    if not fragment_dir.is_dir():
+        return 0
+    reports_dir.mkdir(parents=True, exist_ok=True)
+    journal_path = fragment_dir / MERGE_JOURNAL_NAME
+    journal = load_json_state(journal_path, {})
+    merged = 0
+    for fragment in sorted(p for p in fragment_dir.iterdir() if p.is_file() and p != journal_path):
+        target = reports_dir / fragment.name
+        if fragment.suffix == ".md" and target.exists():
+            body = fragment.read_text(encoding="utf-8")
+            if body.startswith("# "):
+                body = body.partition("\n")[2].lstrip("\n")
+            _append_fragment(target, body, journal_path, journal)
+            fragment.unlink()
+        elif fragment.suffix == ".jsonl" and target.exists():
+            _append_fragment(target, fragment.read_text(encoding="utf-8"), journal_path, journal)
+            fragment.unlink()
+        else:
+            if target.exists():
+                logger.warning("統合先の %s を同名のシャードの断片で置き換えます", target.name)
+            fragment.replace(target)
+        merged += 1
+    return merged
+
+
+def _remove_dir(path: pathlib.Path) -> None:
+    shutil.rmtree(path, ignore_errors=True)
+    # 最後のシャードなら空になった shards/ も消す
+    try:
+        path.parent.rmdir()
+    except OSError:
+        pass
+
+
+def merge_shards(
+    count: int,
+    reports_dir: pathlib.Path,
+    outbox: Outbox,
+    timeseries_store: TimeSeriesStore,
+    snapshot_archive: SnapshotArchive,
+) -> dict[str, int]:
+    """シャード 0〜count-1 の状態・レポートを共有の状態・レポートに統合する。
+
+    Returns:
+        {"shards": 統合したシャード数, "ids": 追加された処理済み ID 数,
+         "posts": 取り込んだ投稿数, "records": 取り込んだ時系列レコード数, "reports": 統合したレポートのファイル数}
+    """
+    totals = {"shards": 0, "ids": 0, "posts": 0, "records": 0, "reports": 0}
+    store = utils.ProcessedIdStore(utils.STATE_PATH)
+    for index in range(count):
+        shard = (index, count)
+        state_dir = shard_path(utils.STATE_PATH, shard).parent
+        fragment_dir = shard_dir(reports_dir, shard)
+        if not state_dir.is_dir() and not fragment_dir.is_dir():
+            logger.warning("シャード %d/%d の出力がありません", index, count)
+            continue
+
+        ids_path = shard_path(utils.STATE_PATH, shard)
+        totals["ids"] += store.include(ids_path, persist=True)
+        store.flush()
+        ids_path.unlink(missing_ok=True)
+
+        _merge_json_state(news_fetcher.FEED_CACHE_PATH, shard_path(news_fetcher.FEED_CACHE_PATH, shard))
+        _merge_json_state(
+            reddit_loader.REDDIT_CURSOR_PATH, shard_path(reddit_loader.REDDIT_CURSOR_PATH, shard)
+        )
+
+        outbox_path = shard_path(outbox.path, shard)
+        if outbox_path.exists():
+            # 画像はレポートの統合で reports_dir 直下に移るため、参照先もそちらに付け替える
+            totals["posts"] += outbox.absorb(outbox_path, media_dir=reports_dir)
+            outbox_path.unlink()
+
+        timeseries_dir = shard_path(timeseries_store.root, shard)
+        if timeseries_dir.is_dir():
+            totals["records"] += timeseries_store.absorb(timeseries_dir)
+            shutil.rmtree(timeseries_dir)
+
+        archive_dir = shard_path(snapshot_archive.root, shard)
+        if archive_dir.is_dir():
+            snapshot_archive.absorb(archive_dir)
+            shutil.rmtree(archive_dir)
+
+        totals["reports"] += _merge_reports(reports_dir, fragment_dir)
+        _remove_dir(state_dir)
+        _remove_dir(fragment_dir)
+        totals["shards"] += 1
+
+    logger.info(
+        "シャードを統合: %d/%d 件 (処理済み ID +%d / 投稿 %d 件 / 時系列 %d 件 / レポート %d ファイル)",
+        totals["shards"],
+        count,
+        totals["ids"],
+        totals["posts"],
+        totals["records"],
+        totals["reports"],
+    )
+    return totals
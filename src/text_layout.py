@@ -0,0 +1,168 @@
+"""カード描画用のテキストレイアウト — フォントとグリフ幅をキャッシュし、線形時間で折り返す。"""
+
+from __future__ import annotations
+
+import functools
+import pathlib
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from PIL import ImageFont
+
+# 見出し (ティッカー・ラベル) 用フォント
+FONT_CANDIDATES = [
+    "/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf",
+    "/usr/share/fonts/TTF/DejaVuSans-Bold.ttf",
+    "/System/Library/Fonts/Helvetica.ttc",
+]
+
+# 本文 (日本語を含む解説) 用フォント。CJK フォントがなければ見出し用にフォールバックする。
+BODY_FONT_CANDIDATES = [
+    "/usr/share/fonts/opentype/noto/NotoSansCJK-Bold.ttc",
+    "/usr/share/fonts/noto-cjk/NotoSansCJK-Bold.ttc",
+    "/System/Library/Fonts/ヒラギノ角ゴシック W6.ttc",
+    *FONT_CANDIDATES,
+]
+
+LINE_SPACING = 8
+
+# 行数の上限で切り詰めたときに最終行の末尾に付ける記号
+ELLIPSIS = "…"
+
+# 行頭禁則文字 (直前の文字と分けない)
+NO_LINE_START = set("、。，．,.!?！？）)]」』】〕〉》ー～…‥・：；:;ぁぃぅぇぉっゃゅょゎァィゥェォッャュョヮヵヶ%％")
+# 行末禁則文字 (直後の文字と分けない)
+NO_LINE_END = set("（([「『【〔〈《$＄")
+
+
+class FontMetrics:
+    """フォントとグリフごとの送り幅キャッシュ。"""
+
+    def __init__(self, font: ImageFont.FreeTypeFont | ImageFont.ImageFont) -> None:
+        self.font = font
+        self._advances: dict[str, float] = {}
+        self.line_height = font.getbbox("あ")[3] + LINE_SPACING
+
+    def advance(self, char: str) -> float:
+        width = self._advances.get(char)
+        if width is None:
+            width = self._advances[char] = self.font.getlength(char)
+        return width
+
+    def width(self, text: str) -> float:
+        return sum(self.advance(c) for c in text)
+
+
+@functools.lru_cache(maxsize=None)
+def _find_font(candidates: tuple[str, ...]) -> str | None:
+    for path in candidates:
+        if pathlib.Path(path).exists():
+            return path
+    return None
+
+
+@functools.lru_cache(maxsize=None)
+def _metrics_for(path: str | None, size: int) -> FontMetrics:
+    from PIL import ImageFont
+
+    if path is None:
+        return FontMetrics(ImageFont.load_default())
+    return FontMetrics(ImageFont.truetype(path, size))
+
+
+def get_metrics(size: int, body: bool = False) -> FontMetrics:
+    """サイズ (と用途) に対応するフォントを返す。フォントはプロセス内で共有される。"""
+    path = _find_font(tuple(BODY_FONT_CANDIDATES if body else FONT_CANDIDATES))
+    return _metrics_for(path, size)
+
+
+def load_font(size: int, body: bool = False) -> ImageFont.FreeTypeFont | ImageFont.ImageFont:
+    """利用可能なフォントを読み込む。見つからなければデフォルトフォントを返す。"""
+    return get_metrics(size, body).font
+
+
+def _is_word_char(char: str) -> bool:
+    """欧文の単語を構成する文字か (単語の途中では改行しない)。"""
+    return char.isascii() and (char.isalnum() or char in "'-_")
+
+
+def _break_units(text: str) -> list[str]:
+    """改行可能位置で区切った単位の列を返す。
+
+    欧文は単語単位、CJK は 1 文字単位。禁則文字は前後の単位に連結する。
+    """
+    units: list[str] = []
+    glue_next = False
+    for char in text:
+        if units and (
+            glue_next
+            or char in NO_LINE_START
+            or (_is_word_char(char) and _is_word_char(units[-1][-1]))
+        ):
+            units[-1] += char
+        else:
+            units.append(char)
+        glue_next = char in NO_LINE_END
+    return units
+
+
+def wrap_text(
+    text: str, metrics: FontMetrics, max_width: float, max_lines: int | None = None
+) -> list[str]:
+    """テキストを max_width 内に収まるよう折り返した行のリストを返す。
+
+    各グリフの送り幅はキャッシュ済みの値を足し合わせるだけなので、文字数に対して線形時間。
+    max_lines を指定すると、それを超える分を切り捨てて最終行の末尾を "…" にする。
+    """
+    lines = _wrap_lines(text, metrics, max_width)
+    if max_lines is None or len(lines) <= max_lines:
+        return lines
+    if max_lines <= 0:
+        return []
+    last = lines[max_lines - 1].rstrip()
+    width = metrics.width(last) + metrics.advance(ELLIPSIS)
+    while last and width > max_width:
+        width -= metrics.advance(last[-1])
+        last = last[:-1]
+    return lines[: max_lines - 1] + [last.rstrip() + ELLIPSIS]
+
+
+def _wrap_lines(text: str, metrics: FontMetrics, max_width: float) -> list[str]:
+    lines: list[str] = []
+    current = ""
+    current_width = 0.0
+
+    for unit in _break_units(text):
+        if unit == "\n":
+            lines.append(current)
+            current, current_width = "", 0.0
+            continue
+
+        unit_width = metrics.width(unit)
+        if current_width + unit_width <= max_width:
+            current += unit
+            current_width += unit_width
+            continue
+
+        if current.strip():
+            lines.append(current.rstrip())
+        current, current_width = "", 0.0
+        if unit.isspace():
+            continue
+
+        # 1 単位だけで行幅を超える場合 (長い URL など) は文字単位で分割する
+        if unit_width > max_width:
+            for char in unit:
+                char_width = metrics.advance(char)
+                if current and current_width + char_width > max_width:
+                    lines.append(current)
+                    current, current_width = "", 0.0
+                current += char
+                current_width += char_width
+            continue
+
+        current, current_width = unit, unit_width
+
+    if current.strip():
+        lines.append(current.rstrip())
+    return lines
@@ -0,0 +1,217 @@
+"""ティッカーごとの分析結果の時系列ストア — 固定長レコードの追記専用ファイルを memmap で読む。
+
+ファイルは data/timeseries/<TICKER>.bin。1 レコード = 1 回の分析で、時刻順に追記される。
+期間の絞り込みは時刻列の二分探索、移動窓の集計は累積和の差分で行うため、
+履歴が何か月分あってもクエリは読み込む範囲の大きさにしか依存しない。
+"""
+
+from __future__ import annotations
+
+import math
+import pathlib
+import threading
+import time
+from typing import TYPE_CHECKING
+
+from src.utils import DATA_DIR, setup_logger
+
+if TYPE_CHECKING:
+    import numpy as np
+
+logger = setup_logger(__name__)
+
+TIMESERIES_DIR = DATA_DIR / "timeseries"
+
+# レコードのレイアウト (リトルエンディアン固定。フィールドの追加は末尾に限り、別ファイル名にすること)
+RECORD_FIELDS = [
+    ("ts", "<f8"),             # 分析時刻 (UNIX 秒)
+    ("sentiment", "<i1"),      # Gemini の判定: +1 = BULLISH, -1 = BEARISH
+    ("local_score", "<f4"),    # ローカル一次判定の集計値 (-1〜1、なければ NaN)
+    ("news_items", "<u2"),     # 入力に含めたニュース件数
+    ("reddit_items", "<u2"),   # 入力に含めた Reddit 投稿件数
+    ("prompt_tokens", "<u4"),  # 入力の推定トークン数
+]
+
+DAY_SEC = 86400
+
+
+def _dtype() -> np.dtype:
+    import numpy as np
+
+    return np.dtype(RECORD_FIELDS)
+
+
+class TimeSeriesStore:
+    """ティッカーごとの追記専用レコードファイル群。
+
+    base を指定すると、読み出しは base の履歴に自分のレコードを続けたものになる
+    (分割実行のシャードが共有の履歴を読みつつ、自分のディレクトリにだけ追記する場合)。
+    """
+
+    def __init__(self, root: pathlib.Path = TIMESERIES_DIR, base: pathlib.Path | None = None) -> None:
+        self.root = pathlib.Path(root)
+        self.base = TimeSeriesStore(base) if base is not None else None
+        self._lock = threading.Lock()
+
+    def _path(self, ticker: str) -> pathlib.Path:
+        return self.root / f"{ticker}.bin"
+
+    def append(
+        self,
+        ticker: str,
+        sentiment: str,
+        local_score: float | None = None,
+        news_items: int = 0,
+        reddit_items: int = 0,
+        prompt_tokens: int = 0,
+        ts: float | None = None,
+    ) -> None:
+        """分析結果を 1 件追記する。"""
+        import numpy as np
+
+        record = np.zeros(1, dtype=_dtype())
+        record["ts"] = time.time() if ts is None else ts
+        record["sentiment"] = 1 if sentiment == "BULLISH" else -1
+        record["local_score"] = math.nan if local_score is None else local_score
+        record["news_items"] = min(news_items, 0xFFFF)
+        record["reddit_items"] = min(reddit_items, 0xFFFF)
+        record["prompt_tokens"] = prompt_tokens
+
+        with self._lock:
+            self.root.mkdir(parents=True, exist_ok=True)
+            path = self._path(ticker)
+            with open(path, "ab") as f:
+                # 書き込み途中で落ちた不完全なレコードがあれば、その直後から書き直す
+                f.truncate(f.tell() - f.tell() % record.itemsize)
+                f.write(record.tobytes())
+
+    def load(self, ticker: str) -> np.ndarray:
+        """ティッカーの全レコード (読み取り専用の memmap。履歴がなければ空配列)。"""
+        import numpy as np
+
+        records = self._load_own(ticker)
+        if self.base is not None:
+            base_records = self.base.load(ticker)
+            if len(base_records):
+                return np.concatenate((base_records, records)) if len(records) else base_records
+        return records
+
+    def _load_own(self, ticker: str) -> np.ndarray:
+        import numpy as np
+
+        dtype = _dtype()
+        path = self._path(ticker)
+        size = path.stat().st_size if path.exists() else 0
+        count = size // dtype.itemsize
+        if count == 0:
+            return np.zeros(0, dtype=dtype)
+        return np.memmap(path, dtype=dtype, mode="r", shape=(count,))
+
+    def absorb(self, other_root: pathlib.Path) -> int:
+        """別のディレクトリ (シャードのストア) のレコードを取り込む。
+
+        取り込むレコードがすべて既存の末尾より新しければ追記のみ、そうでなければ
+        時刻順に並べ直して書き直す。既存と同一のレコードは取り込まないため、
+        途中で落ちた統合をやり直しても二重にならない。
+
+        Returns:
+            取り込んだレコード数
+        """
+        import numpy as np
+
+        other = TimeSeriesStore(other_root)
+        total = 0
+        for path in sorted(pathlib.Path(other_root).glob("*.bin")):
+            ticker = path.stem
+            incoming = np.array(other.load(ticker))
+            if not len(incoming):
+                continue
+            incoming = incoming[np.argsort(incoming["ts"], kind="stable")]
+            with self._lock:
+                self.root.mkdir(parents=True, exist_ok=True)
+                existing = np.array(self._load_own(ticker))
+                if len(existing):
+                    seen = {record.tobytes() for record in existing[existing["ts"] >= incoming["ts"][0]]}
+                    incoming = incoming[np.array([record.tobytes() not in seen for record in incoming], dtype=bool)]
+                    if not len(incoming):
+                        continue
+                target = self._path(ticker)
+                if not len(existing) or existing["ts"][-1] <= incoming["ts"].min():
+                    with open(target, "ab") as f:
+                        f.truncate(f.tell() - f.tell() % incoming.itemsize)
+                        f.write(incoming.tobytes())
+                else:
+                    merged = np.concatenate((existing, incoming))
+                    merged = merged[np.argsort(merged["ts"], kind="stable")]
+                    tmp_path = target.with_suffix(".tmp")
+                    merged.tofile(tmp_path)
+                    tmp_path.replace(target)
+            total += len(incoming)
+        return total
+
+    def range(self, ticker: str, start: float | None = None, end: float | None = None) -> np.ndarray:
+        """start <= ts < end のレコード。"""
+        import numpy as np
+
+        records = self.load(ticker)
+        ts = records["ts"]
+        lo = 0 if start is None else int(np.searchsorted(ts, start, side="left"))
+        hi = len(records) if end is None else int(np.searchsorted(ts, end, side="left"))
+        return records[lo:hi]
+
+    def summary(self, ticker: str, days: float, now: float | None = None) -> dict:
+        """直近 days 日の集計 (件数・強気/弱気の件数・平均判定・ローカル判定の平均)。"""
+        import numpy as np
+
+        now = time.time() if now is None else now
+        records = self.range(ticker, now - days * DAY_SEC, math.inf)
+        count = len(records)
+        sentiment = records["sentiment"].astype(np.float64)
+        local = records["local_score"].astype(np.float64)
+        has_local = ~np.isnan(local)
+        return {
+            "days": days,
+            "count": count,
+            "bullish": int((sentiment > 0).sum()),
+            "bearish": int((sentiment < 0).sum()),
+            "mean_sentiment": round(float(sentiment.mean()), 3) if count else None,
+            "mean_local_score": round(float(local[has_local].mean()), 3) if has_local.any() else None,
+        }
+
+    def rolling(
+        self,
+        ticker: str,
+        window_days: float,
+        start: float,
+        end: float,
+        step_days: float = 1.0,
+    ) -> dict[str, np.ndarray]:
+        """start〜end を step_days 刻みにした各時点 t について、(t - window, t] の集計を返す。
+
+        Returns:
+            {"t": 時点, "count": 件数, "mean_sentiment": 判定の平均 (件数 0 なら NaN)}
+        """
+        import numpy as np
+
+        window = window_days * DAY_SEC
+        records = self.range(ticker, start - window, end)
+        ts = np.asarray(records["ts"])
+        cumsum = np.concatenate(([0.0], np.cumsum(records["sentiment"], dtype=np.float64)))
+
+        grid = np.arange(start, end, step_days * DAY_SEC, dtype=np.float64)
+        hi = np.searchsorted(ts, grid, side="right")
+        lo = np.searchsorted(ts, grid - window, side="right")
+        count = hi - lo
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean = np.where(count > 0, (cumsum[hi] - cumsum[lo]) / count, np.nan)
+        return {"t": grid, "count": count, "mean_sentiment": mean}
+
+
+def format_trend(summaries: list[dict]) -> str:
+    """summary() の結果を 1 行の傾向表示にする (例: "7D ↑5 ↓2 (+0.43)  30D ↑12 ↓9 (+0.14)")。"""
+    parts = []
+    for s in summaries:
+        if not s["count"]:
+            continue
+        parts.append(f"{s['days']:g}D ↑{s['bullish']} ↓{s['bearish']} ({s['mean_sentiment']:+.2f})")
+    return "  ".join(parts)
@@ -1,10 +1,23 @@
 """Logger & State helpers."""
 
+import hashlib
 import json
 import logging
 import pathlib
+import time
 
-STATE_PATH = pathlib.Path(__file__).resolve().parent.parent / "data" / "processed_ids.json"
+DATA_DIR = pathlib.Path(__file__).resolve().parent.parent / "data"
+STATE_PATH = DATA_DIR / "processed_ids.tsv"
+LEGACY_STATE_PATH = DATA_DIR / "processed_ids.json"
+
+# 処理済み ID の保持期間 (これより古い ID はロード時に破棄する)
+STATE_RETENTION_DAYS = 30
+
+# 期限切れ行がこの割合を超えたらファイルを書き直す (それ以外は追記のみ)
+STATE_COMPACT_RATIO = 0.25
+
+# 分割実行 (--shard i/N) で担当するシャード (番号, 総数)。通常実行では None。
+_shard: tuple[int, int] | None = None
 
 
 def setup_logger(name: str = "xbot") -> logging.Logger:
@@ -20,21 +33,256 @@ def setup_logger(name: str = "xbot") -> logging.Logger:
     return logger
 
 
-def load_processed_ids() -> list[str]:
-    """processed_ids.json を読み込んで ID リストを返す。"""
-    if not STATE_PATH.exists():
-        return []
-    with open(STATE_PATH, encoding="utf-8") as f:
+logger = setup_logger(__name__)
+
+
+def load_json_state(path: pathlib.Path, default):
+    """JSON 状態ファイルを読み込む。存在しなければ default を返す。"""
+    if not path.exists():
+        return default
+    with open(path, encoding="utf-8") as f:
         return json.load(f)
 
 
-def save_processed_ids(ids: list[str]) -> None:
-    """ID リストを processed_ids.json に書き出す。"""
-    STATE_PATH.parent.mkdir(parents=True, exist_ok=True)
-    with open(STATE_PATH, "w", encoding="utf-8") as f:
-        json.dump(ids, f, ensure_ascii=False, indent=2)
+def save_json_state(path: pathlib.Path, data) -> None:
+    """JSON 状態ファイルを一時ファイル経由で書き出す。"""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(path.suffix + ".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=2, sort_keys=True)
+    tmp_path.replace(path)
+
+
+def set_shard(index: int, count: int) -> None:
+    """この実行を分割実行のシャード index/count として扱う (状態・レポートの書き込み先が変わる)。"""
+    global _shard
+    if not 0 <= index < count:
+        raise ValueError(f"シャード番号が範囲外: {index}/{count}")
+    _shard = (index, count)
+
+
+def current_shard() -> tuple[int, int] | None:
+    """担当シャード (番号, 総数)。通常実行では None。"""
+    return _shard
+
+
+def shard_dir(root: pathlib.Path, shard: tuple[int, int] | None = None) -> pathlib.Path:
+    """root 配下のシャード専用ディレクトリ (root/shards/<i>-of-<N>)。
+
+    shard を省略すると担当シャードを使い、通常実行では root をそのまま返す。
+    """
+    shard = shard or _shard
+    if shard is None:
+        return root
+    index, count = shard
+    return root / "shards" / f"{index}-of-{count}"
+
+
+def shard_path(path: pathlib.Path, shard: tuple[int, int] | None = None) -> pathlib.Path:
+    """状態ファイル path のシャード用のパス (data/x.json → data/shards/<i>-of-<N>/x.json)。"""
+    return shard_dir(path.parent, shard) / path.name
+
+
+def shard_slice(items: list) -> list:
+    """items のうち担当シャードの分 (i 番目から N 個おき)。通常実行では全件。"""
+    if _shard is None:
+        return list(items)
+    index, count = _shard
+    return list(items[index::count])
+
+
+def load_layered_json_state(path: pathlib.Path) -> dict:
+    """共有の状態ファイル (dict) に、担当シャードの状態ファイルを重ねて読み込む。
+
+    シャードは共有の状態を読むだけで、書き込みは shard_path(path) にのみ行う。
+    """
+    state = load_json_state(path, {})
+    if _shard is not None:
+        state.update(load_json_state(shard_path(path), {}))
+    return state
+
+
+def _hash_id(item_id: str) -> str:
+    """ID を固定長 (16 桁 hex) のダイジェストに変換する。"""
+    return hashlib.blake2b(item_id.encode("utf-8"), digest_size=8).hexdigest()
+
+
+class ProcessedIdStore:
+    """処理済み ID のハッシュ集合 (追記専用ファイル + 期限切れ破棄)。
+
+    ファイルは 1 行 1 件の ``<unix 秒>\\t<ID ダイジェスト>`` 形式。
+    メモリ上はダイジェスト → 記録時刻の dict で保持するため、
+    重複判定は履歴件数によらず O(1)。
+    """
+
+    def __init__(
+        self,
+        path: pathlib.Path = STATE_PATH,
+        retention_days: float = STATE_RETENTION_DAYS,
+        now: float | None = None,
+    ) -> None:
+        self.path = pathlib.Path(path)
+        self.now = time.time() if now is None else now
+        self.cutoff = self.now - retention_days * 86400
+        self._entries: dict[str, float] = {}
+        self._pending: list[tuple[str, float]] = []
+        self._stale_lines = 0
+        self._malformed_lines = 0
+        self._load()
+
+    @staticmethod
+    def _read(path: pathlib.Path):
+        """ファイルの (ダイジェスト, 記録時刻) を順に返す。
+
+        追記の中断などで壊れた行は警告して (None, 0.0) を返す (呼び出し側で読み飛ばす)。
+        """
+        if not path.exists():
+            return
+        with open(path, encoding="utf-8") as f:
+            for lineno, line in enumerate(f, 1):
+                ts_str, _, digest = line.rstrip("\n").partition("\t")
+                try:
+                    ts = float(ts_str)
+                except ValueError:
+                    ts = None
+                if ts is None or len(digest) != 16:
+                    logger.warning("処理済み ID ファイルの壊れた行を無視: %s:%d", path, lineno)
+                    yield None, 0.0
+                    continue
+                yield digest, ts
+
+    def _load(self) -> None:
+        for digest, ts in self._read(self.path):
+            if digest is None:
+                self._malformed_lines += 1
+                continue
+            if ts < self.cutoff or digest in self._entries:
+                self._stale_lines += 1
+                if ts >= self.cutoff:
+                    self._entries[digest] = max(ts, self._entries[digest])
+                continue
+            self._entries[digest] = ts
+
+    def include(self, path: pathlib.Path, persist: bool = False) -> int:
+        """別のファイルの ID を和集合として取り込む (記録時刻は元のまま)。
+
+        Args:
+            path: 取り込むファイル (同じ形式)
+            persist: True なら取り込んだ ID を次の flush で自分のファイルにも書く (シャードの統合用)。
+                False なら重複判定にのみ使う (シャードが共有の状態を読む場合)。
+
+        Returns:
+            新たに加わった ID の件数
+        """
+        added = 0
+        for digest, ts in self._read(path):
+            if digest is None or ts < self.cutoff or digest in self._entries:
+                continue
+            self._entries[digest] = ts
+            if persist:
+                self._pending.append((digest, ts))
+            added += 1
+        return added
+
+    def __contains__(self, item_id: str) -> bool:
+        return _hash_id(item_id) in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def add(self, item_id: str, ts: float | None = None) -> None:
+        """ID を処理済みとして記録する (flush までファイルには書かない)。"""
+        digest = _hash_id(item_id)
+        if digest in self._entries:
+            return
+        ts = self.now if ts is None else ts
+        self._entries[digest] = ts
+        self._pending.append((digest, ts))
+
+    def add_many(self, item_ids: list[str]) -> None:
+        for item_id in item_ids:
+            self.add(item_id)
+
+    def advance(self, now: float | None = None) -> int:
+        """基準時刻を進め、保持期間を過ぎた ID をメモリから破棄する (常駐プロセス用)。
+
+        Returns:
+            破棄した件数
+        """
+        retention = self.now - self.cutoff
+        self.now = time.time() if now is None else now
+        self.cutoff = self.now - retention
+        expired = [digest for digest, ts in self._entries.items() if ts < self.cutoff]
+        for digest in expired:
+            del self._entries[digest]
+        self._stale_lines += len(expired)
+        return len(expired)
+
+    def flush(self) -> None:
+        """未書き込みの ID を追記する。期限切れ行が多いか壊れた行があれば全体を書き直す。"""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        if self._malformed_lines or self._stale_lines > len(self._entries) * STATE_COMPACT_RATIO:
+            self._compact()
+            return
+        if not self._pending:
+            return
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.writelines(f"{int(ts)}\t{digest}\n" for digest, ts in self._pending)
+        self._pending.clear()
+
+    def _compact(self) -> None:
+        tmp_path = self.path.with_suffix(self.path.suffix + ".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.writelines(
+                f"{int(ts)}\t{digest}\n"
+                for digest, ts in sorted(self._entries.items(), key=lambda kv: kv[1])
+            )
+        tmp_path.replace(self.path)
+        logger.info("処理済み ID ファイルを圧縮: %d 行を破棄", self._stale_lines)
+        self._stale_lines = 0
+        self._malformed_lines = 0
+        self._pending.clear()
+
+
+def migrate_legacy_state(
+    store: ProcessedIdStore, legacy_path: pathlib.Path = LEGACY_STATE_PATH
+) -> int:
+    """旧形式の processed_ids.json (ID リスト) を store に取り込み、旧ファイルを削除する。
+
+    Returns:
+        取り込んだ ID の件数
+    """
+    if not legacy_path.exists():
+        return 0
+    with open(legacy_path, encoding="utf-8") as f:
+        legacy_ids = json.load(f)
+    store.add_many(legacy_ids)
+    store.flush()
+    legacy_path.unlink()
+    logger.info("旧形式の状態ファイルを移行: %d 件 (%s)", len(legacy_ids), legacy_path.name)
+    return len(legacy_ids)
+
+
+def load_processed_ids() -> ProcessedIdStore:
+    """処理済み ID ストアを読み込む。旧形式の JSON があれば一度だけ移行する。
+
+    分割実行では担当シャードのファイルに書き込み、共有のファイルは重複判定にのみ使う。
+    """
+    if _shard is not None:
+        store = ProcessedIdStore(shard_path(STATE_PATH))
+        store.include(STATE_PATH)
+        return store
+    store = ProcessedIdStore(STATE_PATH)
+    migrate_legacy_state(store, LEGACY_STATE_PATH)
+    return store
+
+
+def save_processed_ids(store: ProcessedIdStore, new_ids: list[str]) -> None:
+    """新たに処理した ID を記録してファイルに追記する。"""
+    store.add_many(new_ids)
+    store.flush()
 
 
-def is_duplicate(item_id: str, processed_ids: list[str]) -> bool:
+def is_duplicate(item_id: str, processed_ids: ProcessedIdStore) -> bool:
     """item_id が既に処理済みかどうかを返す。"""
     return item_id in processed_ids
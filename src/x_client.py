@@ -1,52 +1,126 @@
-"""X (Twitter) クライアント — 402/403 で絶対にクラッシュさせない。"""
+"""X (Twitter) クライアント — 投稿・画像アップロードと、失敗の分類 (再試行するか諦めるか)。"""
+
+from __future__ import annotations
 
 import os
+import pathlib
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import tweepy
+
+# プロセス内で使い回す Client / API (デーモンモードでは投稿のたびに作り直さない)
+_client: tweepy.Client | None = None
+_api: tweepy.API | None = None
 
-import tweepy
+# 失敗の分類
+RATE_LIMITED = "rate_limited"  # 429: リセット時刻まで投稿を止める
+TRANSIENT = "transient"        # 5xx・通信エラー: バックオフして再試行
+TERMINAL = "terminal"          # 402/403 などのその他 4xx: 再試行しても成功しない
 
-from src.utils import setup_logger
 
-logger = setup_logger(__name__)
+def _credentials() -> dict[str, str]:
+    return {
+        "consumer_key": os.environ.get("X_API_KEY", ""),
+        "consumer_secret": os.environ.get("X_API_SECRET", ""),
+        "access_token": os.environ.get("X_ACCESS_TOKEN", ""),
+        "access_token_secret": os.environ.get("X_ACCESS_TOKEN_SECRET", ""),
+    }
 
 
 def _create_client() -> tweepy.Client:
-    """環境変数から認証情報を取得して tweepy.Client を生成する。"""
-    return tweepy.Client(
-        consumer_key=os.environ.get("X_API_KEY", ""),
-        consumer_secret=os.environ.get("X_API_SECRET", ""),
-        access_token=os.environ.get("X_ACCESS_TOKEN", ""),
-        access_token_secret=os.environ.get("X_ACCESS_TOKEN_SECRET", ""),
+    """環境変数から認証情報を取得して tweepy.Client (v2) を生成する。
+
+    レート制限ヘッダーを読めるよう、応答は requests.Response のまま受け取る。
+    """
+    import requests
+    import tweepy
+
+    return tweepy.Client(**_credentials(), return_type=requests.Response)
+
+
+def _create_api() -> tweepy.API:
+    """画像アップロード用の tweepy.API (v1.1) を生成する。"""
+    import tweepy
+
+    credentials = _credentials()
+    auth = tweepy.OAuth1UserHandler(
+        credentials["consumer_key"],
+        credentials["consumer_secret"],
+        credentials["access_token"],
+        credentials["access_token_secret"],
     )
+    return tweepy.API(auth)
+
+
+def _get_client() -> tweepy.Client:
+    """共有の Client を返す。初回呼び出し時に生成する。"""
+    global _client
+    if _client is None:
+        _client = _create_client()
+    return _client
+
 
+def _get_api() -> tweepy.API:
+    """共有の API を返す。初回呼び出し時に生成する。"""
+    global _api
+    if _api is None:
+        _api = _create_api()
+    return _api
 
-def post_tweet(text: str) -> bool:
-    """ツイートを投稿する。失敗しても絶対にクラッシュさせない。
+
+def rate_limit_headers(headers) -> dict[str, float]:
+    """応答ヘッダーから x-rate-limit-remaining / x-rate-limit-reset (UNIX 秒) を取り出す。"""
+    limits: dict[str, float] = {}
+    if not headers:
+        return limits
+    for key, name in (("remaining", "x-rate-limit-remaining"), ("reset", "x-rate-limit-reset")):
+        value = headers.get(name)
+        if value is not None:
+            try:
+                limits[key] = float(value)
+            except ValueError:
+                pass
+    return limits
+
+
+def upload_media(path: str | pathlib.Path) -> str:
+    """画像をアップロードし、media_id を返す。"""
+    media = _get_api().media_upload(filename=str(path))
+    return media.media_id_string
+
+
+def create_post(text: str, media_ids: list[str] | None = None) -> tuple[str, dict[str, float]]:
+    """ツイートを投稿する。失敗時は tweepy / requests の例外をそのまま送出する。
 
     Returns:
-        True: 投稿成功
-        False: 投稿失敗 (エラーはログに記録済み)
+        (ツイート ID, レート制限ヘッダー)
     """
-    try:
-        client = _create_client()
-        response = client.create_tweet(text=text)
-        logger.info("X 投稿成功: id=%s", response.data["id"])
-        return True
-
-    except tweepy.Forbidden:
-        # 403 Forbidden — API 権限不足
-        logger.warning("X Posting Skipped (Cost/Permission): 403 Forbidden")
-        return False
-
-    except tweepy.errors.HTTPException as e:
-        # 402 Payment Required は tweepy に専用例外がないため status_code で判定
-        status = getattr(e.response, "status_code", None) if hasattr(e, "response") else None
-        if status == 402:
-            logger.warning("X Posting Skipped (Cost/Permission): 402 Payment Required")
-            return False
-        logger.warning("X Posting Skipped (HTTP %s): %s", status, e)
-        return False
-
-    except Exception as e:
-        # その他あらゆる例外もクラッシュさせない
-        logger.warning("X Posting Skipped (Unexpected): %s", e)
-        return False
+    response = _get_client().create_tweet(text=text, media_ids=media_ids or None)
+    if hasattr(response, "json"):
+        return response.json()["data"]["id"], rate_limit_headers(response.headers)
+    return response.data["id"], {}
+
+
+def classify_error(error: Exception) -> tuple[str, int | None, dict[str, float]]:
+    """投稿の失敗を分類する。
+
+    Returns:
+        (分類, HTTP ステータス (なければ None), レート制限ヘッダー)
+    """
+    import requests
+    import tweepy
+
+    if isinstance(error, tweepy.HTTPException):
+        status = getattr(error.response, "status_code", None)
+        limits = rate_limit_headers(getattr(error.response, "headers", None))
+        if isinstance(error, tweepy.TooManyRequests) or status == 429:
+            return RATE_LIMITED, status, limits
+        if isinstance(error, tweepy.TwitterServerError) or (status is not None and status >= 500):
+            return TRANSIENT, status, limits
+        # 402 Payment Required / 403 Forbidden (権限不足・重複投稿) を含むその他 4xx
+        return TERMINAL, status, limits
+    if isinstance(error, (tweepy.TweepyException, requests.RequestException, ConnectionError, TimeoutError)):
+        # 通信エラー等 (HTTP 応答なし)
+        return TRANSIENT, None, {}
+    return TERMINAL, None, {}
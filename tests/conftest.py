@@ -0,0 +1,20 @@
+"""テスト共通のフィクスチャ。状態ファイルの書き込み先を一時ディレクトリに差し替える。"""
+
+import pytest
+
+from src import news_fetcher, reddit_loader, utils
+
+
+@pytest.fixture
+def data_dir(tmp_path, monkeypatch):
+    """処理済み ID・RSS 検証子・Reddit カーソルを tmp_path 配下に置き、取得状態を空にする。"""
+    monkeypatch.setattr(utils, "STATE_PATH", tmp_path / "processed_ids.tsv")
+    monkeypatch.setattr(utils, "LEGACY_STATE_PATH", tmp_path / "processed_ids.json")
+    monkeypatch.setattr(news_fetcher, "FEED_CACHE_PATH", tmp_path / "feed_cache.json")
+    monkeypatch.setattr(reddit_loader, "REDDIT_CURSOR_PATH", tmp_path / "reddit_cursors.json")
+    monkeypatch.setattr(utils, "_shard", None)
+    news_fetcher._pending_validators.clear()
+    reddit_loader._pending_cursors.clear()
+    yield tmp_path
+    news_fetcher._pending_validators.clear()
+    reddit_loader._pending_cursors.clear()
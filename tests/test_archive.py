@@ -0,0 +1,73 @@
+import gzip
+import json
+
+from src.archive import SnapshotArchive
+
+DAY = 86400
+T0 = 1_790_000_000.0  # 2026-09-21 (UTC)
+
+
+def _news(item_id, ticker):
+    return {"id": item_id, "ticker": ticker, "title": f"title {item_id}"}
+
+
+def _post(item_id, tickers):
+    return {"id": item_id, "subreddit": "stocks", "tickers": tickers}
+
+
+def test_append_then_read_round_trips(tmp_path):
+    archive = SnapshotArchive(tmp_path)
+    news, reddit = [_news("n1", "NVDA"), _news("n2", "TSLA")], [_post("r1", ["NVDA"])]
+
+    entry = archive.append(news, reddit, fetched_at=T0)
+
+    assert entry["tickers"] == ["NVDA", "TSLA"]
+    assert (entry["news"], entry["reddit"]) == (2, 1)
+    assert archive.entries() == [entry]
+    assert archive.read(entry) == {"fetched_at": T0, "news": news, "reddit": reddit}
+
+
+def test_empty_run_is_not_archived(tmp_path):
+    archive = SnapshotArchive(tmp_path)
+
+    assert archive.append([], [], fetched_at=T0) is None
+    assert archive.entries() == []
+
+
+def test_segment_of_several_runs_is_plain_gzip(tmp_path):
+    archive = SnapshotArchive(tmp_path)
+    first = archive.append([_news("n1", "NVDA")], [], fetched_at=T0)
+    second = archive.append([], [_post("r1", [])], fetched_at=T0 + 60)
+
+    assert first["segment"] == second["segment"]
+    with gzip.open(tmp_path / first["segment"], "rt", encoding="utf-8") as f:
+        records = [json.loads(line) for line in f]
+    assert [record["item"]["id"] for record in records] == ["n1", "r1"]
+
+
+def test_entries_and_snapshots_filter_by_time_and_ticker(tmp_path):
+    archive = SnapshotArchive(tmp_path)
+    archive.append([_news("n0", "AAPL")], [], fetched_at=T0 - DAY)
+    archive.append(
+        [_news("n1", "NVDA"), _news("n2", "TSLA")], [_post("r1", ["NVDA"]), _post("r2", [])], fetched_at=T0
+    )
+    archive.append([_news("n3", "AAPL")], [], fetched_at=T0 + DAY)
+
+    assert [entry["fetched_at"] for entry in archive.entries(T0 - DAY, T0 + DAY)] == [T0 - DAY, T0]
+    assert [entry["fetched_at"] for entry in archive.entries(tickers={"AAPL"})] == [T0 - DAY, T0 + DAY]
+
+    (snapshot,) = archive.snapshots(T0, T0 + 1, tickers={"NVDA"})
+    assert [item["id"] for item in snapshot["news"]] == ["n1"]
+    assert [item["id"] for item in snapshot["reddit"]] == ["r1"]
+
+
+def test_absorb_copies_runs_once(tmp_path):
+    shared, shard = SnapshotArchive(tmp_path / "shared"), SnapshotArchive(tmp_path / "shard")
+    shared.append([_news("n0", "AAPL")], [], fetched_at=T0)
+    shard.append([_news("n1", "NVDA")], [], fetched_at=T0 + 60)
+
+    assert shared.absorb(shard.root) == 1
+    assert shared.absorb(shard.root) == 0
+
+    ids = [item["id"] for snapshot in shared.snapshots() for item in snapshot["news"]]
+    assert ids == ["n0", "n1"]
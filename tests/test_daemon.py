@@ -0,0 +1,66 @@
+import pytest
+
+from src import daemon
+from src.daemon import REDDIT_SOURCE, AdaptivePoller
+from src.near_dup import collapse_near_duplicates
+
+MARKET = 1_791_986_400.0  # 2026-10-14 (水) 10:00 ET
+EVENING = 1_792_015_200.0  # 2026-10-14 (水) 18:00 ET
+MONDAY_OPEN = 1_792_416_600.0  # 2026-10-19 (月) 9:30 ET
+
+
+def _poller():
+    return AdaptivePoller(["a", "b"], market_interval=300, off_hours_interval=1800, max_interval=2000, backoff=2)
+
+
+def test_market_hours():
+    assert daemon.is_market_hours(MARKET)
+    assert not daemon.is_market_hours(EVENING)
+    assert daemon.next_market_open(MONDAY_OPEN - 3 * 86400) == MONDAY_OPEN
+
+
+def test_backoff_grows_until_max_and_resets_on_change():
+    poller = _poller()
+    assert poller.due(MARKET) == ["a", "b"]
+
+    intervals = [poller.record("a", False, MARKET) for _ in range(4)]
+    assert intervals == [600, 1200, 2000, 2000]
+    assert poller.record("a", True, MARKET) == 300
+    assert poller.record("b", True, MARKET) == 300
+    assert poller.due(MARKET + 299) == []
+    assert poller.due(MARKET + 300) == ["a", "b"]
+
+
+def test_off_hours_interval_is_capped_at_market_open():
+    poller = _poller()
+
+    assert poller.record("a", True, EVENING) == 1800
+    assert poller.record("b", False, MONDAY_OPEN - 600) == 600
+
+
+@pytest.fixture
+def sources():
+    return {"https://feed/1": "news:NVDA,AMD", "https://feed/2": "news:TSLA,F"}
+
+
+def test_changed_sources_follow_feeds_including_unmatched_items(sources):
+    item = {"id": "1", "ticker": None, "title": "Markets wait for the Fed", "summary": "", "feed": "https://feed/2"}
+    news = collapse_near_duplicates([item])
+    ctx = {"select": {"news": news, "reddit": []}}
+
+    assert daemon._changed_sources(ctx, sources) == {"news:TSLA,F"}
+
+
+def test_changed_sources_include_every_feed_of_a_merged_story(sources):
+    title = "Chipmakers rally after strong earnings guidance"
+    news = collapse_near_duplicates(
+        [
+            {"id": "1", "ticker": "NVDA", "title": title, "summary": "", "feed": "https://feed/1"},
+            {"id": "2", "ticker": None, "title": title, "summary": "", "feed": "https://feed/2"},
+        ]
+    )
+    ctx = {"select": {"news": news, "reddit": [{"id": "r"}]}}
+
+    assert len(news) == 1
+    assert daemon._changed_sources(ctx, sources) == {"news:NVDA,AMD", "news:TSLA,F", REDDIT_SOURCE}
+    assert daemon._changed_sources({}, sources) == set()
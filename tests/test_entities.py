@@ -0,0 +1,65 @@
+import pytest
+
+from src.entities import EntityMatcher, tag_items
+
+UNIVERSE = {
+    "META": {"name": "Meta Platforms", "aliases": ["Meta", "Facebook"]},
+    "NVDA": {"name": "NVIDIA"},
+    "GM": {"name": "General Motors"},
+    "GE": {"name": "General Electric"},
+    "BAC": {"name": "Bank of America"},
+    "T": {"name": "AT&T"},
+    "F": {"name": "Ford Motor", "aliases": ["Ford"]},
+    "ON": {"name": "ON Semiconductor"},
+    "TSLA": {"name": "Tesla"},
+}
+
+
+@pytest.fixture(scope="module")
+def matcher():
+    return EntityMatcher(UNIVERSE)
+
+
+@pytest.mark.parametrize(
+    "text, expected",
+    [
+        ("Bank of America raises its dividend", {"BAC": 1}),
+        ("General Motors and General Electric both rose", {"GM": 1, "GE": 1}),
+        ("General strike ends", {}),
+        ("Bank of Japan holds rates", {}),
+        ("Meta Platforms and Meta are one mention each", {"META": 2}),
+        ("ON Semiconductor beats", {"ON": 1}),
+    ],
+)
+def test_multi_token_names_and_shared_prefixes(matcher, text, expected):
+    assert dict(matcher.mentions(text)) == expected
+
+
+@pytest.mark.parametrize(
+    "text, expected",
+    [
+        ("Meta. Then metadata, meta-analysis and Metaverse", {"META": 1}),
+        ("NVDA is up, but nvda in lower case is not a symbol", {"NVDA": 1}),
+        ("$nvda and nvidia and NVIDIA", {"NVDA": 3}),
+        ("TSLA's deliveries; Tesla's margins", {"TSLA": 2}),
+        ("AT&T and at&t", {"T": 2}),
+        ("it is on sale", {}),
+        ("F is ambiguous, but $F and Ford count", {"F": 2}),
+    ],
+)
+def test_case_and_punctuation_boundaries(matcher, text, expected):
+    assert dict(matcher.mentions(text)) == expected
+
+
+def test_mentions_keep_first_seen_order(matcher):
+    assert list(matcher.mentions("Tesla, then NVIDIA, then Tesla again")) == ["TSLA", "NVDA"]
+
+
+def test_tag_items_orders_tickers_by_mention_count(matcher):
+    items = [{"title": "$NVDA vs Tesla", "selftext": "NVIDIA NVIDIA, and Tesla"}, {"title": "", "selftext": ""}]
+
+    tag_items(items, matcher)
+
+    assert items[0]["mentions"] == {"NVDA": 3, "TSLA": 2}
+    assert items[0]["tickers"] == ["NVDA", "TSLA"]
+    assert items[1] == {"title": "", "selftext": "", "mentions": {}, "tickers": []}
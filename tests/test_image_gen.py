@@ -0,0 +1,80 @@
+import concurrent.futures
+import threading
+import time
+
+import pytest
+from PIL import Image
+
+from src import image_gen
+
+
+@pytest.fixture
+def fresh_pool(monkeypatch):
+    """テストごとに描画プールを作り直し、終了時に片付ける。"""
+    monkeypatch.setattr(image_gen, "_pool", None)
+    yield
+    if image_gen._pool is not None:
+        image_gen._pool.shutdown()
+
+
+def test_generate_cards_renders_batch_in_order(tmp_path, fresh_pool):
+    cards = [
+        ("NVDA", "BULLISH", "データセンター需要が好調", tmp_path / "nvda.png", "7D ↑5 ↓2 (+0.43)"),
+        ("TSLA", "BEARISH", "納車台数が予想を下回った", tmp_path / "tsla.png"),
+        ("AAPL", "BULLISH", "", str(tmp_path / "aapl.png")),
+    ]
+
+    paths = image_gen.generate_cards(cards, max_workers=2)
+
+    assert paths == [tmp_path / "nvda.png", tmp_path / "tsla.png", tmp_path / "aapl.png"]
+    for path in paths:
+        with Image.open(path) as img:
+            assert img.size == (image_gen.WIDTH, image_gen.HEIGHT)
+
+
+def test_failed_card_returns_none_without_failing_the_batch(tmp_path, fresh_pool):
+    blocker = tmp_path / "not-a-dir"
+    blocker.write_text("")
+
+    paths = image_gen.generate_cards(
+        [("NVDA", "BULLISH", "好調", tmp_path / "ok.png"), ("TSLA", "BEARISH", "不調", blocker / "ng.png")],
+        max_workers=2,
+    )
+
+    assert paths == [tmp_path / "ok.png", None]
+
+
+def test_concurrent_callers_share_one_pool(tmp_path, fresh_pool, monkeypatch):
+    created = []
+
+    class SlowPool(concurrent.futures.ThreadPoolExecutor):
+        def __init__(self, max_workers, mp_context=None):
+            created.append(self)
+            time.sleep(0.1)  # 生成中に他のスレッドが割り込めるようにする
+            super().__init__(max_workers=max_workers)
+
+    monkeypatch.setattr(image_gen.concurrent.futures, "ProcessPoolExecutor", SlowPool)
+    monkeypatch.setattr(image_gen, "_generate_card_safe", lambda card: card[3])
+
+    def call(i):
+        cards = [("A", "BULLISH", "", tmp_path / f"{i}a.png"), ("B", "BEARISH", "", tmp_path / f"{i}b.png")]
+        image_gen.generate_cards(cards, max_workers=2)
+
+    threads = [threading.Thread(target=call, args=(i,)) for i in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(created) == 1
+
+
+@pytest.mark.parametrize("trend", ["7D ↑5 ↓2 (+0.43)", ""])
+def test_long_reason_stays_clear_of_the_trend_line(trend):
+    reason = "データセンター向けの需要が想定を大きく上回り、通期の見通しも引き上げられた。" * 8
+
+    img = image_gen._render_card("NVDA", "BULLISH", reason, trend)
+
+    limit = image_gen.TREND_Y if trend else image_gen.HEIGHT
+    band = img.crop((0, limit - image_gen.REASON_BOTTOM_MARGIN, image_gen.WIDTH, limit))
+    assert band.getcolors() == [(band.width * band.height, image_gen.BULLISH_BG)]
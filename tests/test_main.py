@@ -0,0 +1,67 @@
+import json
+
+from src import main, news_fetcher, reddit_loader
+from src.utils import ProcessedIdStore
+
+
+def _news(item_id, tickers):
+    return {"id": item_id, "ids": [item_id], "tickers": tickers}
+
+
+def _post(item_id, subreddit, tickers):
+    return {"id": item_id, "subreddit": subreddit, "tickers": tickers}
+
+
+def _save_state_ctx(store, news, reddit, analyzed, failed):
+    return {
+        "load_state": store,
+        "select": {"news": news, "reddit": reddit},
+        "build_prompt": {ticker: "" for ticker in analyzed + failed},
+        "analyze": {ticker: {} for ticker in analyzed},
+    }
+
+
+def test_save_state_keeps_source_state_of_failed_tickers(data_dir, monkeypatch):
+    monkeypatch.setattr(news_fetcher, "FEED_BATCH_SIZE", 2)
+    failed_batch, done_batch = news_fetcher.feed_batches()[:2]
+    failed_url, done_url = news_fetcher.batch_url(failed_batch), news_fetcher.batch_url(done_batch)
+    news_fetcher._pending_validators.update({failed_url: {"etag": "a"}, done_url: {"etag": "b"}})
+    reddit_loader._pending_cursors.update(
+        {"stocks": {"fullname": "t3_s", "created_utc": 1.0}, "investing": {"fullname": "t3_i", "created_utc": 1.0}}
+    )
+    failed, done = failed_batch[0], done_batch[0]
+    store = ProcessedIdStore(data_dir / "processed_ids.tsv")
+    ctx = _save_state_ctx(
+        store,
+        news=[_news("n-failed", [failed]), _news("n-done", [done])],
+        reddit=[_post("r-failed", "stocks", [failed]), _post("r-done", "investing", [done])],
+        analyzed=[done],
+        failed=[failed],
+    )
+
+    main._stage_save_state(ctx)
+
+    feed_cache = json.loads((data_dir / "feed_cache.json").read_text())
+    cursors = json.loads((data_dir / "reddit_cursors.json").read_text())
+    assert set(feed_cache) == {done_url}
+    assert set(cursors) == {"investing"}
+    reloaded = ProcessedIdStore(data_dir / "processed_ids.tsv")
+    assert "n-done" in reloaded and "r-done" in reloaded
+    assert "n-failed" not in reloaded and "r-failed" not in reloaded
+
+
+def test_save_state_commits_everything_on_success(data_dir):
+    url = news_fetcher.batch_url(news_fetcher.feed_batches()[0])
+    news_fetcher._pending_validators[url] = {"etag": "a"}
+    reddit_loader._pending_cursors["stocks"] = {"fullname": "t3_s", "created_utc": 1.0}
+    ticker = news_fetcher.feed_batches()[0][0]
+    store = ProcessedIdStore(data_dir / "processed_ids.tsv")
+    ctx = _save_state_ctx(
+        store, news=[_news("n", [ticker])], reddit=[_post("r", "stocks", [ticker])], analyzed=[ticker], failed=[]
+    )
+
+    main._stage_save_state(ctx)
+
+    assert set(json.loads((data_dir / "feed_cache.json").read_text())) == {url}
+    assert set(json.loads((data_dir / "reddit_cursors.json").read_text())) == {"stocks"}
+    assert "n" in ProcessedIdStore(data_dir / "processed_ids.tsv")
@@ -0,0 +1,30 @@
+from src.near_dup import collapse_near_duplicates
+
+
+def _item(item_id, ticker, title, summary):
+    return {"id": item_id, "ticker": ticker, "title": title, "summary": summary}
+
+
+def test_same_title_from_two_feeds_is_merged():
+    title = "Nvidia beats earnings estimates on data center demand"
+    items = [
+        _item("a", "NVDA", title, "Quarterly revenue rose sharply."),
+        _item("b", "AMD", title, "Shares of chipmakers moved after the report."),
+    ]
+
+    merged = collapse_near_duplicates(items)
+
+    assert len(merged) == 1
+    assert merged[0]["tickers"] == ["NVDA", "AMD"]
+    assert merged[0]["ids"] == ["a", "b"]
+
+
+def test_empty_or_short_titles_are_not_merge_keys():
+    items = [
+        _item("a", "NVDA", "", "Nvidia unveils a new GPU architecture for training large models."),
+        _item("b", "TSLA", "", "Tesla recalls vehicles over a faulty seat belt warning chime."),
+        _item("c", "AAPL", "Stock update", "Apple opens its largest retail store in India."),
+        _item("d", "MSFT", "Stock update", "Microsoft signs a cloud deal with a European carrier."),
+    ]
+
+    assert [item["ids"] for item in collapse_near_duplicates(items)] == [["a"], ["b"], ["c"], ["d"]]
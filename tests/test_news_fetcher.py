@@ -0,0 +1,32 @@
+from src import news_fetcher
+
+
+def test_shard_batches_rotates_through_all_batches_regardless_of_run_hours():
+    batches = [(f"T{i:03d}",) for i in range(24)]
+    cache: dict[str, dict] = {}
+    seen = []
+    # 実行時刻ではなく保存された取得時刻で選ぶので、実行の間隔・時間帯によらず巡回する
+    for now in [14, 15, 21, 14 + 24, 15 + 24, 21 + 24]:
+        chosen = news_fetcher.shard_batches(batches, budget=4, cache=cache)
+        assert len(chosen) == 4
+        seen.extend(chosen)
+        for batch in chosen:
+            cache[news_fetcher.batch_url(batch)] = {"etag": "", "modified": "", "fetched_at": now * 3600.0}
+
+    assert sorted(seen) == batches
+
+
+def test_shard_batches_retries_batches_that_were_not_fetched():
+    batches = [(f"T{i:03d}",) for i in range(6)]
+    cache = {news_fetcher.batch_url(batch): {"fetched_at": 100.0} for batch in batches}
+    cache[news_fetcher.batch_url(batches[4])] = {"fetched_at": 10.0}
+
+    assert news_fetcher.shard_batches(batches, budget=2, cache=cache) == [batches[0], batches[4]]
+
+
+def test_unmatched_entry_is_not_attributed_to_every_ticker_in_the_batch():
+    entry = {"title": "Markets close higher as bond yields ease", "summary": "Stocks rallied broadly."}
+    matched = {"title": "Tesla deliveries beat expectations", "summary": ""}
+
+    assert news_fetcher._match_tickers(entry, ("NVDA", "TSLA", "AAPL")) == []
+    assert news_fetcher._match_tickers(matched, ("NVDA", "TSLA", "AAPL")) == ["TSLA"]
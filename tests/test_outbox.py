@@ -0,0 +1,146 @@
+import time
+
+import pytest
+import requests
+import tweepy
+
+from src import x_client
+from src.outbox import OUTBOX_MAX_ATTEMPTS, Outbox
+
+
+def _http_error(exc_type, status, headers=None):
+    response = requests.Response()
+    response.status_code = status
+    response.headers.update(headers or {})
+    response._content = b"{}"
+    return exc_type(response)
+
+
+@pytest.fixture
+def box(tmp_path):
+    return Outbox(tmp_path / "outbox.json", posts_per_hour=1e9, burst=1e9)
+
+
+@pytest.fixture
+def responses(monkeypatch):
+    """create_post の結果 (例外または (id, ヘッダー)) を順に返す。"""
+    queue: list = []
+    sent: list = []
+
+    def create_post(text, media_ids=None):
+        sent.append((text, media_ids))
+        result = queue.pop(0)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    monkeypatch.setattr(x_client, "create_post", create_post)
+    return queue, sent
+
+
+def test_success_removes_entry(box, responses):
+    queue, sent = responses
+    queue.append(("1", {}))
+    box.enqueue("投稿", ticker="NVDA")
+    box.enqueue("投稿", ticker="NVDA")  # 同じ本文は積まない
+
+    assert box.drain() == {"posted": 1, "retry": 0, "dropped": 0, "remaining": 0}
+    assert len(sent) == 1 and len(box) == 0
+
+
+def test_429_blocks_until_reset_and_keeps_entry(box, responses):
+    queue, sent = responses
+    reset = time.time() + 600
+    queue.append(_http_error(tweepy.TooManyRequests, 429, {"x-rate-limit-reset": str(int(reset))}))
+    box.enqueue("一件目", ticker="NVDA")
+    box.enqueue("二件目", ticker="TSLA")
+
+    assert box.drain() == {"posted": 0, "retry": 1, "dropped": 0, "remaining": 2}
+    assert box._load()["blocked_until"] == int(reset)
+    # 解除時刻までは送らない (attempts も増えない)
+    assert box.drain()["remaining"] == 2
+    assert len(sent) == 1
+    assert all(entry["attempts"] == 0 for entry in box._load()["queue"])
+
+
+def test_remaining_zero_header_on_success_blocks_next_sends(box, responses):
+    queue, sent = responses
+    queue.append(("1", {"remaining": 0.0, "reset": time.time() + 600}))
+    box.enqueue("一件目")
+    box.enqueue("二件目")
+
+    assert box.drain() == {"posted": 1, "retry": 0, "dropped": 0, "remaining": 1}
+    assert len(sent) == 1
+
+
+def test_5xx_backs_off_and_drops_after_max_attempts(box, responses):
+    queue, sent = responses
+    box.enqueue("投稿", ticker="NVDA")
+    queue.append(_http_error(tweepy.TwitterServerError, 503))
+
+    assert box.drain()["retry"] == 1
+    entry = box._load()["queue"][0]
+    assert entry["attempts"] == 1 and entry["next_attempt_at"] > time.time()
+    # バックオフ中は送らない
+    assert box.drain()["retry"] == 0 and len(sent) == 1
+
+    for attempt in range(2, OUTBOX_MAX_ATTEMPTS + 1):
+        state = box._load()
+        state["queue"][0]["next_attempt_at"] = 0.0
+        box._save(state)
+        queue.append(_http_error(tweepy.TwitterServerError, 503))
+        counts = box.drain()
+    assert counts == {"posted": 0, "retry": 0, "dropped": 1, "remaining": 0}
+    assert len(sent) == OUTBOX_MAX_ATTEMPTS
+
+
+@pytest.mark.parametrize("status", [402, 403])
+def test_cost_or_permission_errors_are_dropped_without_retry(box, responses, status):
+    queue, sent = responses
+    exc_type = tweepy.Forbidden if status == 403 else tweepy.HTTPException
+    queue.append(_http_error(exc_type, status))
+    queue.append(("2", {}))
+    box.enqueue("一件目")
+    box.enqueue("二件目")
+
+    assert box.drain() == {"posted": 1, "retry": 0, "dropped": 1, "remaining": 0}
+
+
+def test_media_is_uploaded_once_and_reused_on_retry(box, responses, monkeypatch, tmp_path):
+    queue, sent = responses
+    uploads = []
+    monkeypatch.setattr(x_client, "upload_media", lambda path: uploads.append(path) or "m1")
+    image = tmp_path / "card.png"
+    image.write_bytes(b"png")
+    box.enqueue("投稿", media_path=image)
+    queue.append(requests.ConnectionError("切断"))
+    box.drain()
+    state = box._load()
+    state["queue"][0]["next_attempt_at"] = 0.0
+    box._save(state)
+    queue.append(("1", {}))
+
+    assert box.drain()["posted"] == 1
+    assert len(uploads) == 1
+    assert sent[-1] == ("投稿", ["m1"])
+
+
+def test_send_window_past_deadline_carries_over(tmp_path, responses):
+    queue, sent = responses
+    box = Outbox(tmp_path / "outbox.json", posts_per_hour=1, burst=1)
+    queue.append(("1", {}))
+    box.enqueue("一件目")
+    box.enqueue("二件目")
+
+    counts = box.drain(deadline=time.monotonic() + 1.0)
+
+    assert counts == {"posted": 1, "retry": 0, "dropped": 0, "remaining": 1}
+
+
+def test_absorb_does_not_duplicate_entries(box, tmp_path):
+    other = Outbox(tmp_path / "shard" / "outbox.json")
+    other.enqueue("シャードの投稿")
+    box.enqueue("シャードの投稿")
+
+    assert box.absorb(other.path) == 0
+    assert len(box) == 1
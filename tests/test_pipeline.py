@@ -0,0 +1,135 @@
+import subprocess
+import sys
+import textwrap
+import time
+
+import pytest
+
+from src.metrics import RunMetrics
+from src.pipeline import Pipeline, Stage, StopPipeline
+
+
+def test_timed_out_stage_does_not_delay_process_exit():
+    script = textwrap.dedent(
+        """
+        import time
+        from src.metrics import RunMetrics
+        from src.pipeline import Pipeline, Stage
+
+        pipeline = Pipeline([Stage("slow", lambda ctx: time.sleep(30), timeout=0.2, fallback=lambda ctx: None)])
+        print(pipeline.run({}, RunMetrics()))
+        """
+    )
+    start = time.monotonic()
+    result = subprocess.run([sys.executable, "-c", script], capture_output=True, text=True, timeout=20)
+
+    assert result.stdout.strip() == "completed"
+    assert time.monotonic() - start < 10
+
+
+def test_stop_is_recorded_as_stopped_not_error():
+    def stop(ctx):
+        raise StopPipeline("処理対象なし")
+
+    metrics = RunMetrics()
+    status = Pipeline([Stage("select", stop)]).run({}, metrics)
+
+    assert status == "stopped"
+    assert metrics.stages["select"]["status"] == "stopped"
+
+
+def _fail(ctx):
+    raise RuntimeError("失敗")
+
+
+def test_stages_run_after_their_deps_and_results_are_shared():
+    order = []
+
+    def stage(name, value):
+        def fn(ctx):
+            order.append(name)
+            return value(ctx)
+
+        return fn
+
+    ctx: dict = {}
+    status = Pipeline(
+        [
+            Stage("c", stage("c", lambda ctx: ctx["a"] + ctx["b"]), deps=("a", "b")),
+            Stage("a", stage("a", lambda ctx: 1)),
+            Stage("b", stage("b", lambda ctx: 2), deps=("a",)),
+        ]
+    ).run(ctx, RunMetrics())
+
+    assert status == "completed"
+    assert order == ["a", "b", "c"]
+    assert ctx["c"] == 3
+
+
+def test_failed_stage_with_fallback_continues_with_fallback_result():
+    ctx: dict = {}
+    metrics = RunMetrics()
+    status = Pipeline(
+        [
+            Stage("fetch", _fail, fallback=lambda ctx: []),
+            Stage("use", lambda ctx: len(ctx["fetch"]), deps=("fetch",)),
+        ]
+    ).run(ctx, metrics)
+
+    assert status == "completed"
+    assert ctx == {"fetch": [], "use": 0}
+    assert metrics.stages["fetch"]["status"] == "error"
+
+
+def test_failed_stage_without_fallback_aborts_and_skips_dependents():
+    ran = []
+    ctx: dict = {}
+    status = Pipeline(
+        [
+            Stage("analyze", _fail),
+            Stage("report", lambda ctx: ran.append("report"), deps=("analyze",)),
+        ]
+    ).run(ctx, RunMetrics())
+
+    assert status == "aborted"
+    assert ran == [] and "report" not in ctx
+
+
+def test_stop_skips_dependents_but_lets_running_stages_finish():
+    def stop(ctx):
+        raise StopPipeline("処理対象なし")
+
+    def slow(ctx):
+        time.sleep(0.2)
+        return "done"
+
+    ctx: dict = {}
+    status = Pipeline(
+        [
+            Stage("select", stop),
+            Stage("slow", slow),
+            Stage("after", lambda ctx: "ran", deps=("select",)),
+        ]
+    ).run(ctx, RunMetrics())
+
+    assert status == "stopped"
+    assert ctx == {"slow": "done"}
+
+
+def test_timeout_uses_fallback_and_run_deadline_caps_stage_timeout():
+    metrics = RunMetrics()
+    ctx: dict = {}
+    start = time.monotonic()
+    status = Pipeline(
+        [Stage("slow", lambda ctx: time.sleep(5), timeout=60, fallback=lambda ctx: "fallback")]
+    ).run(ctx, metrics, deadline=time.monotonic() + 0.2)
+
+    assert status == "completed"
+    assert ctx["slow"] == "fallback"
+    assert metrics.counters["timeouts.slow"] == 1
+    assert time.monotonic() - start < 2
+
+
+def test_unknown_dependency_is_rejected():
+    with pytest.raises(ValueError):
+        Pipeline([Stage("a", lambda ctx: None, deps=("missing",))])
@@ -0,0 +1,85 @@
+import time
+
+import pytest
+
+from src import resilience
+from src.rate_limit import RateLimiter, TokenBucket
+from src.resilience import DeadlineExceeded, resilient
+
+
+def test_acquire_raises_instead_of_waiting_past_deadline():
+    bucket = TokenBucket(rate=1 / 60, capacity=1)
+    assert bucket.acquire() == 0.0
+
+    start = time.monotonic()
+    with pytest.raises(DeadlineExceeded):
+        bucket.acquire(deadline=time.monotonic() + 1.0)
+    assert time.monotonic() - start < 0.5
+
+
+def test_acquire_waits_when_the_deadline_allows_it():
+    bucket = TokenBucket(rate=20, capacity=1)
+    bucket.acquire()
+
+    waited = bucket.acquire(deadline=time.monotonic() + 5.0)
+
+    assert 0 < waited < 1.0
+
+
+def test_quota_wait_past_run_deadline_is_not_a_host_failure():
+    limiter = RateLimiter(rpm=1, tpm=1e6)
+    limiter.acquire(1)
+    calls = []
+
+    @resilient("test_quota", attempts=3, min_wait=0, max_wait=0)
+    def generate():
+        limiter.acquire(1, deadline=resilience.deadline())
+        calls.append(1)
+
+    resilience.begin_run(budget=2.0)
+    with pytest.raises(DeadlineExceeded):
+        generate()
+
+    # 接続先には呼び出しが届いていないので、呼び出し・失敗としては数えない
+    assert calls == []
+    assert "test_quota" not in resilience.summary()
+    assert resilience.breaker("test_quota").state == "closed"
+
+
+def _open_breaker(host):
+    host_breaker = resilience.breaker(host)
+    for _ in range(host_breaker.failures):
+        host_breaker.record_failure()
+    host_breaker._opened_at -= host_breaker.cooldown
+    assert host_breaker.state == "half_open"
+    return host_breaker
+
+
+def test_half_open_probe_ending_in_ignored_error_closes_breaker():
+    host_breaker = _open_breaker("test_probe_ignore")
+
+    @resilient("test_probe_ignore", attempts=1, ignore=(ValueError,))
+    def generate():
+        raise ValueError("JSON の検証エラー")
+
+    resilience.begin_run()
+    with pytest.raises(ValueError):
+        generate()
+
+    assert host_breaker.state == "closed"
+    host_breaker.before_call()
+
+
+def test_half_open_probe_ending_in_deadline_allows_next_probe():
+    host_breaker = _open_breaker("test_probe_deadline")
+
+    @resilient("test_probe_deadline", attempts=1)
+    def generate():
+        raise DeadlineExceeded("クォータ待ちで期限切れ")
+
+    resilience.begin_run()
+    with pytest.raises(DeadlineExceeded):
+        generate()
+
+    assert host_breaker.state == "half_open"
+    host_breaker.before_call()
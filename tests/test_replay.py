@@ -0,0 +1,73 @@
+import json
+
+import pytest
+
+from src import image_gen, main, replay
+from src.archive import SnapshotArchive
+
+T0 = 1_790_000_000.0  # 2026-09-21 (UTC)
+
+
+def _news(item_id, ticker, title):
+    return {"id": item_id, "ticker": ticker, "title": title, "summary": "", "published": T0 - 600}
+
+
+@pytest.fixture
+def archive(tmp_path):
+    """2 回分の実行を記録したアーカイブ (2 回目には 1 回目と同じ記事を含む)。"""
+    archive = SnapshotArchive(tmp_path / "archive")
+    archive.append([_news("n1", "NVDA", "Nvidia shares surge after record quarter")], [], fetched_at=T0)
+    archive.append(
+        [
+            _news("n1", "NVDA", "Nvidia shares surge after record quarter"),
+            _news("n2", "TSLA", "Tesla stock plunges on weak deliveries"),
+        ],
+        [{"id": "r1", "title": "lunch thread", "selftext": "", "subreddit": "stocks", "score": 1}],
+        fetched_at=T0 + 3600,
+    )
+    return archive
+
+
+@pytest.fixture
+def analyzed(monkeypatch):
+    """Gemini の代わりに入力を記録し、固定の分析結果を返す。"""
+    inputs = []
+
+    def analyze_many(batch):
+        inputs.append(batch)
+        return {
+            key: {"sentiment": "BULLISH", "reason": f"{key} の理由", "post_text": f"${key} の投稿"} for key in batch
+        }
+
+    monkeypatch.setattr(replay, "analyze_many", analyze_many)
+    monkeypatch.setattr(main, "ANALYSIS_MODE", "per_ticker")
+    monkeypatch.setattr(image_gen, "_pool", None)
+    yield inputs
+    if image_gen._pool is not None:
+        image_gen._pool.shutdown()
+
+
+def test_replay_writes_reports_in_fetch_order_without_duplicates(tmp_path, archive, analyzed):
+    output_dir = tmp_path / "replay"
+
+    totals = replay.replay(T0, T0 + 86400, output_dir=output_dir, archive=archive, max_workers=2)
+
+    assert totals == {"snapshots": 2, "news": 2, "reddit": 1, "analyses": 2}
+    assert [sorted(batch) for batch in analyzed] in ([["NVDA"], ["TSLA"]], [["TSLA"], ["NVDA"]])
+    lines = (output_dir / "2026-09-21.jsonl").read_text(encoding="utf-8").splitlines()
+    records = [json.loads(line) for line in lines]
+    assert [record["ticker"] for record in records] == ["NVDA", "TSLA"]
+    assert sorted(p.name for p in output_dir.glob("*.png")) == [
+        "2026-09-21_141320_NVDA.png",
+        "2026-09-21_151320_TSLA.png",
+    ]
+    assert not (output_dir / ".replay_ids.tsv").exists()
+
+
+def test_replay_filters_by_ticker_and_period(tmp_path, archive, analyzed):
+    output_dir = tmp_path / "replay"
+
+    totals = replay.replay(T0 + 1, T0 + 86400, tickers={"TSLA"}, output_dir=output_dir, archive=archive)
+
+    assert totals["snapshots"] == 1 and totals["news"] == 1
+    assert [list(batch) for batch in analyzed] == [["TSLA"]]
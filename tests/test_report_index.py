@@ -0,0 +1,73 @@
+import json
+
+from src import report_index
+
+
+def _entry(date_str, ticker, sentiment="BULLISH", reason="理由", post_text="投稿"):
+    return {
+        "date": date_str,
+        "ticker": ticker,
+        "sentiment": sentiment,
+        "post_text": post_text,
+        "reason": reason,
+        "trend": "",
+        "ts": 0,
+    }
+
+
+def _append(reports_dir, *entries):
+    for entry in entries:
+        with open(reports_dir / f"{entry['date']}.jsonl", "a", encoding="utf-8") as f:
+            f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+
+
+def _table_rows(page: str, header: str) -> list[str]:
+    lines = page.splitlines()
+    start = lines.index(header) + 2
+    rows = []
+    for line in lines[start:]:
+        if not line.startswith("|"):
+            break
+        rows.append(line)
+    return rows
+
+
+def test_reason_with_pipe_and_newline_stays_in_one_cell(tmp_path):
+    _append(tmp_path, _entry("2026-10-01", "NVDA", reason="需給 | 決算\n次の行"))
+
+    report_index.build(tmp_path)
+
+    page = (tmp_path / "index" / "index.md").read_text(encoding="utf-8")
+    rows = _table_rows(page, "| Ticker | Date | Sentiment | Reason |")
+    assert len(rows) == 1
+    assert rows[0].replace("\\|", "").count("|") == 5
+    assert "需給 \\| 決算 次の行" in rows[0]
+
+
+def test_build_rewrites_only_pages_touched_by_new_entries(tmp_path):
+    _append(tmp_path, _entry("2026-10-01", "NVDA"), _entry("2026-09-01", "TSLA", "BEARISH"))
+    first = report_index.build(tmp_path)
+    assert len(first) == 2 + 2 + 2 + 1
+
+    assert report_index.build(tmp_path) == []
+
+    _append(tmp_path, _entry("2026-10-02", "NVDA", "BEARISH"))
+    written = {p.relative_to(tmp_path / "index").as_posix() for p in report_index.build(tmp_path)}
+    assert written == {"tickers/NVDA.md", "weekly/2026-W40.md", "monthly/2026-10.md", "index.md"}
+    assert "1 calls" in (tmp_path / "index" / "tickers" / "TSLA.md").read_text(encoding="utf-8")
+    assert "2 calls" in (tmp_path / "index" / "tickers" / "NVDA.md").read_text(encoding="utf-8")
+
+
+def test_partial_line_is_read_once_complete_and_shrunk_file_triggers_rebuild(tmp_path):
+    path = tmp_path / "2026-10-01.jsonl"
+    line = json.dumps(_entry("2026-10-01", "NVDA"), ensure_ascii=False)
+    path.write_text(line, encoding="utf-8")
+    assert report_index.build(tmp_path) == []
+
+    path.write_text(line + "\n", encoding="utf-8")
+    assert report_index.build(tmp_path)
+
+    path.write_text("", encoding="utf-8")
+    report_index.build(tmp_path)
+    manifest = json.loads((tmp_path / "index" / "manifest.json").read_text(encoding="utf-8"))
+    assert manifest["tickers"] == {}
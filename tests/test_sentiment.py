@@ -0,0 +1,71 @@
+import pytest
+
+from src import sentiment
+from src.sentiment import score_items, triage
+
+NOW = 1_800_000_000.0
+
+
+def _news(title, tickers, hours_ago=None):
+    item = {"id": title, "title": title, "summary": "", "tickers": tickers}
+    if hours_ago is not None:
+        item["published"] = NOW - hours_ago * 3600
+    return item
+
+
+def test_score_items_applies_lexicon_and_negation():
+    values, weights = score_items(
+        [_news("Apple beats estimates", ["AAPL"]), _news("Apple does not beat", ["AAPL"]), _news("Apple event", [])],
+        now=NOW,
+    )
+
+    assert values[0] > 0 > values[1]
+    assert values[2] == 0 and weights[2] == 0
+
+
+@pytest.mark.parametrize("hours_ago", [None, 0, 12])
+def test_single_decisive_headline_reaches_gemini(hours_ago):
+    result = triage([_news("Nvidia shares surge after record quarter", ["NVDA"], hours_ago)], [], now=NOW)
+
+    assert result["active"] == ["NVDA"]
+    assert result["tickers"]["NVDA"]["sentiment"] == "BULLISH"
+    assert result["tickers"]["NVDA"]["items"] == 1
+
+
+def test_more_agreeing_items_score_higher_than_one():
+    one = triage([_news("Tesla stock plunges", ["TSLA"], 1)], [], now=NOW)
+    three = triage([_news(f"Tesla stock plunges {i}", ["TSLA"], 1) for i in range(3)], [], now=NOW)
+
+    assert three["tickers"]["TSLA"]["score"] < one["tickers"]["TSLA"]["score"] < 0
+
+
+def test_mixed_items_for_one_ticker_cancel_out():
+    result = triage(
+        [_news("Apple beats estimates", ["AAPL"], 1), _news("Apple misses on sales", ["AAPL"], 1)], [], now=NOW
+    )
+
+    assert abs(result["tickers"]["AAPL"]["score"]) < sentiment.DISAGREEMENT_MARGIN
+    assert result["active"] == []
+
+
+def test_disagreement_across_tickers_lowers_the_cutoff(monkeypatch):
+    monkeypatch.setattr(sentiment, "SENTIMENT_THRESHOLD", 0.9)
+    monkeypatch.setattr(sentiment, "DISAGREEMENT_MARGIN", 0.3)
+
+    result = triage([_news("AMD surges", ["AMD"], 1), _news("Intel plunges", ["INTC"], 1)], [], now=NOW)
+
+    assert sorted(result["active"]) == ["AMD", "INTC"]
+
+
+def test_items_without_signal_are_dropped_and_ranked_by_strength():
+    reddit = [
+        {"id": "r1", "title": "INTC is weak", "selftext": "", "subreddit": "stocks", "score": 10, "tickers": ["INTC"]},
+        {"id": "r2", "title": "lunch thread", "selftext": "", "subreddit": "stocks", "score": 999, "tickers": []},
+    ]
+    news = [_news("AMD surges", ["AMD"], 1), _news("Market opens", ["AMD"], 1)]
+
+    result = triage(news, reddit, now=NOW)
+
+    assert [item["id"] for item in result["news"]] == ["AMD surges"]
+    assert [item["id"] for item in result["reddit"]] == ["r1"]
+    assert news[1]["sentiment_score"] == 0
@@ -0,0 +1,218 @@
+import pathlib
+import shutil
+
+import pytest
+
+from src import llm_engine, main, news_fetcher, reddit_loader, sharding, utils, x_client
+from src.archive import SnapshotArchive
+from src.outbox import Outbox
+from src.timeseries import TimeSeriesStore
+from src.utils import ProcessedIdStore, load_json_state, save_json_state, shard_dir, shard_path
+
+COUNT = 2
+DATE = "2026-10-01"
+
+
+class _Crash(Exception):
+    pass
+
+
+def _report(reports_dir, ticker, text):
+    analysis = {"sentiment": "BULLISH", "post_text": text, "reason": "理由"}
+    main._append_report(DATE, ticker, analysis, pathlib.Path("N/A"), reports_dir=reports_dir)
+
+
+def _write_outputs(root: pathlib.Path) -> None:
+    """共有の状態と、シャード 0〜COUNT-1 の出力を root 配下に作る。"""
+    data, reports = root / "data", root / "reports"
+    store = ProcessedIdStore(data / "processed_ids.tsv")
+    store.add_many(["base-1", "shared"])
+    store.flush()
+    TimeSeriesStore(data / "timeseries").append("SHARED", "BULLISH", ts=1000.0)
+    SnapshotArchive(data / "archive").append([{"id": "n-base", "ticker": "SHARED"}], [], fetched_at=1000.0)
+    _report(reports, "SHARED", "共有の投稿")
+
+    for index in range(COUNT):
+        shard = (index, COUNT)
+        store = ProcessedIdStore(shard_path(data / "processed_ids.tsv", shard))
+        store.add_many([f"id-{index}-{i}" for i in range(3)] + ["shared"])
+        store.flush()
+        save_json_state(shard_path(data / "feed_cache.json", shard), {f"url-{index}": {"etag": str(index)}})
+        save_json_state(
+            shard_path(data / "reddit_cursors.json", shard), {f"sub-{index}": {"fullname": "t3", "created_utc": 1.0}}
+        )
+        Outbox(shard_path(data / "outbox.json", shard)).enqueue(f"投稿 {index}", ticker=f"T{index}")
+        timeseries = TimeSeriesStore(shard_path(data / "timeseries", shard))
+        timeseries.append(f"T{index}", "BULLISH", ts=2000.0 + index)
+        # 共有の末尾より古いレコード (書き直しになる経路)
+        timeseries.append("SHARED", "BEARISH", ts=500.0 + index)
+        SnapshotArchive(shard_path(data / "archive", shard)).append(
+            [{"id": f"n-{index}", "ticker": f"T{index}"}], [], fetched_at=2000.0 + index
+        )
+        _report(shard_dir(reports, shard), f"T{index}", f"投稿 {index}")
+
+
+def _merge(root: pathlib.Path, monkeypatch) -> dict[str, int]:
+    data = root / "data"
+    monkeypatch.setattr(utils, "STATE_PATH", data / "processed_ids.tsv")
+    monkeypatch.setattr(news_fetcher, "FEED_CACHE_PATH", data / "feed_cache.json")
+    monkeypatch.setattr(reddit_loader, "REDDIT_CURSOR_PATH", data / "reddit_cursors.json")
+    return sharding.merge_shards(
+        COUNT,
+        root / "reports",
+        Outbox(data / "outbox.json"),
+        TimeSeriesStore(data / "timeseries"),
+        SnapshotArchive(data / "archive"),
+    )
+
+
+def _state(root: pathlib.Path) -> dict:
+    data = root / "data"
+    return {
+        "ids": sorted(ProcessedIdStore(data / "processed_ids.tsv")._entries),
+        "feed_cache": load_json_state(data / "feed_cache.json", {}),
+        "cursors": load_json_state(data / "reddit_cursors.json", {}),
+        "outbox": sorted(entry["text"] for entry in Outbox(data / "outbox.json")._load()["queue"]),
+        "timeseries": {p.name: p.read_bytes() for p in sorted((data / "timeseries").glob("*.bin"))},
+        "archive": [(e["fetched_at"], e["news"]) for e in SnapshotArchive(data / "archive").entries()],
+        "reports": {p.name: p.read_bytes() for p in sorted((root / "reports").iterdir()) if p.is_file()},
+        "shard_dirs": sorted(str(p.relative_to(root)) for p in root.rglob("shards")),
+    }
+
+
+def _crash_on_call(monkeypatch, n: int | None) -> dict:
+    """n 回目のファイル削除 (断片の取り込み直後) で落ちるようにする。n が None なら数えるだけ。"""
+    calls = {"n": 0}
+    unlink, rmtree = pathlib.Path.unlink, shutil.rmtree
+
+    def tick():
+        calls["n"] += 1
+        if calls["n"] == n:
+            raise _Crash
+
+    def crashing_unlink(self, *args, **kwargs):
+        tick()
+        return unlink(self, *args, **kwargs)
+
+    def crashing_rmtree(*args, **kwargs):
+        tick()
+        return rmtree(*args, **kwargs)
+
+    monkeypatch.setattr(pathlib.Path, "unlink", crashing_unlink)
+    monkeypatch.setattr(sharding.shutil, "rmtree", crashing_rmtree)
+    return calls
+
+
+@pytest.fixture
+def template(tmp_path):
+    root = tmp_path / "template"
+    _write_outputs(root)
+    return root
+
+
+def test_merge_unions_shard_state(template, tmp_path, monkeypatch):
+    root = tmp_path / "clean"
+    shutil.copytree(template, root)
+
+    totals = _merge(root, monkeypatch)
+    state = _state(root)
+
+    assert totals["shards"] == COUNT
+    assert totals["ids"] == 2 * 3
+    assert len(state["ids"]) == 2 + 2 * 3
+    assert set(state["feed_cache"]) == {"url-0", "url-1"}
+    assert set(state["cursors"]) == {"sub-0", "sub-1"}
+    assert state["outbox"] == ["投稿 0", "投稿 1"]
+    assert [ts for ts, _ in state["archive"]] == [1000.0, 2000.0, 2001.0]
+    report = state["reports"][f"{DATE}.md"].decode("utf-8")
+    assert report.count("# Daily US Stock Report") == 1
+    assert report.index("共有の投稿") < report.index("投稿 0") < report.index("投稿 1")
+    assert state["reports"][f"{DATE}.jsonl"].count(b"\n") == 3
+    assert state["shard_dirs"] == []
+
+
+def test_merge_again_after_success_changes_nothing(template, tmp_path, monkeypatch):
+    root = tmp_path / "twice"
+    shutil.copytree(template, root)
+    _merge(root, monkeypatch)
+    merged = _state(root)
+
+    totals = _merge(root, monkeypatch)
+
+    assert totals["shards"] == 0
+    assert _state(root) == merged
+
+
+def test_merge_rerun_after_crash_matches_clean_merge(template, tmp_path, monkeypatch):
+    clean = tmp_path / "clean"
+    shutil.copytree(template, clean)
+    with monkeypatch.context() as m:
+        calls = _crash_on_call(m, None)
+        _merge(clean, m)
+    expected = _state(clean)
+    assert calls["n"] > 0
+
+    for n in range(1, calls["n"] + 1):
+        root = tmp_path / f"crash-{n}"
+        shutil.copytree(template, root)
+        with monkeypatch.context() as m:
+            _crash_on_call(m, n)
+            with pytest.raises(_Crash):
+                _merge(root, m)
+        with monkeypatch.context() as m:
+            _merge(root, m)
+        assert _state(root) == expected, f"{n} 回目の削除の直前で落ちた場合"
+
+
+def test_merged_posts_upload_the_moved_card(tmp_path, monkeypatch):
+    root = tmp_path / "media"
+    data, reports = root / "data", root / "reports"
+    shard = (0, COUNT)
+    card = shard_dir(reports, shard) / f"{DATE}_T0.png"
+    card.parent.mkdir(parents=True)
+    card.write_bytes(b"png")
+    Outbox(shard_path(data / "outbox.json", shard)).enqueue("投稿 0", ticker="T0", media_path=card)
+
+    _merge(root, monkeypatch)
+
+    uploaded, sent = [], []
+    monkeypatch.setattr(x_client, "upload_media", lambda path: uploaded.append(path) or "m-1")
+    monkeypatch.setattr(x_client, "create_post", lambda text, media_ids=None: sent.append(media_ids) or ("1", {}))
+    box = Outbox(data / "outbox.json", posts_per_hour=1e9, burst=1e9)
+    assert box.drain()["posted"] == 1
+
+    assert uploaded == [str(reports / card.name)]
+    assert (reports / card.name).read_bytes() == b"png"
+    assert sent == [["m-1"]]
+
+
+def test_shards_rendering_the_same_ticker_keep_separate_cards(tmp_path, monkeypatch):
+    root = tmp_path / "blended"
+    data, reports = root / "data", root / "reports"
+    for index in range(COUNT):
+        shard = (index, COUNT)
+        monkeypatch.setattr(utils, "_shard", shard)
+        monkeypatch.setattr(main, "REPORTS_DIR", shard_dir(reports, shard))
+        card = main._card_path(DATE, "MKT")
+        card.parent.mkdir(parents=True, exist_ok=True)
+        card.write_bytes(f"card {index}".encode())
+        Outbox(shard_path(data / "outbox.json", shard)).enqueue(f"投稿 {index}", ticker="MKT", media_path=card)
+    monkeypatch.setattr(utils, "_shard", None)
+
+    _merge(root, monkeypatch)
+
+    media = [pathlib.Path(entry["media_path"]) for entry in Outbox(data / "outbox.json")._load()["queue"]]
+    assert len(set(media)) == COUNT
+    assert sorted(path.read_bytes() for path in media) == [b"card 0", b"card 1"]
+
+
+def test_configure_shard_splits_gemini_quota(monkeypatch):
+    for name in ("REPORTS_DIR", "outbox", "snapshot_archive", "timeseries_store"):
+        monkeypatch.setattr(main, name, getattr(main, name))
+    monkeypatch.setattr(llm_engine, "rate_limiter", llm_engine.rate_limiter)
+    monkeypatch.setattr(utils, "_shard", None)
+
+    main.configure_shard(1, 3)
+
+    assert llm_engine.rate_limiter.requests.rate * 60 == pytest.approx(llm_engine.GEMINI_RPM / 3)
+    assert llm_engine.rate_limiter.tokens.capacity == pytest.approx(llm_engine.GEMINI_TPM / 3)
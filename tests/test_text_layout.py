@@ -0,0 +1,52 @@
+import pytest
+
+from src.text_layout import ELLIPSIS, get_metrics, wrap_text
+
+WIDTH = 400
+
+
+@pytest.fixture(scope="module")
+def metrics():
+    return get_metrics(32, body=True)
+
+
+def test_lines_fit_width_and_keep_all_text(metrics):
+    text = "Nvidia reported record data center revenue, and guidance beat estimates by a wide margin."
+
+    lines = wrap_text(text, metrics, WIDTH)
+
+    assert len(lines) > 1
+    assert all(metrics.width(line) <= WIDTH for line in lines)
+    assert " ".join(lines) == text
+
+
+def test_words_are_not_split_and_punctuation_does_not_start_a_line(metrics):
+    text = "データセンター向けの需要が、想定を大きく上回った。" * 3 + " extraordinarily"
+
+    lines = wrap_text(text, metrics, WIDTH)
+
+    assert all(line[0] not in "、。" for line in lines)
+    assert lines[-1].endswith("extraordinarily")
+
+
+def test_overlong_unit_is_split_by_character(metrics):
+    url = "https://example.com/" + "a" * 80
+
+    lines = wrap_text(url, metrics, WIDTH)
+
+    assert "".join(lines) == url
+    assert all(metrics.width(line) <= WIDTH for line in lines)
+
+
+def test_max_lines_truncates_with_ellipsis_within_width(metrics):
+    text = "決算は市場予想を上回り、株価は時間外取引で大きく上昇した。" * 10
+
+    full = wrap_text(text, metrics, WIDTH)
+    lines = wrap_text(text, metrics, WIDTH, max_lines=3)
+
+    assert len(full) > 3
+    assert lines[:2] == full[:2]
+    assert len(lines) == 3 and lines[-1].endswith(ELLIPSIS)
+    assert metrics.width(lines[-1]) <= WIDTH
+    assert wrap_text("短い", metrics, WIDTH, max_lines=3) == ["短い"]
+    assert wrap_text(text, metrics, WIDTH, max_lines=0) == []
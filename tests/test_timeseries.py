@@ -0,0 +1,79 @@
+import math
+
+import numpy as np
+
+from src.timeseries import DAY_SEC, TimeSeriesStore, format_trend
+
+NOW = 1_800_000_000.0
+
+
+def _fill(store, ticker, sentiments, start=NOW - 10 * DAY_SEC):
+    for i, sentiment in enumerate(sentiments):
+        store.append(ticker, sentiment, ts=start + i * DAY_SEC)
+
+
+def test_append_grows_file_and_reopen_sees_all_records(tmp_path):
+    store = TimeSeriesStore(tmp_path)
+    store.append("NVDA", "BULLISH", local_score=0.5, news_items=3, reddit_items=70000, prompt_tokens=900, ts=NOW)
+    before = store.load("NVDA")
+    store.append("NVDA", "BEARISH", ts=NOW + 60)
+
+    reopened = TimeSeriesStore(tmp_path).load("NVDA")
+
+    assert len(before) == 1 and len(reopened) == 2
+    assert (tmp_path / "NVDA.bin").stat().st_size == 2 * reopened.itemsize
+    assert list(reopened["ts"]) == [NOW, NOW + 60]
+    assert list(reopened["sentiment"]) == [1, -1]
+    assert reopened["local_score"][0] == np.float32(0.5) and math.isnan(reopened["local_score"][1])
+    assert reopened["reddit_items"][0] == 0xFFFF
+    assert TimeSeriesStore(tmp_path).load("TSLA").shape == (0,)
+
+
+def test_partially_written_tail_is_ignored_then_overwritten(tmp_path):
+    store = TimeSeriesStore(tmp_path)
+    _fill(store, "NVDA", ["BULLISH", "BEARISH"])
+    path = tmp_path / "NVDA.bin"
+    itemsize = store.load("NVDA").itemsize
+    with open(path, "ab") as f:
+        f.write(b"\x01\x02\x03")  # 追記の途中で落ちたレコード
+
+    assert len(store.load("NVDA")) == 2
+
+    store.append("NVDA", "BULLISH", ts=NOW)
+
+    assert path.stat().st_size == 3 * itemsize
+    records = TimeSeriesStore(tmp_path).load("NVDA")
+    assert list(records["sentiment"]) == [1, -1, 1]
+    assert records["ts"][-1] == NOW
+
+
+def test_range_summary_and_rolling(tmp_path):
+    store = TimeSeriesStore(tmp_path)
+    _fill(store, "NVDA", ["BULLISH", "BEARISH", "BULLISH", "BULLISH"], start=NOW - 3.5 * DAY_SEC)
+
+    assert len(store.range("NVDA", NOW - 2 * DAY_SEC, NOW)) == 2
+    summary = store.summary("NVDA", 3, now=NOW)
+    assert summary == {
+        "days": 3,
+        "count": 3,
+        "bullish": 2,
+        "bearish": 1,
+        "mean_sentiment": 0.333,
+        "mean_local_score": None,
+    }
+
+    rolling = store.rolling("NVDA", 2, NOW - 2 * DAY_SEC, NOW + 1, step_days=1)
+    assert list(rolling["count"]) == [2, 2, 2]
+    assert list(rolling["mean_sentiment"]) == [0.0, 0.0, 1.0]
+
+    assert format_trend([summary, store.summary("TSLA", 7, now=NOW)]) == "3D ↑2 ↓1 (+0.33)"
+
+
+def test_base_history_is_read_but_not_written(tmp_path):
+    _fill(TimeSeriesStore(tmp_path / "shared"), "NVDA", ["BEARISH"])
+    shard = TimeSeriesStore(tmp_path / "shard", base=tmp_path / "shared")
+
+    shard.append("NVDA", "BULLISH", ts=NOW)
+
+    assert list(shard.load("NVDA")["sentiment"]) == [-1, 1]
+    assert len(TimeSeriesStore(tmp_path / "shared").load("NVDA")) == 1
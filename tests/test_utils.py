@@ -0,0 +1,110 @@
+import json
+
+from src import utils
+from src.utils import ProcessedIdStore, _hash_id, load_processed_ids, migrate_legacy_state
+
+DAY = 86400
+NOW = 1_800_000_000.0
+
+
+def _write_lines(path, rows):
+    path.write_text("".join(f"{int(ts)}\t{_hash_id(item_id)}\n" for item_id, ts in rows), encoding="utf-8")
+
+
+def test_load_skips_expired_ids(tmp_path):
+    path = tmp_path / "ids.tsv"
+    _write_lines(path, [("old", NOW - 31 * DAY), ("recent", NOW - DAY)])
+
+    store = ProcessedIdStore(path, retention_days=30, now=NOW)
+
+    assert "recent" in store and "old" not in store
+    assert len(store) == 1
+
+
+def test_flush_appends_only_new_ids(tmp_path):
+    path = tmp_path / "ids.tsv"
+    store = ProcessedIdStore(path, now=NOW)
+    store.add_many(["a", "b"])
+    store.flush()
+    store.add_many(["b", "c"])
+    store.flush()
+
+    assert path.read_text(encoding="utf-8").count("\n") == 3
+    assert all(item in ProcessedIdStore(path, now=NOW) for item in ("a", "b", "c"))
+
+
+def test_flush_compacts_when_stale_lines_dominate(tmp_path):
+    path = tmp_path / "ids.tsv"
+    _write_lines(path, [(f"old-{i}", NOW - 40 * DAY) for i in range(10)] + [("keep", NOW - DAY)] * 3)
+
+    store = ProcessedIdStore(path, retention_days=30, now=NOW)
+    store.add("new")
+    store.flush()
+
+    lines = path.read_text(encoding="utf-8").splitlines()
+    assert len(lines) == 2
+    reloaded = ProcessedIdStore(path, retention_days=30, now=NOW)
+    assert "keep" in reloaded and "new" in reloaded and "old-0" not in reloaded
+    assert not path.with_suffix(".tsv.tmp").exists()
+
+
+def test_include_persist_only_when_requested(tmp_path):
+    shared, own = tmp_path / "shared.tsv", tmp_path / "own.tsv"
+    _write_lines(shared, [("s1", NOW), ("s2", NOW)])
+
+    reader = ProcessedIdStore(own, now=NOW)
+    assert reader.include(shared) == 2
+    reader.flush()
+    assert "s1" in reader and not own.exists()
+
+    merger = ProcessedIdStore(own, now=NOW)
+    assert merger.include(shared, persist=True) == 2
+    assert merger.include(shared, persist=True) == 0
+    merger.flush()
+    assert "s2" in ProcessedIdStore(own, now=NOW)
+
+
+def test_migrate_legacy_json_once(tmp_path):
+    legacy = tmp_path / "processed_ids.json"
+    legacy.write_text(json.dumps(["x", "y"]), encoding="utf-8")
+    store = ProcessedIdStore(tmp_path / "ids.tsv")
+
+    assert migrate_legacy_state(store, legacy) == 2
+    assert not legacy.exists()
+    assert "x" in ProcessedIdStore(tmp_path / "ids.tsv")
+    assert migrate_legacy_state(store, legacy) == 0
+
+
+def test_load_processed_ids_in_shard_reads_shared_and_writes_own(data_dir, monkeypatch):
+    shared = ProcessedIdStore(utils.STATE_PATH)
+    shared.add("shared")
+    shared.flush()
+    monkeypatch.setattr(utils, "_shard", (1, 2))
+
+    store = load_processed_ids()
+    store.add("mine")
+    store.flush()
+
+    assert "shared" in store
+    assert utils.shard_path(utils.STATE_PATH).exists()
+    assert "mine" not in ProcessedIdStore(utils.STATE_PATH)
+
+
+def test_partial_trailing_line_is_skipped_and_compacted_away(tmp_path):
+    path = tmp_path / "ids.tsv"
+    _write_lines(path, [("a", NOW - DAY), ("b", NOW - DAY)])
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(f"{int(NOW)}\t{_hash_id('c')[:5]}")  # 追記の途中で中断された行
+    with open(path, "a", encoding="utf-8") as f:
+        f.write("garbage\n")
+
+    store = ProcessedIdStore(path, now=NOW)
+    assert "a" in store and "b" in store and len(store) == 2
+
+    store.add("d")
+    store.flush()
+
+    lines = path.read_text(encoding="utf-8").splitlines()
+    assert len(lines) == 3
+    assert all(len(line.split("\t")[1]) == 16 for line in lines)
+    assert "d" in ProcessedIdStore(path, now=NOW)